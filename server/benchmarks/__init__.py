@@ -0,0 +1,7 @@
+"""
+Benchmarks
+
+Standalone scripts that measure latency, throughput and accuracy of the server
+components. Run them as modules from the server directory, e.g.
+``python -m benchmarks.intent_classifier_benchmark``.
+"""
@@ -0,0 +1,18 @@
+"""Summary statistics and table output shared by the benchmarks."""
+
+from typing import Any, Dict, List, Sequence
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``; 0.0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def print_table(results: List[Dict[str, Any]], columns: Sequence[str]):
+    """Print result rows as left-aligned columns under a header."""
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for result in results:
+        print("  ".join(str(result[c]).ljust(widths[c]) for c in columns))
@@ -0,0 +1,241 @@
+"""
+Browser navigation benchmark for the resource-blocking profile.
+
+Serves the form pages in ``benchmarks/fixtures/forms`` from a local HTTP server and
+loads each of them into a pooled page through ``BrowserService.prewarm`` with resource
+blocking off and on. The pages pull in a stylesheet, a script, web fonts, images, a
+video and tracker scripts and pixels; the binary assets are generated at realistic
+sizes and every response is sent with ``Cache-Control: no-store``, so each navigation transfers the
+whole page again. Trackers are served from ``analytics.localhost``, which Chromium
+resolves to the loopback interface, and that host is added to the policy's tracker
+list for the run.
+
+Reports navigation time (until the load event) and the bytes and requests the server
+answered per navigation. Needs Playwright's Chromium; no network access.
+
+Usage (from the server directory):
+
+    python -m benchmarks.browser_benchmark [--repeats 10] [--latency-ms 20] [--headful] [--json]
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from benchmarks._stats import percentile, print_table
+from layers.external_services.browser_service import BrowserService
+from layers.external_services.resource_blocking import ResourcePolicy, TRACKER_HOSTS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "forms")
+PAGES = ("contact.html", "signup.html", "event_registration.html")
+TRACKER_HOST = "analytics.localhost"
+
+# Generated assets: path -> (content type, size in KB).
+SYNTHETIC_ASSETS = {
+    "/assets/logo.png": ("image/png", 24),
+    "/assets/pattern.png": ("image/png", 48),
+    "/assets/hero.jpg": ("image/jpeg", 380),
+    "/assets/team.jpg": ("image/jpeg", 210),
+    "/assets/venue.jpg": ("image/jpeg", 260),
+    "/assets/fixture-sans.woff2": ("font/woff2", 96),
+    "/assets/fixture-sans-bold.woff2": ("font/woff2", 98),
+    "/assets/welcome.mp4": ("video/mp4", 1400),
+}
+TRACKER_SCRIPT_KB = 90
+
+def _payload(size_kb: int) -> bytes:
+    return bytes(range(256)) * (size_kb * 4)
+
+class FixtureServer:
+    """Local HTTP server for the form fixtures that counts what it sends."""
+
+    def __init__(self, latency_ms: float = 20):
+        self.latency = latency_ms / 1000
+        self._lock = threading.Lock()
+        self.bytes_sent = 0
+        self.requests = 0
+        self.tracker_requests = 0
+        self._payloads = {path: (content_type, _payload(size)) for path, (content_type, size) in SYNTHETIC_ASSETS.items()}
+        self._tracker_script = b"/* tracker */\n" + b"var _t=0;" * (TRACKER_SCRIPT_KB * 1024 // 9)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        # Chromium resets keep-alive connections it no longer needs.
+        self._httpd.handle_error = lambda request, client_address: None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    @property
+    def origin(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.bytes_sent = 0
+            self.requests = 0
+            self.tracker_requests = 0
+
+    def _record(self, sent: int, tracker: bool):
+        with self._lock:
+            self.bytes_sent += sent
+            self.requests += 1
+            if tracker:
+                self.tracker_requests += 1
+
+    def resolve(self, host: str, path: str):
+        """Content type and body for a request, or None for a 404."""
+        if host == TRACKER_HOST:
+            if path.startswith("/collect"):
+                return "image/gif", b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+            return "application/javascript", self._tracker_script
+        if path in self._payloads:
+            return self._payloads[path]
+        if path in ("/", "/submit"):
+            return "text/html", b"<!DOCTYPE html><title>Received</title><p>Received</p>"
+        file_path = os.path.normpath(os.path.join(FIXTURES_DIR, path.lstrip("/")))
+        if not file_path.startswith(FIXTURES_DIR + os.sep) or not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            body = f.read()
+        if file_path.endswith(".html"):
+            tracker_origin = f"http://{TRACKER_HOST}:{self.port}"
+            return "text/html; charset=utf-8", body.replace(b"{{tracker_origin}}", tracker_origin.encode())
+        if file_path.endswith(".css"):
+            return "text/css", body
+        return "application/javascript", body
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self, send_body: bool):
+                if server.latency:
+                    time.sleep(server.latency)
+                host = (self.headers.get("Host") or "").split(":")[0]
+                resolved = server.resolve(host, urlsplit(self.path).path)
+                if resolved is None:
+                    content_type, body, status = "text/plain", b"Not found", 404
+                else:
+                    (content_type, body), status = resolved, 200
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                sent = 0
+                try:
+                    if send_body:
+                        for start in range(0, len(body), 64 * 1024):
+                            chunk = body[start:start + 64 * 1024]
+                            self.wfile.write(chunk)
+                            sent += len(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Chromium drops media downloads it has read enough of.
+                    pass
+                finally:
+                    server._record(sent, host == TRACKER_HOST)
+
+            def do_GET(self):
+                self._serve(True)
+
+            def do_HEAD(self):
+                self._serve(False)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                self._serve(True)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+async def run_profile(server: FixtureServer, block_resources: bool, repeats: int, headless: bool) -> List[Dict[str, Any]]:
+    policy = ResourcePolicy(tracker_hosts=TRACKER_HOSTS + (TRACKER_HOST,)) if block_resources else None
+    service = BrowserService(pool_size=1, headless=headless, block_resources=block_resources, resource_policy=policy)
+    try:
+        # The first navigation launches Chromium; keep it out of the samples.
+        if not await service.prewarm(f"{server.origin}/{PAGES[0]}?run=warmup"):
+            raise SystemExit("Chromium failed to load the fixture pages; is Playwright's Chromium installed?")
+        results = []
+        for page in PAGES:
+            timings, transferred, requests, trackers = [], [], [], []
+            for run in range(repeats):
+                server.reset()
+                started = time.perf_counter()
+                if not await service.prewarm(f"{server.origin}/{page}?run={run}"):
+                    raise SystemExit(f"Navigation to {page} failed")
+                timings.append((time.perf_counter() - started) * 1000)
+                transferred.append(server.bytes_sent / 1024)
+                requests.append(server.requests)
+                trackers.append(server.tracker_requests)
+            results.append({
+                "profile": "blocking" if block_resources else "default",
+                "page": page,
+                "p50_ms": round(percentile(timings, 50), 1),
+                "p95_ms": round(percentile(timings, 95), 1),
+                "mean_ms": round(statistics.mean(timings), 1),
+                "kb": round(statistics.mean(transferred), 1),
+                "requests": round(statistics.mean(requests), 1),
+                "tracker_requests": round(statistics.mean(trackers), 1),
+            })
+        return results
+    finally:
+        await service.close()
+
+async def run(repeats: int, latency_ms: float, headless: bool) -> List[Dict[str, Any]]:
+    server = FixtureServer(latency_ms)
+    server.start()
+    try:
+        results = await run_profile(server, False, repeats, headless)
+        results += await run_profile(server, True, repeats, headless)
+    finally:
+        server.stop()
+    return results
+
+def _print_table(results: List[Dict[str, Any]]):
+    print_table(results, ["profile", "page", "p50_ms", "p95_ms", "mean_ms", "kb", "requests", "tracker_requests"])
+    default = {r["page"]: r for r in results if r["profile"] == "default"}
+    for result in results:
+        baseline = default.get(result["page"])
+        if result["profile"] == "blocking" and baseline and baseline["mean_ms"] and baseline["kb"]:
+            print(f"{result['page']}: {100 - result['mean_ms'] / baseline['mean_ms'] * 100:.0f}% faster, "
+                  f"{100 - result['kb'] / baseline['kb'] * 100:.0f}% fewer bytes with blocking")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=10, help="Navigations per page and profile")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Simulated server latency per request")
+    parser.add_argument("--headful", action="store_true", help="Show the browser window instead of running headless")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.repeats, args.latency_ms, not args.headful))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_table(results)
+
+if __name__ == "__main__":
+    main_cli()
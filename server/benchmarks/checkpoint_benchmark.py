@@ -0,0 +1,158 @@
+"""
+Checkpoint write/read latency benchmark.
+
+Replays the checkpoint traffic of an agent turn (pending writes, a new checkpoint
+holding the full message history, then a read of the latest checkpoint) against
+each checkpointer, at several history sizes. The SQLite checkpointer is measured
+both with batched write-behind and committing every put synchronously, and its
+reads are also
+measured cold, from a second connection that has nothing buffered.
+
+Usage (from the server directory):
+
+    python -m benchmarks.checkpoint_benchmark [--history 10,50,200] [--turns 200] [--json]
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from typing import Any, Callable, Dict, List, Tuple
+
+# Importing layers.langchain_agent builds the Gemini clients; they are never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("GEMINI_MODEL", "offline-benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver, empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks._stats import percentile, print_table
+from layers.langchain_agent.checkpointer import BoundedMemorySaver
+from layers.langchain_agent.sqlite_checkpointer import SQLiteCheckpointSaver
+
+def make_history(size: int) -> List[Any]:
+    """A conversation of ``size`` messages shaped like the agent's: requests, tool calls and answers."""
+    messages = []
+    for index in range(size):
+        kind = index % 4
+        if kind == 0:
+            messages.append(HumanMessage(content=f"Schedule a review with the platform team about item {index} next Tuesday at 2pm"))
+        elif kind == 1:
+            messages.append(AIMessage(content="", tool_calls=[{
+                "name": "schedule_event",
+                "args": {"command": f"review item {index} next Tuesday at 2pm"},
+                "id": f"call_{index}"
+            }]))
+        elif kind == 2:
+            messages.append(ToolMessage(
+                content=json.dumps({"status": "success", "message": f"Event created for item {index}", "event_id": f"evt-{index}"}),
+                tool_call_id=f"call_{index - 1}"
+            ))
+        else:
+            messages.append(AIMessage(content=f"Done. The review for item {index} is on your calendar for next Tuesday at 2pm. " * 3))
+    return messages
+
+def replay(saver: BaseCheckpointSaver, history: List[Any], turns: int, threads: int,
+           commit_each_put: bool = False) -> Dict[str, List[float]]:
+    """Write and read back one checkpoint per turn, spread over ``threads`` threads."""
+    timings = {"put": [], "get": []}
+    state: Dict[str, Dict[str, Any]] = {}
+    for turn in range(turns):
+        thread_id = f"bench-{turn % threads}"
+        previous = state.get(thread_id)
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=turn))
+        version = saver.get_next_version(previous["version"] if previous else None, None)
+        checkpoint["channel_values"] = {"messages": history}
+        checkpoint["channel_versions"] = {"messages": version}
+        config = {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": "",
+            "checkpoint_id": previous["checkpoint_id"] if previous else None
+        }}
+
+        started = time.perf_counter()
+        if previous:
+            saver.put_writes(config, [("messages", history[-2:])], task_id=f"task-{turn}")
+        saved = saver.put(config, checkpoint, {"source": "loop", "step": turn}, {"messages": version})
+        if commit_each_put:
+            saver.flush()
+        timings["put"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        result = saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+        timings["get"].append(time.perf_counter() - started)
+        assert result is not None and result.config["configurable"]["checkpoint_id"] == checkpoint["id"]
+
+        state[thread_id] = {"version": version, "checkpoint_id": saved["configurable"]["checkpoint_id"]}
+    return timings
+
+def cold_reads(db_path: str, turns: int, threads: int) -> List[float]:
+    reader = SQLiteCheckpointSaver(db_path)
+    try:
+        samples = []
+        for turn in range(turns):
+            started = time.perf_counter()
+            reader.get_tuple({"configurable": {"thread_id": f"bench-{turn % threads}", "checkpoint_ns": ""}})
+            samples.append(time.perf_counter() - started)
+        return samples
+    finally:
+        reader.close()
+
+def _summary(name: str, history: int, operation: str, samples: List[float]) -> Dict[str, Any]:
+    latencies = [s * 1000 for s in samples]
+    return {
+        "checkpointer": name,
+        "history": history,
+        "operation": operation,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3) if latencies else 0.0,
+    }
+
+def run(history_sizes: List[int], turns: int, threads: int, flush_interval_ms: float) -> List[Dict[str, Any]]:
+    workdir = tempfile.mkdtemp(prefix="alris-checkpoint-bench-")
+    factories: Dict[str, Tuple[Callable[[str], BaseCheckpointSaver], bool]] = {
+        "memory": (lambda path: MemorySaver(), False),
+        "bounded": (lambda path: BoundedMemorySaver(max_threads=threads), False),
+        "sqlite": (lambda path: SQLiteCheckpointSaver(path, flush_interval_ms=flush_interval_ms), False),
+        "sqlite_sync": (lambda path: SQLiteCheckpointSaver(path, flush_interval_ms=flush_interval_ms), True),
+    }
+    results = []
+    for size in history_sizes:
+        history = make_history(size)
+        for name, (factory, commit_each_put) in factories.items():
+            db_path = os.path.join(workdir, f"{name}-{size}.db")
+            saver = factory(db_path)
+            timings = replay(saver, history, turns, threads, commit_each_put)
+            if isinstance(saver, SQLiteCheckpointSaver):
+                started = time.perf_counter()
+                saver.close()
+                timings["close_flush"] = [time.perf_counter() - started]
+                timings["cold_get"] = cold_reads(db_path, turns, threads)
+            for operation, samples in timings.items():
+                results.append(_summary(name, size, operation, samples))
+    return results
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", default="10,50,200", help="Comma-separated message counts per checkpoint")
+    parser.add_argument("--turns", type=int, default=200, help="Checkpoints written per checkpointer and history size")
+    parser.add_argument("--threads", type=int, default=20, help="Conversation threads the turns are spread over")
+    parser.add_argument("--flush-interval-ms", type=float, default=50, help="Batched SQLite flush interval")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.history.split(",")], args.turns, args.threads, args.flush_interval_ms)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, ["checkpointer", "history", "operation", "p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+
+if __name__ == "__main__":
+    main_cli()
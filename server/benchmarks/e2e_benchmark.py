@@ -0,0 +1,251 @@
+"""
+Offline end-to-end throughput benchmark.
+
+Boots ``main:app`` in-process with a fake chat model, a fake browser, a local
+Apps Script stand-in and an in-process MCP client (see ``benchmarks.fakes``), then
+drives ``/command`` and ``/ws`` at the requested concurrency. Reports p50/p95/p99
+latency, throughput and process RSS per intent. No network access is needed.
+
+Usage (from the server directory):
+
+    python -m benchmarks.e2e_benchmark [--requests 50] [--concurrency 8]
+        [--transport rest|ws|both] [--stream] [--intents calendar,general]
+        [--llm-latency-ms 50] [--browser-latency-ms 100] [--search-latency-ms 100] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from contextlib import suppress
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+os.environ.setdefault("GEMINI_MODEL", "offline-benchmark")
+os.environ.setdefault("JOBS_DB", os.path.join(tempfile.mkdtemp(prefix="alris-bench-"), "jobs.db"))
+
+import httpx
+
+import main
+from benchmarks import fakes
+from benchmarks._stats import percentile, print_table
+
+WORKLOADS: Dict[str, List[str]] = {
+    "calendar": [
+        "Schedule a meeting with the design team tomorrow at 3pm",
+        "Remind me to call the bank on Friday at 10am",
+        "Book a dentist appointment next Monday at 9am",
+    ],
+    "fill_form": [
+        "Fill out the form at https://forms.example.com/signup with name John Doe and email john@example.com",
+        "Register me on https://events.example.org/register with my name Ada Lovelace",
+    ],
+    "browser": [
+        "Open https://news.example.com and click the top story",
+        "Navigate to the documentation homepage",
+    ],
+    "email": [
+        "Send an email to bob@example.com saying the build passed",
+    ],
+    "general": [
+        "What is the capital of France?",
+        "Explain recursion in simple terms",
+    ],
+    "youtube_search": [
+        "Search YouTube for python asyncio tutorials",
+        "Find videos on YouTube about sourdough baking",
+    ],
+    "multi_search": [
+        "Look up sourdough starters, kombucha brewing and kimchi recipes",
+        "Look up python asyncio and trio structured concurrency",
+    ],
+}
+
+def rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking the ASGI protocol directly."""
+
+    def __init__(self, app, path: str = "/ws"):
+        self.app = app
+        self.path = path
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "ASGIWebSocket":
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 0),
+            "server": ("127.0.0.1", 8000),
+            "subprotocols": [],
+        }
+        await self._incoming.put({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._incoming.get, self._outgoing.put))
+        message = await self._outgoing.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"WebSocket was not accepted: {message}")
+        return self
+
+    async def send_json(self, payload: Dict[str, Any]):
+        await self._incoming.put({"type": "websocket.receive", "text": json.dumps(payload)})
+
+    async def receive_json(self) -> Dict[str, Any]:
+        message = await self._outgoing.get()
+        if message["type"] == "websocket.close":
+            raise RuntimeError("WebSocket closed by server")
+        return json.loads(message["text"])
+
+    async def __aexit__(self, *exc):
+        await self._incoming.put({"type": "websocket.disconnect", "code": 1000})
+        with suppress(Exception):
+            await asyncio.wait_for(self._task, timeout=5)
+
+async def _drive_rest(commands: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for command in commands:
+        queue.put_nowait(command)
+    samples = []
+
+    async def worker(client: httpx.AsyncClient):
+        while not queue.empty():
+            command = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post("/command", json={"command": command})
+            elapsed = time.perf_counter() - started
+            ok = response.status_code == 200 and response.json().get("type") != "error"
+            samples.append({"latency": elapsed, "ok": ok})
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return samples
+
+async def _drive_ws(commands: List[str], concurrency: int, stream: bool) -> List[Dict[str, Any]]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for command in commands:
+        queue.put_nowait(command)
+    samples = []
+    final_type = "final" if stream else "response"
+
+    async def worker():
+        async with ASGIWebSocket(main.app) as websocket:
+            while not queue.empty():
+                command = queue.get_nowait()
+                started = time.perf_counter()
+                await websocket.send_json({"command": command, "stream": stream})
+                while True:
+                    frame = await websocket.receive_json()
+                    if frame.get("type") in (final_type, "error"):
+                        break
+                elapsed = time.perf_counter() - started
+                samples.append({"latency": elapsed, "ok": frame.get("type") == final_type})
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+async def _run_case(transport: str, intent: str, requests: int, concurrency: int, stream: bool) -> Dict[str, Any]:
+    workload = WORKLOADS[intent]
+    commands = [workload[i % len(workload)] for i in range(requests)]
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    if transport == "rest":
+        samples = await _drive_rest(commands, concurrency)
+    else:
+        samples = await _drive_ws(commands, concurrency, stream)
+    wall = time.perf_counter() - started
+    latencies = [s["latency"] * 1000 for s in samples]
+    rss_after = rss_mb()
+    return {
+        "transport": transport,
+        "intent": intent,
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s["ok"]),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "rss_mb": round(rss_after, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1),
+    }
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+
+    stub = fakes.AppsScriptStub(latency=args.apps_script_latency_ms / 1000).start()
+    os.environ["GOOGLE_APPS_SCRIPT_CALENDAR_URL"] = stub.url
+    fakes.install(main, llm_latency=args.llm_latency_ms / 1000, browser_latency=args.browser_latency_ms / 1000)
+
+    intents = args.intents.split(",") if args.intents else list(WORKLOADS)
+    transports = ["rest", "ws"] if args.transport == "both" else [args.transport]
+    results = []
+    try:
+        async with main.lifespan(main.app):
+            fakes.install_youtube_fake(
+                main.app.state.agent_orchestrator,
+                connector=main.app.state.mcp_connector,
+                latency=args.search_latency_ms / 1000,
+                cache_size=args.search_cache_size
+            )
+            for transport in transports:
+                for intent in intents:
+                    if args.warmup:
+                        await _run_case(transport, intent, args.warmup, 1, args.stream)
+                    results.append(await _run_case(transport, intent, args.requests, args.concurrency, args.stream))
+    finally:
+        stub.stop()
+    return results
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per intent and transport")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--transport", choices=["rest", "ws", "both"], default="both")
+    parser.add_argument("--stream", action="store_true", help="Request streamed frames over /ws")
+    parser.add_argument("--intents", default="", help=f"Comma-separated subset of: {', '.join(WORKLOADS)}")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests per case")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--browser-latency-ms", type=float, default=100)
+    parser.add_argument("--apps-script-latency-ms", type=float, default=50)
+    parser.add_argument("--search-latency-ms", type=float, default=100)
+    parser.add_argument("--search-cache-size", type=int, default=None,
+                        help="YouTube search cache entries (default YOUTUBE_SEARCH_CACHE_SIZE; 0 disables the cache)")
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    unknown = [intent for intent in args.intents.split(",") if intent and intent not in WORKLOADS]
+    if unknown:
+        parser.error(f"Unknown intents: {', '.join(unknown)}")
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, ["transport", "intent", "requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps", "rss_mb", "rss_delta_mb"])
+
+if __name__ == "__main__":
+    main_cli()
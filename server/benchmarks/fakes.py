@@ -0,0 +1,383 @@
+"""
+Deterministic, network-free stand-ins for the server's external dependencies.
+
+Used by the offline benchmarks: a fake chat model that answers every prompt the
+server sends, a fake Playwright browser, a local Google Apps Script endpoint, a
+YouTube transport serving a recorded results page and an MCP connector/client
+pair that calls the real MCP tools in-process instead of over stdio.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from mcp.types import CallToolResult, TextContent
+
+from layers.external_services.browser_service import BROWSER_POOL_SIZE
+from layers.external_services.youtube_client import YouTubeSearchClient
+from layers.external_services.youtube_search import YouTubeSearchService
+from runtime.governor import governor
+from runtime.metrics import stage
+
+logger = logging.getLogger("benchmarks.fakes")
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+def classify(command: str) -> str:
+    """Keyword intent classifier the fake model uses in place of Gemini."""
+    text = command.lower()
+    if URL_PATTERN.search(text) and re.search(r"\b(fill|register|sign up|signup|apply|submit|enroll|subscribe)\b", text):
+        return "fill_form"
+    if re.search(r"\b(schedule|meeting|remind|calendar|appointment|book)\b", text):
+        return "calendar"
+    if EMAIL_PATTERN.search(text) or re.search(r"\b(email|mail)\b", text):
+        return "email"
+    if URL_PATTERN.search(text) or re.search(r"\b(open|go to|navigate|visit|click|browse)\b", text):
+        return "browser"
+    return "general"
+
+def _event_slots(command: str) -> Dict[str, Any]:
+    start = (datetime.now() + timedelta(days=1)).replace(hour=15, minute=0, second=0, microsecond=0)
+    return {
+        "title": " ".join(command.split()[:4]) or "Event",
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "description": None
+    }
+
+def _form_slots(command: str) -> Dict[str, Any]:
+    url = URL_PATTERN.search(command)
+    form_data = {"country": "Nigeria", "gender": "male"}
+    email = EMAIL_PATTERN.search(command)
+    if email:
+        form_data["email"] = email.group(0)
+    name = re.search(r"\bname (?:is )?([A-Z][a-z]+(?: [A-Z][a-z]+)?)", command)
+    if name:
+        form_data["name"] = name.group(1)
+    return {"url": url.group(0) if url else None, "form_data": form_data}
+
+def _last_match(pattern: str, text: str) -> str:
+    matches = re.findall(pattern, text)
+    return matches[-1].strip() if matches else text
+
+class FakeChatModel(BaseChatModel):
+    """Answers the server's intent, slot, extraction and agent prompts without calling an LLM.
+
+    Every call holds a slot in the governor's "llm" budget and sleeps for ``latency`` seconds,
+    so concurrency limits behave as they would against Gemini.
+    """
+
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = messages[-1].content if messages else ""
+        if not isinstance(prompt, str):
+            prompt = str(prompt)
+
+        if any(isinstance(m, SystemMessage) for m in messages):
+            return self._agent_step(messages)
+
+        if "long-term memory" in prompt:
+            turns = prompt.count("\nUser: ") + prompt.startswith("User: ")
+            return AIMessage(content=f"The user made {max(turns, 1)} earlier requests, all handled.")
+
+        if "slot extraction assistant" in prompt:
+            command = _last_match(r"User input: (.*)", prompt)
+            intent = classify(command)
+            args = {"intent": intent, "reasoning": "benchmark", "event": None, "form": None}
+            if intent == "calendar":
+                args["event"] = _event_slots(command)
+            elif intent == "fill_form":
+                args["form"] = _form_slots(command)
+            return AIMessage(content="", tool_calls=[{"name": "IntentWithSlots", "args": args, "id": "call_0"}])
+
+        if "intent detection assistant" in prompt:
+            command = _last_match(r"User input: (.*)", prompt)
+            return AIMessage(content=json.dumps({"intent": classify(command), "reasoning": "benchmark"}))
+
+        if "calendar event details" in prompt:
+            command = _last_match(r'Command: "(.*)"', prompt)
+            return AIMessage(content=json.dumps(_event_slots(command)))
+
+        if "web form fields" in prompt:
+            command = _last_match(r'Command: "(.*)"', prompt)
+            return AIMessage(content=json.dumps(_form_slots(command)))
+
+        return AIMessage(content="OK")
+
+    def _agent_step(self, messages: List[BaseMessage]) -> AIMessage:
+        """One ReAct step: "look up a, b and c" fans out into parallel search_youtube calls."""
+        command = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        if isinstance(messages[-1], ToolMessage):
+            turn_start = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+            searches = sum(1 for m in messages[turn_start:] if isinstance(m, ToolMessage))
+            return AIMessage(content=f"I ran {searches} searches for you: {command}")
+        lookup = re.search(r"\blook up (.+)", command, re.IGNORECASE)
+        if lookup:
+            queries = [q.strip() for q in re.split(r",|\band\b", lookup.group(1)) if q.strip()]
+            return AIMessage(content="", tool_calls=[
+                {"name": "search_youtube", "args": {"query": query}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                for query in queries
+            ])
+        return AIMessage(content=f"I have taken care of that for you: {command}")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        with governor.acquire_blocking("llm"):
+            time.sleep(self.latency)
+            return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        async with governor.acquire("llm"):
+            await asyncio.sleep(self.latency)
+            return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async with governor.acquire("llm"):
+            await asyncio.sleep(self.latency)
+            message = self._respond(messages)
+            if message.tool_calls:
+                yield ChatGenerationChunk(message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                        for index, call in enumerate(message.tool_calls)
+                    ]
+                ))
+                return
+            for word in message.content.split(" "):
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+                if run_manager:
+                    await run_manager.on_llm_new_token(word + " ", chunk=chunk)
+                yield chunk
+
+class FakeBrowserService:
+    """Drop-in for BrowserService that sleeps instead of driving Playwright.
+
+    Tasks hold one of ``BROWSER_POOL_SIZE`` slots and the governor's "browser_pool" budget,
+    like leases from the real page pool.
+    """
+
+    def __init__(self, latency: float = 0.1, pool_size: int = BROWSER_POOL_SIZE):
+        self.latency = latency
+        self.pool_size = pool_size
+        self._slots = asyncio.Semaphore(pool_size)
+        self.leases = 0
+        self.total_wait = 0.0
+
+    async def _act(self, name: str, result: Any = True) -> Any:
+        started = time.monotonic()
+        async with governor.acquire("browser_pool"), self._slots:
+            self.leases += 1
+            self.total_wait += time.monotonic() - started
+            with stage(f"browser.{name}"):
+                await asyncio.sleep(self.latency)
+        return result
+
+    async def initialize(self):
+        pass
+
+    async def navigate(self, url: str, session: Optional[str] = None) -> bool:
+        return await self._act("navigate")
+
+    async def prewarm(self, url: str, on_hit: Optional[Callable[[], None]] = None) -> bool:
+        return await self._act("prewarm")
+
+    async def fill_form(self, url: str, form_data: Dict[str, str], selectors: Optional[Dict[str, str]] = None) -> bool:
+        return await self._act("fill_form")
+
+    async def click_element(self, selector: str, url: Optional[str] = None, session: Optional[str] = None) -> bool:
+        return await self._act("click")
+
+    async def discover_form_fields(self, url: str):
+        return await self._act("discover_form_fields", [
+            {"field_name": "name", "label": "Name", "type": "text", "selector": "#name"},
+            {"field_name": "email", "label": "Email", "type": "email", "selector": "#email"}
+        ])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "leases": self.leases,
+            "avg_wait_ms": round(self.total_wait / self.leases * 1000, 2) if self.leases else 0.0
+        }
+
+    async def close(self):
+        pass
+
+class FakeSimpleFormService:
+    """Drop-in for SimpleFormService, which otherwise launches its own Chromium per call."""
+
+    latency = 0.1
+
+    @staticmethod
+    async def fill_form(url: str, form_data: Dict[str, str]) -> Dict[str, Any]:
+        async with governor.acquire("browser"):
+            with stage("browser.form_service"):
+                await asyncio.sleep(FakeSimpleFormService.latency)
+        return {"status": "success", "message": "Form filled successfully"}
+
+YOUTUBE_RESULTS_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "youtube_results.html")
+
+class FakeYouTubeTransport(httpx.MockTransport):
+    """Serves the recorded results page in ``fixtures/`` for every search after ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.1):
+        with open(YOUTUBE_RESULTS_FIXTURE, encoding="utf-8") as f:
+            self.page = f.read()
+        self.latency = latency
+        self.requests = 0
+        super().__init__(self._handle)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return httpx.Response(200, text=self.page, headers={"Content-Type": "text/html; charset=utf-8"})
+
+class AppsScriptStub:
+    """Local HTTP server that accepts calendar posts the way the deployed Apps Script does."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.events = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/exec"
+
+    def start(self) -> "AppsScriptStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                time.sleep(stub.latency)
+                with stub._lock:
+                    stub.events += 1
+                    event_id = f"evt-{stub.events}"
+                body = json.dumps({
+                    "success": True,
+                    "message": f"Event '{payload.get('title')}' created",
+                    "eventId": event_id
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class InProcessMCPSession:
+    """Session that calls the connector's FastMCP tools directly and wraps results like the stdio client."""
+
+    def __init__(self, connector):
+        self.connector = connector
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        try:
+            result = await self.connector.mcp.call_tool(name, arguments)
+        except Exception as e:
+            return CallToolResult(content=[TextContent(type="text", text=str(e))], isError=True)
+        if isinstance(result, tuple):
+            result = result[0]
+        if isinstance(result, dict):
+            result = [TextContent(type="text", text=json.dumps(result))]
+        return CallToolResult(content=list(result), isError=False)
+
+def install(main_module, llm_latency: float = 0.05, browser_latency: float = 0.1):
+    """Swap every external dependency of ``main_module.app`` for an offline fake.
+
+    Must run before the app's lifespan starts, since that is when the orchestrator,
+    agents and MCP connector are constructed.
+    """
+    from langchain.chains import LLMChain
+    from layers.langchain_agent import browser_agent, event_extraction_tool, form_extraction_tool
+    from layers.langchain_agent import intent_detector, react_agent
+    from layers.mcp_connector import mcp_server
+
+    def create_fake_llm(temperature: float = 0.5, model_name: Optional[str] = None) -> FakeChatModel:
+        return FakeChatModel(latency=llm_latency)
+
+    intent_detector.create_llm = create_fake_llm
+    react_agent.create_llm = create_fake_llm
+    event_extraction_tool.event_extraction_chain = LLMChain(llm=create_fake_llm(), prompt=event_extraction_tool.prompt)
+    form_extraction_tool.form_extraction_chain = LLMChain(llm=create_fake_llm(), prompt=form_extraction_tool.prompt)
+
+    FakeSimpleFormService.latency = browser_latency
+    browser_agent.BrowserService = partial(FakeBrowserService, latency=browser_latency)
+    mcp_server.BrowserService = partial(FakeBrowserService, latency=browser_latency)
+    form_extraction_tool.SimpleFormService = FakeSimpleFormService
+
+    class OfflineMCPConnector(mcp_server.MCPConnector):
+        """Keeps the real tool registry but never opens the stdio transport."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._stopped = threading.Event()
+
+        def run(self):
+            self._stopped.wait()
+
+        async def shutdown(self):
+            self._stopped.set()
+            await super().shutdown()
+
+    class InProcessMCPClient(main_module.AlrisMCPClient):
+        async def connect(self) -> bool:
+            self.session = InProcessMCPSession(main_module.mcp_connector)
+            self.connected = True
+            return True
+
+    main_module.MCPConnector = OfflineMCPConnector
+    main_module.AlrisMCPClient = InProcessMCPClient
+
+def install_youtube_fake(orchestrator, connector=None, latency: float = 0.1, cache_size: Optional[int] = None):
+    """Point the agents' and MCP connector's shared search service at FakeYouTubeTransport.
+
+    cache_size=0 disables the service's cache.
+    """
+    options = {} if cache_size is None else {"max_size": cache_size}
+    client = YouTubeSearchClient(transport=FakeYouTubeTransport(latency=latency))
+    service = YouTubeSearchService(client=client, **options)
+    orchestrator.browser_agent.youtube_search = service
+    if connector is not None:
+        connector.youtube_search = service
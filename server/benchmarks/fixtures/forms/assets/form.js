@@ -0,0 +1,13 @@
+document.addEventListener("DOMContentLoaded", function () {
+  var form = document.querySelector("form");
+  if (!form) {
+    return;
+  }
+  form.addEventListener("submit", function (event) {
+    event.preventDefault();
+    var status = document.getElementById("form-status");
+    if (status) {
+      status.textContent = "Thanks, we received your submission.";
+    }
+  });
+});
@@ -0,0 +1,87 @@
+"""
+Compare the LLM-only intent classifier with the embedding backend (plus LLM fallback).
+
+Usage (from the server directory):
+
+    python -m benchmarks.intent_classifier_benchmark [--skip-llm] [--min-margin 0.35]
+
+The LLM path needs GEMINI_MODEL and a Google API key; the embedding path needs
+the optional numpy and sentence-transformers packages.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+from dotenv import load_dotenv
+load_dotenv()
+from benchmarks._stats import percentile
+from layers.langchain_agent.intent_detector import IntentDetector
+
+EVAL_SET: List[Tuple[str, str]] = [
+    ("Sign up for the webinar at https://webinar.example.com with my email tom@mail.com", "fill_form"),
+    ("Please register me on www.meetup.com/events/123 as Ada Lovelace", "fill_form"),
+    ("Fill in the feedback form at https://forms.gle/xyz with a 5 star rating", "fill_form"),
+    ("Apply to the internship posting on https://jobs.example.com/intern", "fill_form"),
+    ("Open reddit.com", "browser"),
+    ("Go to the BBC news website", "browser"),
+    ("Navigate to https://docs.python.org/3/", "browser"),
+    ("Click on the sign in button", "browser"),
+    ("Send an email to kate@example.com telling her the build passed", "email"),
+    ("Email the landlord that rent will be paid on Monday", "email"),
+    ("Write a mail to hr@company.com asking about leave policy", "email"),
+    ("Forward the slides to dev@team.io", "email"),
+    ("Schedule a review with Priya on Wednesday at 11am", "calendar"),
+    ("Remind me to take my medicine tonight at 9pm", "calendar"),
+    ("Add a birthday party for Sam on June 3rd at 6pm", "calendar"),
+    ("Book a 30 minute sync with marketing tomorrow morning", "calendar"),
+    ("Why is the sky blue?", "general"),
+    ("Translate good morning into Spanish", "general"),
+    ("What's 15 percent of 240?", "general"),
+    ("Recommend a good science fiction book", "general"),
+]
+
+async def _run(detector: IntentDetector, label: str) -> None:
+    detector.cache = None
+    latencies = []
+    correct = 0
+    for command, expected in EVAL_SET:
+        start = time.perf_counter()
+        predicted = await detector.adetect_intent(command)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += predicted == expected
+
+    batch_start = time.perf_counter()
+    await detector.adetect_intents([command for command, _ in EVAL_SET])
+    batch_ms = (time.perf_counter() - batch_start) * 1000
+
+    print(f"{label}")
+    print(f"  accuracy     {correct}/{len(EVAL_SET)} ({correct / len(EVAL_SET):.0%})")
+    print(f"  latency p50  {statistics.median(latencies):8.1f} ms")
+    print(f"  latency p95  {percentile(latencies, 95):8.1f} ms")
+    print(f"  batch total  {batch_ms:8.1f} ms for {len(EVAL_SET)} commands")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-llm", action="store_true", help="Only benchmark the embedding backend")
+    parser.add_argument("--min-margin", type=float, default=None, help="Override INTENT_EMBEDDING_MIN_MARGIN")
+    args = parser.parse_args()
+
+    if not args.skip_llm:
+        await _run(IntentDetector(backend="llm"), "LLM only")
+
+    embedding_kwargs = {"backend": "embedding"}
+    if args.min_margin is not None:
+        embedding_kwargs["min_margin"] = args.min_margin
+    if args.skip_llm:
+        # A negative margin keeps every answer local, so no API key is needed.
+        embedding_kwargs["min_margin"] = -1.0
+    embedding_detector = IntentDetector(**embedding_kwargs)
+    if not embedding_detector.embedding_classifier:
+        print("Embedding backend unavailable; install numpy and sentence-transformers")
+        return
+    await _run(embedding_detector, "Embedding + LLM fallback" if not args.skip_llm else "Embedding only")
+
+if __name__ == "__main__":
+    asyncio.run(main())
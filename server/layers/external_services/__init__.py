@@ -6,7 +6,20 @@ such as browsers, email servers, calendar services, and other APIs.
 """
 
 from .browser_service import BrowserService
+from .resource_blocking import ResourcePolicy
 from .email_service import EmailService
 from .calendar_service import CalendarService, CalendarEventParams
+from .youtube_client import YouTubeSearchClient, YouTubeSearchError
+from .youtube_search import YouTubeSearchService, get_youtube_search_service
 
-__all__ = ["BrowserService", "EmailService", "CalendarService", "CalendarEventParams"]
+__all__ = [
+    "BrowserService",
+    "ResourcePolicy",
+    "EmailService",
+    "CalendarService",
+    "CalendarEventParams",
+    "YouTubeSearchClient",
+    "YouTubeSearchError",
+    "YouTubeSearchService",
+    "get_youtube_search_service"
+]
@@ -1,119 +1,377 @@
+import os
+import time
+import asyncio
 import logging
-from typing import Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Callable, List, Optional
 from playwright.async_api import async_playwright
+from runtime.governor import governor
+from runtime.metrics import registry, Counter, Gauge, Histogram, stage
+from .resource_blocking import ResourcePolicy
+from .form_snapshot import snapshot_form, fillable, field_kind, match_field, pick_radio, option_value, is_checked, describe_fields
 
 logger = logging.getLogger("external_services.browser")
 
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "8"))
+BROWSER_POOL_IDLE_SECONDS = float(os.getenv("BROWSER_POOL_IDLE_SECONDS", "120"))
+BROWSER_POOL_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("BROWSER_POOL_ACQUIRE_TIMEOUT_SECONDS", "30"))
+BROWSER_PRESENTED_PAGES = int(os.getenv("BROWSER_PRESENTED_PAGES", "4"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "False").lower() == "true"
+# Unset or empty: block only when headless, so pages shown in a visible browser load normally.
+_BLOCK_RESOURCES = os.getenv("BROWSER_BLOCK_RESOURCES", "")
+BROWSER_BLOCK_RESOURCES = _BLOCK_RESOURCES.lower() == "true" if _BLOCK_RESOURCES else None
+
+LEASE_WAIT_SECONDS = registry.register(Histogram(
+    "alris_browser_lease_wait_seconds",
+    "Time browser tasks waited for a pooled page.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+))
+POOL_PAGES = registry.register(Gauge(
+    "alris_browser_pool_pages",
+    "Pooled browser contexts by state.",
+    ("state",)
+))
+POOL_CLOSED = registry.register(Counter(
+    "alris_browser_pool_pages_closed_total",
+    "Pooled browser contexts closed, by reason.",
+    ("reason",)
+))
+
+class BrowserPoolExhausted(Exception):
+    pass
+
+class _PooledPage:
+    """One isolated browser context and its page.
+
+    ``warm_url`` is set while the page holds a freshly loaded URL nobody has interacted
+    with yet, so the next task for that URL can skip reloading it; ``on_hit`` is called when
+    one does. ``presented`` marks a page opened for the user to look at, which leaves the
+    pool when it is released, and ``session`` is the client session it was opened for.
+    """
+    __slots__ = ("context", "page", "released_at", "warm_url", "on_hit", "presented", "session")
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.released_at = time.monotonic()
+        self.warm_url: Optional[str] = None
+        self.on_hit: Optional[Callable[[], None]] = None
+        self.presented = False
+        self.session: Optional[str] = None
+
 class BrowserService:
-    def __init__(self):
+    """Playwright browser with a pool of isolated contexts.
+
+    Every operation leases its own context and page, so concurrent tasks never share a
+    page. At most ``pool_size`` are leased at once; idle ones are closed after
+    ``idle_seconds``.
+
+    A context goes back to the pool as it is only while it holds an untouched pre-warmed
+    page. Any other released context is closed and replaced by a fresh one, so cookies,
+    storage and half-filled forms never reach the next task. Pages opened for the user
+    (``navigate``) are kept out of the pool, up to ``presented_pages`` of them.
+
+    With ``block_resources`` every context routes its requests through a ``ResourcePolicy``
+    that aborts images, media, fonts and trackers. It defaults to ``headless``.
+    """
+
+    def __init__(self,
+                 pool_size: int = BROWSER_POOL_SIZE,
+                 idle_seconds: float = BROWSER_POOL_IDLE_SECONDS,
+                 acquire_timeout_seconds: float = BROWSER_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                 presented_pages: int = BROWSER_PRESENTED_PAGES,
+                 headless: bool = BROWSER_HEADLESS,
+                 block_resources: Optional[bool] = BROWSER_BLOCK_RESOURCES,
+                 resource_policy: Optional[ResourcePolicy] = None):
+        self.pool_size = max(1, pool_size)
+        self.idle_seconds = idle_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.presented_pages = max(1, presented_pages)
+        self.headless = headless
+        if block_resources is None:
+            block_resources = headless
+        self.resource_policy = (resource_policy or ResourcePolicy()) if block_resources else None
         self._playwright = None
         self._browser = None
-        self._context = None
-        self._page = None
+        self._init_lock = asyncio.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: List[_PooledPage] = []
+        self._presented: List[_PooledPage] = []
+        self._warming: Dict[str, asyncio.Event] = {}
+        self._leased = 0
+        self._recycling = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self.leases = 0
+        self.created = 0
+        self.reused = 0
+        self.resets = 0
+        self.warm_hits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
     
     async def initialize(self):
-        if self._playwright is None:
+        if self._browser is not None:
+            return
+        async with self._init_lock:
+            if self._browser is not None:
+                return
             logger.info("Initializing Playwright browser service")
-            self._playwright = await async_playwright().start()
-            self._browser = await self._playwright.chromium.launch(headless=False)
-            self._context = await self._browser.new_context()
-            self._page = await self._context.new_page()
-            logger.info("Browser service initialized")
+            playwright = await async_playwright().start()
+            try:
+                self._browser = await playwright.chromium.launch(headless=self.headless)
+            except Exception:
+                await playwright.stop()
+                raise
+            self._playwright = playwright
+            self._slots = asyncio.Semaphore(self.pool_size)
+            self._reaper = asyncio.create_task(self._reap_idle())
+            logger.info(f"Browser service initialized with a pool of {self.pool_size} contexts "
+                        f"(headless={self.headless}, blocking={'on' if self.resource_policy else 'off'})")
+
+    def _update_gauges(self):
+        POOL_PAGES.set(len(self._idle), state="idle")
+        POOL_PAGES.set(self._leased, state="leased")
+        POOL_PAGES.set(len(self._presented), state="presented")
+
+    def _take_idle(self, url: Optional[str]) -> Optional[_PooledPage]:
+        """A page already warm for ``url`` if there is one, else a blank one, else any idle page."""
+        if not self._idle:
+            return None
+        if url:
+            for index in range(len(self._idle) - 1, -1, -1):
+                if self._idle[index].warm_url == url:
+                    return self._idle.pop(index)
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index].warm_url is None:
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    async def _open_page(self) -> _PooledPage:
+        context = await self._browser.new_context()
+        if self.resource_policy:
+            await context.route("**/*", self.resource_policy.handle)
+        page = await context.new_page()
+        self.created += 1
+        return _PooledPage(context, page)
+
+    async def _discard(self, entry: _PooledPage, reason: str):
+        POOL_CLOSED.inc(reason=reason)
+        try:
+            await entry.context.close()
+        except Exception as e:
+            logger.debug(f"Failed to close browser context: {str(e)}")
+
+    async def _recycle(self, entry: _PooledPage):
+        """Replace a used context with a fresh one, off the releasing task's path."""
+        await self._discard(entry, "reset")
+        if not self._browser or not self._browser.is_connected():
+            return
+        if len(self._idle) + self._leased >= self.pool_size:
+            return
+        try:
+            fresh = await self._open_page()
+        except Exception as e:
+            logger.debug(f"Failed to open a replacement browser context: {str(e)}")
+            return
+        if self._browser is None:
+            await self._discard(fresh, "shutdown")
+            return
+        self._idle.append(fresh)
+        self._update_gauges()
+
+    async def _present(self, entry: _PooledPage):
+        """Keep a page open for the user, closing the oldest once there are too many."""
+        self._presented = [page for page in self._presented if not page.page.is_closed()]
+        self._presented.append(entry)
+        while len(self._presented) > self.presented_pages:
+            await self._discard(self._presented.pop(0), "replaced")
+
+    @asynccontextmanager
+    async def lease(self, url: Optional[str] = None, wait_for_prewarm: bool = True):
+        """Lease a pooled page for one task, waiting for a free slot if the pool is full.
+
+        With a ``url`` a page warm for it is preferred, and a pre-warm of that URL still
+        loading is waited for rather than loading the URL a second time. A page that is still warm when it
+        is released goes back to the pool; one marked ``presented`` is kept open for the
+        user; any other is reset.
+        """
+        await self.initialize()
+        warming = self._warming.get(url) if url and wait_for_prewarm else None
+        if warming is not None:
+            try:
+                await asyncio.wait_for(warming.wait(), timeout=self.acquire_timeout_seconds)
+            except asyncio.TimeoutError:
+                pass
+        # The governor's budget makes pool waits count towards admission control, so a
+        # saturated pool turns new commands away with 429 instead of queueing them.
+        budget = governor.budget("browser_pool")
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(budget.acquire(), timeout=self.acquire_timeout_seconds)
+        except asyncio.TimeoutError:
+            raise BrowserPoolExhausted(
+                f"No browser page free after {self.acquire_timeout_seconds}s ({budget.limit} in use)"
+            )
+        try:
+            remaining = max(0.0, self.acquire_timeout_seconds - (time.monotonic() - started))
+            await asyncio.wait_for(self._slots.acquire(), timeout=remaining)
+        except asyncio.TimeoutError:
+            budget.release()
+            raise BrowserPoolExhausted(
+                f"No browser page free after {self.acquire_timeout_seconds}s ({self.pool_size} in use)"
+            )
+        except BaseException:
+            budget.release()
+            raise
+        waited = time.monotonic() - started
+        held_since = time.monotonic()
+        LEASE_WAIT_SECONDS.observe(waited)
+        self.leases += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+        entry = None
+        try:
+            entry = self._take_idle(url)
+            if entry is None:
+                entry = await self._open_page()
+            else:
+                self.reused += 1
+            self._leased += 1
+            self._update_gauges()
+            yield entry
+        finally:
+            if entry is not None:
+                self._leased -= 1
+                if entry.page.is_closed() or not self._browser or not self._browser.is_connected():
+                    await self._discard(entry, "broken")
+                elif entry.presented:
+                    await self._present(entry)
+                elif entry.warm_url:
+                    entry.released_at = time.monotonic()
+                    self._idle.append(entry)
+                else:
+                    self.resets += 1
+                    task = asyncio.create_task(self._recycle(entry))
+                    self._recycling.add(task)
+                    task.add_done_callback(self._recycling.discard)
+                self._update_gauges()
+            self._slots.release()
+            budget.release(time.monotonic() - held_since)
+
+    async def _goto(self, entry: _PooledPage, url: str):
+        if entry.warm_url == url:
+            self.warm_hits += 1
+            logger.debug(f"Reusing warm page for {url}")
+            if entry.on_hit:
+                entry.on_hit()
+        else:
+            await entry.page.goto(url)
+        entry.warm_url = None
+        entry.on_hit = None
+
+    async def _reap_idle(self):
+        interval = max(1.0, self.idle_seconds / 2)
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_seconds
+            expired = [entry for entry in self._idle if entry.released_at < cutoff]
+            if not expired:
+                continue
+            self._idle = [entry for entry in self._idle if entry.released_at >= cutoff]
+            self._update_gauges()
+            for entry in expired:
+                await self._discard(entry, "idle")
+            logger.debug(f"Closed {len(expired)} idle browser contexts")
     
-    async def navigate(self, url: str) -> bool:
+    async def navigate(self, url: str, session: Optional[str] = None) -> bool:
+        """Open the URL for the user. The page stays open and is never handed to another task;
+        later clicks without a URL from the same ``session`` go to it."""
         logger.info(f"Navigating to {url}")
-        await self.initialize()
         try:
-            await self._page.goto(url)
+            async with self.lease(url) as entry:
+                with stage("browser.navigate"):
+                    await self._goto(entry, url)
+                entry.presented = True
+                entry.session = session
             return True
         except Exception as e:
             logger.error(f"Failed to navigate to {url}: {str(e)}")
             return False
     
-    async def fill_form(self, form_data: Dict[str, str], selectors: Optional[Dict[str, str]] = None) -> bool:
-        await self.initialize()
+    async def prewarm(self, url: str, on_hit: Optional[Callable[[], None]] = None) -> bool:
+        """Launch the browser and load the URL ahead of time so a later task starts on a warm page.
+
+        ``on_hit`` is called when a task picks the warm page up.
+        """
+        loaded = asyncio.Event()
+        self._warming[url] = loaded
+        try:
+            async with self.lease(url, wait_for_prewarm=False) as entry:
+                with stage("browser.prewarm"):
+                    await self._goto(entry, url)
+                entry.warm_url = url
+                entry.on_hit = on_hit
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to pre-warm browser for {url}: {str(e)}")
+            return False
+        finally:
+            loaded.set()
+            if self._warming.get(url) is loaded:
+                del self._warming[url]
+    
+    async def fill_form(self, url: str, form_data: Dict[str, str], selectors: Optional[Dict[str, str]] = None) -> bool:
+        try:
+            async with self.lease(url) as entry:
+                with stage("browser.fill_form"):
+                    await self._goto(entry, url)
+                    return await self._fill_form(entry.page, form_data, selectors)
+        except Exception as e:
+            logger.error(f"Failed to fill form at {url}: {str(e)}")
+            return False
+    
+    async def _fill_form(self, page, form_data: Dict[str, str], selectors: Optional[Dict[str, str]] = None) -> bool:
+        """Fill and submit the page's form. ``selectors`` maps a form_data key to the CSS selector
+        of its field, for fields the key alone does not identify."""
         try:
-            page = self._page
-            form = await page.query_selector('form')
-            if not form:
+            snapshot = await snapshot_form(page)
+            if not snapshot["has_form"]:
                 logger.error("No form found on the page.")
                 return False
-            input_elements = await form.query_selector_all('input, select, textarea')
-            field_info = []
-            for el in input_elements:
-                props = await page.evaluate(
-                    '''el => ({
-                        name: el.name || null,
-                        id: el.id || null,
-                        placeholder: el.placeholder || null,
-                        aria_label: el.getAttribute("aria-label") || null,
-                        type: el.type || null,
-                        tag: el.tagName.toLowerCase(),
-                        label: null
-                    })''',
-                    el
-                )
-                if props['id']:
-                    label_el = await page.query_selector(f'label[for="{props["id"]}"]')
-                    if label_el:
-                        props['label'] = await label_el.inner_text()
-                if not props['label']:
-                    parent_label = await el.evaluate_handle('(el) => el.closest("label")')
-                    if parent_label:
-                        try:
-                            props['label'] = await parent_label.inner_text()
-                        except Exception:
-                            pass
-                field_info.append({'element': el, 'props': props})
-            matched = set()
+            fields = [field for field in snapshot["fields"] if fillable(field)]
+            selectors = selectors or {}
+            matched = 0
             for user_key, user_value in form_data.items():
-                user_key_lower = user_key.lower().replace('_', '').replace(' ', '')
-                best_match = None
-                best_score = 0
-                for field in field_info:
-                    props = field['props']
-                    candidates = [
-                        props.get('name', ''),
-                        props.get('id', ''),
-                        props.get('placeholder', ''),
-                        props.get('aria_label', ''),
-                        props.get('label', '')
-                    ]
-                    for cand in candidates:
-                        if not cand:
-                            continue
-                        cand_norm = cand.lower().replace('_', '').replace(' ', '')
-                        if user_key_lower == cand_norm:
-                            best_match = field
-                            best_score = 3
-                            break
-                        if user_key_lower in cand_norm or cand_norm in user_key_lower:
-                            if best_score < 2:
-                                best_match = field
-                                best_score = 2
-                    if best_score == 3:
-                        break
-                if best_match:
-                    el = best_match['element']
-                    tag = best_match['props']['tag']
-                    try:
-                        if tag == 'input' and best_match['props']['type'] in ['checkbox', 'radio']:
-                            await el.set_checked(bool(user_value))
-                        elif tag == 'select':
-                            await el.select_option(str(user_value))
-                        else:
-                            await el.fill(str(user_value))
-                        matched.add(id(el))
-                    except Exception as e:
-                        logger.warning(f"Failed to fill field {user_key}: {e}")
-                else:
+                field = match_field(user_key, fields)
+                explicit = selectors.get(user_key)
+                if explicit:
+                    exact = next((f for f in fields if f["selector"] == explicit), None)
+                    # A radio group's selector matches every button; the value picks one.
+                    if exact or not (field and field_kind(field) == "radio"):
+                        field = exact
+                selector = explicit or (field["selector"] if field else None)
+                if not selector:
                     logger.warning(f"Could not match user field '{user_key}' to any form input.")
+                    continue
+                kind = field_kind(field) if field else "text"
+                try:
+                    if kind == "radio":
+                        await page.check(pick_radio(field, user_value, fields)["selector"])
+                    elif kind == "checkbox":
+                        await page.set_checked(selector, is_checked(user_value))
+                    elif kind == "select":
+                        await page.select_option(selector, option_value(field, user_value))
+                    else:
+                        await page.fill(selector, str(user_value))
+                    matched += 1
+                except Exception as e:
+                    logger.warning(f"Failed to fill field {user_key}: {e}")
             try:
-                submit_btn = await form.query_selector('button[type="submit"],input[type="submit"]')
-                if submit_btn:
-                    await submit_btn.click()
+                if snapshot["submit"]:
+                    await page.click(snapshot["submit"])
                 else:
-                    await form.evaluate('(f) => f.submit()')
+                    await page.eval_on_selector('form', '(f) => f.submit()')
             except Exception as e:
                 logger.warning(f"Could not submit form: {e}")
             if not matched:
@@ -124,84 +382,89 @@ class BrowserService:
             logger.error(f"Error in fill_form: {e}")
             return False
     
-    async def click_element(self, selector: str) -> bool:
-        await self.initialize()
+    def _session_page(self, session: Optional[str]) -> Optional[_PooledPage]:
+        """The open page ``session`` most recently navigated to."""
+        for entry in reversed(self._presented):
+            if entry.session == session and not entry.page.is_closed():
+                return entry
+        return None
+
+    async def click_element(self, selector: str, url: Optional[str] = None, session: Optional[str] = None) -> bool:
+        """Click an element. With a ``url`` it is loaded on a leased page first; without one the
+        click goes to the page ``session`` last opened with ``navigate``."""
         try:
-            await self._page.click(selector)
+            if url:
+                async with self.lease(url) as entry:
+                    with stage("browser.click"):
+                        await self._goto(entry, url)
+                        await entry.page.click(selector)
+                return True
+            entry = self._session_page(session)
+            if entry is None:
+                logger.error(f"Cannot click element {selector}: no URL given and no page open for this session")
+                return False
+            with stage("browser.click"):
+                await entry.page.click(selector)
             return True
         except Exception as e:
             logger.error(f"Failed to click element {selector}: {str(e)}")
             return False
     
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "idle": len(self._idle),
+            "leased": self._leased,
+            "leases": self.leases,
+            "created": self.created,
+            "reused": self.reused,
+            "resets": self.resets,
+            "presented": len(self._presented),
+            "warm_hits": self.warm_hits,
+            "avg_wait_ms": round(self.total_wait / self.leases * 1000, 2) if self.leases else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "headless": self.headless,
+            "resource_blocking": self.resource_policy.stats() if self.resource_policy else None
+        }
+    
     async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+        for task in list(self._recycling):
+            task.cancel()
+        for entry in self._idle + self._presented:
+            await self._discard(entry, "shutdown")
+        self._idle = []
+        self._presented = []
         if self._browser:
             await self._browser.close()
         if self._playwright:
             await self._playwright.stop()
         self._browser = None
-        self._context = None
-        self._page = None
         self._playwright = None
+        self._slots = None
+        self._reaper = None
+        self._update_gauges()
         logger.info("Browser service closed")
     
     async def discover_form_fields(self, url: str):
         """Navigate to the URL and discover form fields, handling both traditional and modern dynamic forms."""
-        await self.initialize()
         try:
-            page = self._page
-            await page.goto(url)
+            async with self.lease(url) as entry:
+                with stage("browser.discover_form_fields"):
+                    return await self._discover_form_fields(entry, url)
+        except Exception as e:
+            logger.error(f"Failed to discover form fields: {str(e)}")
+            return []
+    
+    async def _discover_form_fields(self, entry: _PooledPage, url: str):
+        try:
+            page = entry.page
+            await self._goto(entry, url)
             await page.wait_for_load_state('networkidle')
             await page.wait_for_timeout(2000)
             
-            form = await page.query_selector('form')
-            if form:
-                input_elements = await form.query_selector_all('input, select, textarea')
-            else:
-                input_elements = await page.query_selector_all('input, select, textarea, [role="textbox"], [contenteditable="true"], [data-qa*="input"], [data-qa*="field"]')
-            fields = []
-            for element in input_elements:
-                name = await element.get_attribute('name')
-                el_id = await element.get_attribute('id')
-                placeholder = await element.get_attribute('placeholder')
-                el_type = await element.get_attribute('type')
-                
-                # Form doesn't fucking load. Huge navigation issue.
-                if not name:
-                    for attr in ['data-qa', 'data-field', 'aria-label']:
-                        val = await element.get_attribute(attr)
-                        if val:
-                            name = val
-                            break
-                
-                if not el_type:
-                    role = await element.get_attribute('role')
-                    if role in ['textbox', 'combobox', 'radio', 'checkbox']:
-                        el_type = role
-                label_text = None
-                
-                if el_id:
-                    label = await page.query_selector(f'label[for="{el_id}"]')
-                    if label:
-                        label_text = (await label.inner_text()).strip()
-                
-                if not label_text:
-                    parent_label = await element.evaluate_handle('(el) => el.closest("label")')
-                    if parent_label:
-                        try:
-                            label_text = await parent_label.evaluate('(el) => el.textContent')
-                        except:
-                            pass
-                
-                user_label = label_text or placeholder or name or el_id or "Unknown Field"
-                field_name = name or el_id or placeholder or user_label
-                
-                if field_name and el_type != 'submit':
-                    fields.append({
-                        "field_name": field_name.strip(),
-                        "label": user_label.strip(),
-                        "type": el_type or "text"
-                    })
-            return fields
+            return describe_fields(await snapshot_form(page))
         except Exception as e:
             logger.error(f"Failed to discover form fields: {str(e)}")
             return [] 
\ No newline at end of file
@@ -5,6 +5,8 @@ import asyncio
 import requests
 from typing import Dict, Any, Optional
 from pydantic import BaseModel
+from runtime.governor import governor
+from runtime.metrics import stage
 
 logger = logging.getLogger("external_services.calendar")
 
@@ -45,10 +47,12 @@ class CalendarService:
         
         try:
             loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: requests.post(apps_script_url, json=payload, headers=headers, timeout=30)
-            )
+            async with governor.acquire("calendar"):
+                with stage("calendar.apps_script"):
+                    response = await loop.run_in_executor(
+                        None, 
+                        lambda: requests.post(apps_script_url, json=payload, headers=headers, timeout=30)
+                    )
             response.raise_for_status()
             
             response_data = response.json()
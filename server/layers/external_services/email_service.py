@@ -1,8 +1,11 @@
 import logging
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import List, Optional
+from runtime.governor import governor
+from runtime.metrics import stage
 
 logger = logging.getLogger("external_services.email")
 
@@ -42,19 +45,25 @@ class EmailService:
             else:
                 message.attach(MIMEText(body, "plain"))
                 
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                recipients = [recipient]
-                if cc:
-                    recipients.extend(cc)
-                if bcc:
-                    recipients.extend(bcc)
-                server.sendmail(self.username, recipients, message.as_string())
+            recipients = [recipient]
+            if cc:
+                recipients.extend(cc)
+            if bcc:
+                recipients.extend(bcc)
+            
+            async with governor.acquire("smtp"):
+                with stage("smtp.send"):
+                    await asyncio.to_thread(self._send, recipients, message.as_string())
                 
             logger.info(f"Email sent to {recipient}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to send email: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+    
+    def _send(self, recipients: List[str], message: str):
+        with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            server.starttls()
+            server.login(self.username, self.password)
+            server.sendmail(self.username, recipients, message) 
\ No newline at end of file
@@ -0,0 +1,236 @@
+from typing import Dict, Any, List, Optional
+
+# Input types the user never fills in.
+SKIPPED_INPUT_TYPES = ("hidden", "submit", "button", "reset", "image")
+
+# One evaluate call describing every field of the page's first form, or of the whole page
+# when it has no <form> (dynamic forms built from divs). Elements without an id, name,
+# data-qa or radio value that is unique on the page are tagged with a data-alris-field
+# attribute so they still get a selector that survives re-rendering of their neighbours.
+SNAPSHOT_SCRIPT = r"""
+() => {
+  const form = document.querySelector('form');
+  const elements = form
+    ? form.querySelectorAll('input, select, textarea, [role="textbox"], [contenteditable="true"]')
+    : document.querySelectorAll('input, select, textarea, [role="textbox"], [contenteditable="true"], [data-qa*="input"], [data-qa*="field"]');
+  const clean = (value) => {
+    const text = (value || '').replace(/\s+/g, ' ').trim();
+    return text || null;
+  };
+  const labelText = (label) => {
+    const copy = label.cloneNode(true);
+    copy.querySelectorAll('input, select, textarea, button').forEach((control) => control.remove());
+    return clean(copy.textContent);
+  };
+  const unique = (selector) => {
+    try {
+      return document.querySelectorAll(selector).length === 1 ? selector : null;
+    } catch (e) {
+      return null;
+    }
+  };
+  const resolveLabel = (el) => {
+    if (el.labels && el.labels.length) {
+      return labelText(el.labels[0]);
+    }
+    if (el.id) {
+      const label = document.querySelector(`label[for="${CSS.escape(el.id)}"]`);
+      if (label) {
+        return labelText(label);
+      }
+    }
+    const wrapping = el.closest('label');
+    if (wrapping) {
+      return labelText(wrapping);
+    }
+    const labelledBy = el.getAttribute('aria-labelledby');
+    if (labelledBy) {
+      return clean(labelledBy.split(/\s+/)
+        .map((id) => document.getElementById(id))
+        .filter(Boolean)
+        .map((node) => node.textContent)
+        .join(' '));
+    }
+    return null;
+  };
+  const stableSelector = (el, tag, name) => {
+    const dataQa = el.getAttribute('data-qa');
+    const candidates = [];
+    if (el.id) {
+      candidates.push(`#${CSS.escape(el.id)}`);
+    }
+    if (name) {
+      candidates.push(`${tag}[name="${CSS.escape(name)}"]`);
+      if (el.type === 'radio' || el.type === 'checkbox') {
+        candidates.push(`${tag}[name="${CSS.escape(name)}"][value="${CSS.escape(el.value)}"]`);
+      }
+    }
+    if (dataQa) {
+      candidates.push(`[data-qa="${CSS.escape(dataQa)}"]`);
+    }
+    for (const candidate of candidates) {
+      if (unique(candidate)) {
+        return candidate;
+      }
+    }
+    if (!el.hasAttribute('data-alris-field')) {
+      window.__alrisFieldSeq = (window.__alrisFieldSeq || 0) + 1;
+      el.setAttribute('data-alris-field', String(window.__alrisFieldSeq));
+    }
+    return `[data-alris-field="${el.getAttribute('data-alris-field')}"]`;
+  };
+
+  const fields = [];
+  for (const el of elements) {
+    const tag = el.tagName.toLowerCase();
+    const isControl = tag === 'input' || tag === 'select' || tag === 'textarea';
+    const type = tag === 'input' ? (el.getAttribute('type') || 'text').toLowerCase() : null;
+    const role = el.getAttribute('role');
+    const name = el.getAttribute('name');
+    const fieldset = el.closest('fieldset');
+    const legend = fieldset ? fieldset.querySelector('legend') : null;
+    const field = {
+      tag: tag,
+      name: name,
+      id: el.id || null,
+      type: type,
+      placeholder: el.getAttribute('placeholder'),
+      aria_label: el.getAttribute('aria-label'),
+      label: resolveLabel(el),
+      legend: legend ? clean(legend.textContent) : null,
+      role: role,
+      data_qa: el.getAttribute('data-qa'),
+      data_field: el.getAttribute('data-field'),
+      value: type === 'radio' || type === 'checkbox' ? el.value : null,
+      required: isControl ? el.required : el.getAttribute('aria-required') === 'true',
+      disabled: isControl ? el.disabled : el.getAttribute('aria-disabled') === 'true',
+      selector: stableSelector(el, tag, name),
+      options: null
+    };
+    if (tag === 'select') {
+      field.options = Array.from(el.options).map((option) => ({
+        value: option.value,
+        label: clean(option.textContent)
+      }));
+    }
+    fields.push(field);
+  }
+
+  let submit = null;
+  if (form) {
+    const button = form.querySelector('button[type="submit"], input[type="submit"], button:not([type])');
+    if (button) {
+      submit = stableSelector(button, button.tagName.toLowerCase(), button.getAttribute('name'));
+    }
+  }
+  return {has_form: !!form, submit: submit, fields: fields};
+}
+"""
+
+async def snapshot_form(page) -> Dict[str, Any]:
+    """Every field of the page's form, with its label and a stable selector, in one round trip."""
+    return await page.evaluate(SNAPSHOT_SCRIPT)
+
+def fillable(field: Dict[str, Any]) -> bool:
+    return not field.get("disabled") and field.get("type") not in SKIPPED_INPUT_TYPES
+
+def field_kind(field: Dict[str, Any]) -> str:
+    """How a field is filled: checkbox, radio, select or text."""
+    if field["type"] in ("checkbox", "radio"):
+        return field["type"]
+    if field["tag"] == "select":
+        return "select"
+    if field.get("role") in ("checkbox", "radio"):
+        return field["role"]
+    return "text"
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "").lower().replace("_", "").replace("-", "").replace(" ", "")
+
+def match_field(key: str, fields: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The field a user's key refers to: an exact match on name, id, placeholder, aria-label,
+    data-qa or label, else the first partial match."""
+    wanted = _normalize(key)
+    if not wanted:
+        return None
+    partial = None
+    for field in fields:
+        for candidate in (field["name"], field["id"], field["placeholder"],
+                          field["aria_label"], field["data_qa"], field["label"]):
+            normalized = _normalize(candidate)
+            if not normalized:
+                continue
+            if normalized == wanted:
+                return field
+            if partial is None and (wanted in normalized or normalized in wanted):
+                partial = field
+    return partial
+
+def pick_radio(field: Dict[str, Any], value: Any, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The radio button in ``field``'s group whose value or label is ``value``."""
+    wanted = _normalize(str(value))
+    for candidate in fields:
+        if (candidate["type"] == "radio" and candidate["name"] == field["name"]
+                and wanted in (_normalize(candidate["value"]), _normalize(candidate["label"]))):
+            return candidate
+    return field
+
+def option_value(field: Dict[str, Any], value: Any) -> str:
+    """The option of a select whose value or text is ``value``, else ``value`` unchanged."""
+    wanted = _normalize(str(value))
+    for option in field.get("options") or []:
+        if wanted in (_normalize(option["value"]), _normalize(option["label"])):
+            return option["value"]
+    return str(value)
+
+def is_checked(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "false", "no", "off", "0", "unchecked")
+    return bool(value)
+
+def describe_fields(snapshot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Fields as reported to users and agents: name, label, type and selector.
+
+    A radio group is reported once, with its buttons as options.
+    """
+    described: List[Dict[str, Any]] = []
+    groups: Dict[str, Dict[str, Any]] = {}
+    for field in snapshot.get("fields", []):
+        if not fillable(field):
+            continue
+        name = field["name"] or field["data_qa"] or field["data_field"] or field["aria_label"]
+        user_label = field["label"] or field["aria_label"] or field["placeholder"] or name or field["id"] or "Unknown Field"
+        field_name = name or field["id"] or field["placeholder"] or user_label
+        if field["tag"] == "select":
+            kind = "select"
+        else:
+            kind = field["type"] or (field["role"] if field["role"] in ("textbox", "combobox", "radio", "checkbox") else None)
+        if field["type"] == "radio" and field["name"]:
+            group = groups.get(field["name"])
+            option = {"value": field["value"], "label": field["label"]}
+            if group is not None:
+                group["options"].append(option)
+                continue
+            group_name = field["name"].replace("\\", "\\\\").replace('"', '\\"')
+            entry = {
+                "field_name": field["name"],
+                "label": field["legend"] or field["name"],
+                "type": "radio",
+                "selector": f'input[type="radio"][name="{group_name}"]',
+                "options": [option]
+            }
+            groups[field["name"]] = entry
+            described.append(entry)
+            continue
+        entry = {
+            "field_name": field_name.strip(),
+            "label": user_label.strip(),
+            "type": kind or "text",
+            "selector": field["selector"]
+        }
+        if field["options"]:
+            entry["options"] = field["options"]
+        if field["required"]:
+            entry["required"] = True
+        described.append(entry)
+    return described
@@ -0,0 +1,124 @@
+import os
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+from runtime.metrics import registry, Counter
+
+logger = logging.getLogger("external_services.resource_blocking")
+
+BROWSER_BLOCKED_RESOURCE_TYPES = os.getenv("BROWSER_BLOCKED_RESOURCE_TYPES", "image,media,font")
+BROWSER_BLOCKED_HOSTS = os.getenv("BROWSER_BLOCKED_HOSTS", "")
+BROWSER_BLOCKING_ALLOWLIST = os.getenv("BROWSER_BLOCKING_ALLOWLIST", "youtube.com,youtu.be")
+
+# Analytics, ad and session-recording hosts. Subdomains are matched too.
+TRACKER_HOSTS: Tuple[str, ...] = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "analytics.tiktok.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "fullstory.com",
+    "mixpanel.com",
+    "segment.com",
+    "segment.io",
+    "amplitude.com",
+    "heap.io",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "taboola.com",
+    "outbrain.com",
+    "criteo.com",
+    "criteo.net",
+)
+
+BLOCKED_REQUESTS = registry.register(Counter(
+    "alris_browser_blocked_requests_total",
+    "Browser requests aborted by the resource-blocking profile, by resource type or tracker.",
+    ("reason",)
+))
+
+def _split(value: str) -> Tuple[str, ...]:
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+def _host(url: Optional[str]) -> str:
+    if not url:
+        return ""
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+class ResourcePolicy:
+    """Which subresources a page may load when the browser runs the lean automation profile.
+
+    Images, media and fonts are aborted along with requests to tracker hosts. Pages on an
+    allowlisted host, and requests to one, load everything, for sites that break without them.
+    The main document of a navigation is never blocked.
+    """
+
+    def __init__(self,
+                 resource_types: Iterable[str] = _split(BROWSER_BLOCKED_RESOURCE_TYPES),
+                 tracker_hosts: Iterable[str] = TRACKER_HOSTS + _split(BROWSER_BLOCKED_HOSTS),
+                 allowlist: Iterable[str] = _split(BROWSER_BLOCKING_ALLOWLIST)):
+        self.resource_types = frozenset(resource_types)
+        self.tracker_hosts = tuple(tracker_hosts)
+        self.allowlist = tuple(allowlist)
+        self.allowed = 0
+        self.blocked: Dict[str, int] = {}
+
+    def block_reason(self, resource_type: str, url: str,
+                     page_url: Optional[str] = None, main_frame_navigation: bool = False) -> Optional[str]:
+        """Why a request should be aborted, or None to let it through."""
+        if main_frame_navigation:
+            return None
+        host = _host(url)
+        if _matches(host, self.allowlist) or _matches(_host(page_url), self.allowlist):
+            return None
+        if _matches(host, self.tracker_hosts):
+            return "tracker"
+        if resource_type in self.resource_types:
+            return resource_type
+        return None
+
+    async def handle(self, route):
+        """Playwright route handler applying the policy to one request."""
+        request = route.request
+        page_url = None
+        main_frame_navigation = False
+        try:
+            frame = request.frame
+            page_url = frame.url
+            main_frame_navigation = request.is_navigation_request() and frame.parent_frame is None
+        except Exception:
+            # Service worker requests have no frame.
+            pass
+        reason = self.block_reason(request.resource_type, request.url, page_url, main_frame_navigation)
+        try:
+            if reason:
+                self.blocked[reason] = self.blocked.get(reason, 0) + 1
+                BLOCKED_REQUESTS.inc(reason=reason)
+                await route.abort("blockedbyclient")
+            else:
+                self.allowed += 1
+                await route.continue_()
+        except Exception as e:
+            # The page closed while the request was in flight.
+            logger.debug(f"Failed to route {request.url}: {str(e)}")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "resource_types": sorted(self.resource_types),
+            "allowlist": list(self.allowlist),
+            "allowed": self.allowed,
+            "blocked": dict(self.blocked)
+        }
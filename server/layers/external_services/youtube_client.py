@@ -0,0 +1,137 @@
+import os
+import re
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from runtime.metrics import stage
+
+logger = logging.getLogger("external_services.youtube_client")
+
+YOUTUBE_SEARCH_URL = os.getenv("YOUTUBE_SEARCH_URL", "https://www.youtube.com/results")
+YOUTUBE_HTTP_TIMEOUT_SECONDS = float(os.getenv("YOUTUBE_HTTP_TIMEOUT_SECONDS", "8"))
+YOUTUBE_HTTP_MAX_CONNECTIONS = int(os.getenv("YOUTUBE_HTTP_MAX_CONNECTIONS", "20"))
+YOUTUBE_HTTP_RETRIES = int(os.getenv("YOUTUBE_HTTP_RETRIES", "2"))
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+# Skips the EU consent interstitial, which has no results data.
+_COOKIES = {"CONSENT": "YES+1"}
+# `var ytInitialData = {` or `window["ytInitialData"] = {`
+_INITIAL_DATA = re.compile(r"""ytInitialData["']?\]?\s*=\s*\{""")
+
+class YouTubeSearchError(Exception):
+    pass
+
+def _text(value: Dict[str, Any]) -> Optional[str]:
+    """Text of a YouTube renderer field, which is either {"simpleText": ...} or {"runs": [{"text": ...}]}."""
+    if not value:
+        return None
+    if "simpleText" in value:
+        return value["simpleText"]
+    runs = value.get("runs") or []
+    return "".join(run.get("text", "") for run in runs) or None
+
+def extract_initial_data(html: str) -> Dict[str, Any]:
+    """The ``ytInitialData`` object embedded in a results page."""
+    match = _INITIAL_DATA.search(html)
+    if match is None:
+        raise YouTubeSearchError("Results page has no ytInitialData")
+    try:
+        data, _ = json.JSONDecoder().raw_decode(html, match.end() - 1)
+    except ValueError as e:
+        raise YouTubeSearchError(f"Failed to parse ytInitialData: {str(e)}")
+    return data
+
+def parse_search_results(html: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """Videos on a results page, in page order, without shorts, ads or duplicates."""
+    data = extract_initial_data(html)
+    sections = (data.get("contents", {})
+                    .get("twoColumnSearchResultsRenderer", {})
+                    .get("primaryContents", {})
+                    .get("sectionListRenderer", {})
+                    .get("contents", []))
+    videos: List[Dict[str, Any]] = []
+    seen = set()
+    for section in sections:
+        for item in section.get("itemSectionRenderer", {}).get("contents", []):
+            video = item.get("videoRenderer")
+            if not video:
+                continue
+            video_id = video.get("videoId")
+            path = (video.get("navigationEndpoint", {})
+                         .get("commandMetadata", {})
+                         .get("webCommandMetadata", {})
+                         .get("url", ""))
+            if not video_id or len(video_id) != 11 or "/shorts/" in path or video_id in seen:
+                continue
+            seen.add(video_id)
+            videos.append({
+                "video_id": video_id,
+                "url": f"https://www.youtube.com/watch?v={video_id}",
+                "title": _text(video.get("title")),
+                "channel": _text(video.get("ownerText") or video.get("longBylineText")),
+                "duration": _text(video.get("lengthText")),
+                "views": _text(video.get("viewCountText")),
+                "published": _text(video.get("publishedTimeText"))
+            })
+            if len(videos) >= limit:
+                return videos
+    return videos
+
+class YouTubeSearchClient:
+    """Async YouTube results-page client on one pooled keep-alive HTTP connection set."""
+
+    def __init__(self,
+                 search_url: str = YOUTUBE_SEARCH_URL,
+                 timeout_seconds: float = YOUTUBE_HTTP_TIMEOUT_SECONDS,
+                 max_connections: int = YOUTUBE_HTTP_MAX_CONNECTIONS,
+                 retries: int = YOUTUBE_HTTP_RETRIES,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.search_url = search_url
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self.retries = max(0, retries)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=_HEADERS,
+                cookies=_COOKIES,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=min(self.timeout_seconds, 3.0)),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                follow_redirects=True,
+                transport=self.transport
+            )
+        return self._client
+
+    async def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Fetch and parse one results page. Pages served without results data are retried."""
+        last_error = ""
+        for attempt in range(self.retries + 1):
+            try:
+                with stage("youtube.http"):
+                    response = await self._http().get(self.search_url, params={"search_query": query})
+                response.raise_for_status()
+                return parse_search_results(response.text, limit)
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status < 500 and status != 429:
+                    raise YouTubeSearchError(f"YouTube returned HTTP {status}") from e
+                last_error = f"HTTP {status}"
+            except (httpx.TransportError, YouTubeSearchError) as e:
+                last_error = str(e) or type(e).__name__
+            logger.warning(f"YouTube search attempt {attempt + 1} for '{query}' failed: {last_error}")
+        raise YouTubeSearchError(f"YouTube search failed after {self.retries + 1} attempts: {last_error}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,165 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from runtime.metrics import registry, Counter, Gauge
+from .youtube_client import YouTubeSearchClient
+
+logger = logging.getLogger("external_services.youtube_search")
+
+YOUTUBE_SEARCH_CACHE_SIZE = int(os.getenv("YOUTUBE_SEARCH_CACHE_SIZE", "512"))
+YOUTUBE_SEARCH_CACHE_TTL_SECONDS = float(os.getenv("YOUTUBE_SEARCH_CACHE_TTL_SECONDS", "900"))
+YOUTUBE_SEARCH_RESULTS = int(os.getenv("YOUTUBE_SEARCH_RESULTS", "5"))
+
+SEARCH_LOOKUPS = registry.register(Counter(
+    "alris_youtube_search_lookups_total",
+    "YouTube searches by how they were answered: cache hit, shared in-flight request, or upstream miss.",
+    ("result",)
+))
+SEARCH_CACHE_ENTRIES = registry.register(Gauge(
+    "alris_youtube_search_cache_entries",
+    "Normalized YouTube queries currently cached."
+))
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Cache key for a search: lowercase, surrounding quotes and punctuation stripped, whitespace collapsed."""
+    normalized = _WHITESPACE.sub(" ", (query or "").lower()).strip()
+    return normalized.strip("\"'").rstrip(".?!").strip()
+
+class YouTubeSearchService:
+    """YouTube search shared by every agent path, with an LRU+TTL cache keyed by normalized query.
+
+    Results are the videos ``YouTubeSearchClient`` parses from a results page: id, watch URL,
+    title, channel, duration, views and publish time.
+
+    Concurrent searches for the same query share one upstream request. Failures and empty
+    results are not cached.
+    """
+
+    def __init__(self,
+                 client: Optional[YouTubeSearchClient] = None,
+                 max_size: int = YOUTUBE_SEARCH_CACHE_SIZE,
+                 ttl_seconds: float = YOUTUBE_SEARCH_CACHE_TTL_SECONDS,
+                 results: int = YOUTUBE_SEARCH_RESULTS):
+        self.client = client or YouTubeSearchClient()
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.results = results
+        self._entries: "OrderedDict[str, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def _cached(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            videos, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                SEARCH_CACHE_ENTRIES.set(len(self._entries))
+                return None
+            self._entries.move_to_end(key)
+            return videos
+
+    def _store(self, key: str, videos: List[Dict[str, Any]]):
+        if not videos or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (videos, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            SEARCH_CACHE_ENTRIES.set(len(self._entries))
+
+    async def _fetch(self, key: str) -> List[Dict[str, Any]]:
+        try:
+            videos = await self.client.search(key, self.results)
+        except Exception:
+            self.errors += 1
+            raise
+        logger.info(f"YouTube search for '{key}' returned {len(videos)} videos")
+        self._store(key, videos)
+        return videos
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieve the exception so a request nobody waits on any more is not reported as unhandled.
+            task.exception()
+
+    async def search_videos(self, query: str) -> List[Dict[str, Any]]:
+        """Videos for a query. Upstream errors are raised to every caller sharing the request."""
+        key = normalize_query(query)
+        if not key:
+            return []
+
+        videos = self._cached(key)
+        if videos is not None:
+            self.hits += 1
+            SEARCH_LOOKUPS.inc(result="hit")
+            return [dict(video) for video in videos]
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.shared += 1
+            SEARCH_LOOKUPS.inc(result="shared")
+        else:
+            self.misses += 1
+            SEARCH_LOOKUPS.inc(result="miss")
+            task = loop.create_task(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # A caller that gives up must not cancel the request for the others waiting on it.
+        return [dict(video) for video in await asyncio.shield(task)]
+
+    async def search(self, query: str) -> List[str]:
+        """Watch URLs for a query."""
+        return [video["url"] for video in await self.search_videos(query)]
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            SEARCH_CACHE_ENTRIES.set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.shared
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+            "hit_rate": round((self.hits + self.shared) / lookups, 4) if lookups else 0.0
+        }
+
+_shared_service: Optional[YouTubeSearchService] = None
+
+def get_youtube_search_service() -> YouTubeSearchService:
+    """The process-wide search service, so every agent shares one cache."""
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = YouTubeSearchService()
+    return _shared_service
@@ -8,6 +8,7 @@ plan task execution, and coordinate with the MCP layer to execute those tasks.
 from .agent_orchestrator import AgentOrchestrator
 from .browser_agent import BrowserAgent
 from .intent_detector import IntentDetector
+from .intent_router import route_command, admission_budgets
 from .calendar_handler import *
 from .youtube_handler import *
 
@@ -15,6 +16,8 @@ __all__ = [
     'AgentOrchestrator',
     'BrowserAgent',
     'IntentDetector',
+    'route_command',
+    'admission_budgets',
     'handle_calendar_intent',
     'detect_youtube_url',
     'is_youtube_search_command'
@@ -1,20 +1,34 @@
+import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import asyncio
 from .browser_agent import BrowserAgent
 from .calendar_handler import handle_calendar_intent
-from .youtube_handler import detect_youtube_url, is_youtube_search_command, extract_youtube_search_query, create_youtube_direct_url_response
+from .youtube_handler import extract_youtube_search_query, create_youtube_direct_url_response
 from .intent_detector import IntentDetector
-from .form_extraction_tool import extract_form_fields
+from .intent_router import route_command, has_date_signal, has_youtube_signal
+from .form_extraction_tool import extract_form_fields, complete_form_extraction
+from .event_extraction_tool import extract_event_details
+from .speculation import SpeculativeExecutor, SpeculativeRun
+from .react_agent import EventCallback
+from runtime.metrics import stage, track_request, finish_request
 
 logger = logging.getLogger("langchain_agent.orchestrator")
 
+INTENT_SLOT_EXTRACTION = os.getenv("INTENT_SLOT_EXTRACTION", "False").lower() == "true"
+SPECULATIVE_EXECUTION = os.getenv("SPECULATIVE_EXECUTION", "False").lower() == "true"
+RESPONSE_TIMINGS = os.getenv("RESPONSE_TIMINGS", "False").lower() == "true"
+
 class AgentOrchestrator:
     def __init__(self):
         self.browser_agent = BrowserAgent()
         self._cleanup_tasks = set()
         self.mcp_client = None
         self.intent_detector = IntentDetector()
+        self.slot_extraction = INTENT_SLOT_EXTRACTION
+        self.speculative_execution = SPECULATIVE_EXECUTION
+        self.speculator = SpeculativeExecutor()
+        self.response_timings = RESPONSE_TIMINGS
         
         logger.info("Agent Orchestrator initialized")
     
@@ -22,23 +36,69 @@ class AgentOrchestrator:
         self.mcp_client = mcp_client
         self.browser_agent.set_mcp_client(mcp_client)
     
-    async def _handle_calendar_intent(self, command: str) -> Dict[str, Any]:
+    async def _handle_calendar_intent(self, command: str, event_details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Handle calendar-related commands by parsing time information and calling calendar tools."""
-        return await handle_calendar_intent(command, self.mcp_client)
+        return await handle_calendar_intent(command, self.mcp_client, event_details=event_details)
+    
+    def _start_speculation(self, command: str, route: Dict[str, Any]) -> Optional[SpeculativeRun]:
+        """Start downstream work the command is likely to need while its intent is being classified."""
+        work = {}
+        if has_date_signal(route) and not self.slot_extraction:
+            work["event_details"] = extract_event_details(command)
+        if has_youtube_signal(route):
+            work["youtube_search"] = self.browser_agent.prefetch_youtube_video_urls(command)
+        if not work and not route.get("url"):
+            return None
+        run = self.speculator.start(work)
+        if route.get("url"):
+            # The page is used only if a later lease for the URL finds it warm: the agent's
+            # browser tools, or a form fill run in-process.
+            run.start("browser_page", self.browser_agent.browser_service.prewarm(
+                route["url"], on_hit=lambda: run.mark_used("browser_page")
+            ))
+        return run
+    
+    async def process_command(self,
+                              command: str,
+                              thread_id: str = None,
+                              user_tokens: dict = None,
+                              on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """Run a command end to end. When on_event is given, intermediate status, token and tool
+        events are forwarded to it as they happen."""
+        with track_request() as timings:
+            response = await self._process_command(command, thread_id, user_tokens, on_event)
+            finish_request(timings, response.get("intent"))
+            if thread_id:
+                response.setdefault("thread_id", thread_id)
+            if self.response_timings:
+                response["timings"] = timings.summary()
+            return response
+    
+    async def get_thread_history(self, thread_id: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Page through the agent conversation stored for a thread."""
+        return await self.browser_agent.get_history(thread_id, offset=offset, limit=limit)
     
-    async def process_command(self, command: str, thread_id: str = None, user_tokens: dict = None) -> Dict[str, Any]:
+    async def _process_command(self,
+                               command: str,
+                               thread_id: Optional[str],
+                               user_tokens: Optional[dict],
+                               on_event: Optional[EventCallback]) -> Dict[str, Any]:
+        speculation = None
         try:
             logger.info(f"Processing command: {command}")
             
-            video_url = detect_youtube_url(command)
-            if video_url:
-                return create_youtube_direct_url_response(command, video_url)
+            route = route_command(command)
+            if route["intent"] == "youtube_direct_url":
+                return create_youtube_direct_url_response(command, route["video_url"])
             
-            if is_youtube_search_command(command):
+            if route["intent"] == "youtube_search":
                 logger.info(f"Detected YouTube search in command: {command}")
+                if on_event:
+                    await on_event({"type": "status", "data": "searching_youtube", "intent": "youtube_search"})
                 query = extract_youtube_search_query(command)
                 
-                result = await self.browser_agent.direct_youtube_search(query)
+                with stage("youtube_search"):
+                    result = await self.browser_agent.direct_youtube_search(query)
                 
                 response = {
                     "intent": "youtube_search",
@@ -52,9 +112,26 @@ class AgentOrchestrator:
                 
                 return response
             
-            intent = self.intent_detector.detect_intent(command)
+            intent = route["intent"]
+            slots = {}
+            if not intent:
+                if self.speculative_execution:
+                    speculation = self._start_speculation(command, route)
+                with stage("intent_detection"):
+                    if self.slot_extraction:
+                        slots = await self.intent_detector.adetect_intent_with_slots(command)
+                        intent = slots["intent"]
+                    else:
+                        intent = await self.intent_detector.adetect_intent(command)
+            
+            if on_event:
+                await on_event({"type": "status", "data": "intent_detected", "intent": intent})
+            
             if intent == "fill_form":
-                extraction = await extract_form_fields(command)
+                if slots.get("form") is not None:
+                    extraction = await complete_form_extraction(command, slots["form"])
+                else:
+                    extraction = await extract_form_fields(command)
                 url = extraction.get("url")
                 form_data = extraction.get("form_data") or {}
                 needs_clarification = extraction.get("needs_clarification")
@@ -80,6 +157,16 @@ class AgentOrchestrator:
                             "fields": extraction
                         }
                     }
+                if speculation and speculation.started("browser_page") and url == route.get("url"):
+                    # The page was pre-warmed in this process's browser; the MCP server's
+                    # browser could not use it.
+                    result = await self.browser_agent.fill_form(url, form_data)
+                    return {
+                        "intent": "fill_form",
+                        "command": command,
+                        "result": result,
+                        "fields": form_data
+                    }
                 if self.mcp_client:
                     mcp_result = await self.mcp_client.call_tool("fill_form", {"params": {"url": url, "form_data": form_data}})
                     return {
@@ -99,13 +186,25 @@ class AgentOrchestrator:
                         },
                         "fields": extraction
                     }
-            elif intent == "browser":
-                result = await self.browser_agent.execute(command, thread_id=thread_id)
             elif intent == "calendar":
-                result = await self._handle_calendar_intent(command)
+                event_details = slots.get("event")
+                if event_details is None and speculation:
+                    event_details = await speculation.take("event_details")
+                result = await self._handle_calendar_intent(command, event_details=event_details)
             else:
-                logger.info(f"Using browser agent for general command: {command}")
-                result = await self.browser_agent.execute(command, thread_id=thread_id)
+                if intent != "browser":
+                    logger.info(f"Using browser agent for general command: {command}")
+                youtube_prefetch = None
+                if speculation:
+                    youtube_prefetch = speculation.deferred("youtube_search")
+                with stage("agent"):
+                    result = await self.browser_agent.execute(
+                        command,
+                        thread_id=thread_id,
+                        youtube_prefetch=youtube_prefetch,
+                        on_event=on_event,
+                        intent=intent
+                    )
             
             response = {
                 "intent": intent,
@@ -126,6 +225,9 @@ class AgentOrchestrator:
                 "command": command,
                 "error": str(e)
             }
+        finally:
+            if speculation:
+                speculation.discard()
     
     async def cleanup(self):
         try:
@@ -135,6 +237,15 @@ class AgentOrchestrator:
             
             if self._cleanup_tasks:
                 await asyncio.gather(*self._cleanup_tasks, return_exceptions=True)
+
+            checkpointer = self.browser_agent.memory
+            if hasattr(checkpointer, "close"):
+                await asyncio.to_thread(checkpointer.close)
+
+            if self.intent_detector.cache:
+                await asyncio.to_thread(self.intent_detector.cache.close)
+
+            await self.browser_agent.youtube_search.aclose()
         except Exception as e:
             logger.error(f"Error during cleanup: {str(e)}")
         finally:
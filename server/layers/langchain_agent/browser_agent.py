@@ -1,40 +1,58 @@
 import logging
-from typing import List, Dict, Any
-from langchain.agents import Tool
-from langchain_community.tools import YouTubeSearchTool
-from .react_agent import BaseReactAgent
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+from langchain_core.tools import BaseTool
+from .react_agent import BaseReactAgent, async_tool
 from config.prompt import SYSTEM_PROMPT
 from layers.external_services.browser_service import BrowserService
+from runtime.metrics import record_fallback
 
 logger = logging.getLogger("langchain_agent.browser")
 
+class NavigateInput(BaseModel):
+    url: str = Field(description="The URL to open")
+
+class SearchYouTubeInput(BaseModel):
+    query: str = Field(description="What to search YouTube for")
+
+class FillFormInput(BaseModel):
+    url: str = Field(description="URL of the page with the form")
+    form_data: Dict[str, str] = Field(default_factory=dict, description="Field names mapped to the values to enter")
+    selectors: Optional[Dict[str, str]] = Field(default=None, description="Optional field names mapped to CSS selectors")
+
+class ClickElementInput(BaseModel):
+    selector: str = Field(description="CSS selector of the element to click")
+
 class BrowserAgent(BaseReactAgent):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.youtube_tool = YouTubeSearchTool()
         self.browser_service = BrowserService()
     
-    def _get_tools(self) -> List[Tool]:
+    def _get_tools(self) -> List[BaseTool]:
         return [
-            Tool(
+            async_tool(
                 name="navigate_to_url",
-                func=self._navigate_to_url,
-                description="Navigate to a specified URL in the browser. Input should be a URL string."
+                coroutine=self._navigate_to_url,
+                args_schema=NavigateInput,
+                description="Navigate to a specified URL in the browser."
             ),
-            Tool(
+            async_tool(
                 name="search_youtube",
-                func=self._search_youtube,
-                description="Search for videos on YouTube and return video links. Input should be a search query string."
+                coroutine=self._search_youtube,
+                args_schema=SearchYouTubeInput,
+                description="Search for videos on YouTube and return video links. Call it once per topic; several searches run in parallel."
             ),
-            Tool(
+            async_tool(
                 name="fill_form",
-                func=self._fill_form,
-                description="Fill a form with the provided data. Input should be a JSON string with form_data (a dictionary of field names and values) and optionally selectors (a dictionary of field names and selectors)."
+                coroutine=self._fill_form,
+                args_schema=FillFormInput,
+                description="Open a web page and fill its form with the provided field values. With no form_data, returns the fields the form has."
             ),
-            Tool(
+            async_tool(
                 name="click_element",
-                func=self._click_element,
-                description="Click on an element in the browser. Input should be a CSS selector string."
+                coroutine=self._click_element,
+                args_schema=ClickElementInput,
+                description="Click on an element in the browser."
             )
         ]
     
@@ -72,8 +90,8 @@ class BrowserAgent(BaseReactAgent):
                 query = query[1:-1]
             
             try:
-                video_ids = self.youtube_tool.run(f"{query},5")
-                logger.info(f"YouTube search returned: {video_ids}")
+                video_urls = await self.youtube_search.search(query)
+                logger.info(f"YouTube search returned: {video_urls}")
             except Exception as e:
                 logger.error(f"YouTube search tool error: {str(e)}")
                 return {
@@ -84,40 +102,6 @@ class BrowserAgent(BaseReactAgent):
                     "video_urls": []
                 }
             
-            if isinstance(video_ids, str):
-                try:
-                    import ast
-                    video_ids = ast.literal_eval(video_ids)
-                except Exception as parse_error:
-                    logger.error(f"Failed to parse video IDs from string: {str(parse_error)}")
-                    video_ids = []
-            
-            if not isinstance(video_ids, list):
-                logger.warning(f"Expected list of video IDs, got {type(video_ids)}")
-                video_ids = []
-            
-            video_urls = []
-            for video_id in video_ids:
-                try:
-                    if isinstance(video_id, str):
-                        if '/shorts/' in video_id:
-                            logger.info(f"Skipping shorts video: {video_id}")
-                            continue
-                            
-                        if 'watch?v=' in video_id:
-                            vid = video_id.split('watch?v=')[1].split('&')[0]
-                        else:
-                            vid = video_id.strip()                            
-                        if not vid or len(vid) != 11:
-                            logger.warning(f"Invalid video ID format: {vid}")
-                            continue
-                            
-                        url = f"https://www.youtube.com/watch?v={vid}"
-                        if url not in video_urls:
-                            video_urls.append(url)
-                except Exception as e:
-                    logger.error(f"Error processing video ID {video_id}: {str(e)}")
-            
             if video_urls:
                 import random
                 
@@ -160,27 +144,17 @@ class BrowserAgent(BaseReactAgent):
                 "video_urls": []
             }
     
-    async def _fill_form(self, input_str: str) -> Dict[str, Any]:
+    async def _fill_form(self,
+                         url: str,
+                         form_data: Optional[Dict[str, str]] = None,
+                         selectors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         try:
-            import json
-            data = json.loads(input_str)
-            url = data.get("url")
-            form_data = data.get("form_data", {})
-            selectors = data.get("selectors", None)
             if not url:
                 return {
                     "status": "error",
                     "message": "No URL provided. Please specify the form URL."
                 }
             
-            await self.browser_service.initialize()
-            nav_success = await self.browser_service.navigate(url)
-            if not nav_success:
-                return {
-                    "status": "error",
-                    "message": f"Failed to navigate to {url}."
-                }
-                
             if not form_data:
                 discovered_fields = await self.browser_service.discover_form_fields(url)
                 if discovered_fields:
@@ -195,7 +169,7 @@ class BrowserAgent(BaseReactAgent):
                         "message": "No form fields found on the page"
                     }
                     
-            fill_success = await self.browser_service.fill_form(form_data, selectors)
+            fill_success = await self.browser_service.fill_form(url, form_data, selectors)
             if not fill_success:
                 discovered_fields = await self.browser_service.discover_form_fields(url)
                 field_names = [f["field_name"] for f in discovered_fields] if discovered_fields else []
@@ -240,6 +214,10 @@ class BrowserAgent(BaseReactAgent):
                 "message": f"Failed to click element: {str(e)}"
             }
     
+    async def fill_form(self, url: str, form_data: Dict[str, str]) -> Dict[str, Any]:
+        """Fill a form with this process's browser, outside an agent run."""
+        return await self._fill_form(url, form_data)
+
     def set_mcp_client(self, mcp_client):
         self.mcp_client = mcp_client 
 
@@ -248,69 +226,30 @@ class BrowserAgent(BaseReactAgent):
         try:
             query = query.strip()
             
+            videos = None
             if self.mcp_client and self.mcp_client.connected:
                 logger.info(f"Using MCP client for YouTube search: {query}")
                 try:
-                    search_params = {"search_query": query}
-                    response = await self.mcp_client.call_tool("search_youtube", search_params)
+                    response = await self.mcp_client.call_tool_json("search_youtube", {"params": {"search_query": query}})
                     logger.info(f"MCP YouTube search response: {response}")
                     
-                    if isinstance(response, dict) and response.get("status") == "success":
-                        return {
-                            "status": "success",
-                            "message": response.get("message", f"I found some videos about {query}"),
-                            "video_urls": response.get("video_urls", []),
-                            "query": query
-                        }
-                    logger.warning(f"MCP YouTube search failed, falling back to internal tool")
+                    if response.get("status") == "success" and "video_urls" in response:
+                        videos = response.get("videos") or [{"url": url} for url in response["video_urls"]]
+                    else:
+                        logger.warning(f"MCP YouTube search failed, falling back to internal search")
+                        record_fallback("youtube_internal_tool", "mcp_failed")
                 except Exception as e:
                     logger.error(f"Error calling MCP YouTube search tool: {str(e)}")
-                    logger.info(f"Falling back to internal YouTube search tool")
+                    logger.info(f"Falling back to internal YouTube search")
+                    record_fallback("youtube_internal_tool", "mcp_error")
             else:
-                logger.info(f"MCP client not available, using internal YouTube search tool")
-            
-            video_ids_str = self.youtube_tool.run(f"{query},5")
-            logger.info(f"Direct YouTube search returned: {video_ids_str}")
-            
-            import ast
-            try:
-                video_ids = ast.literal_eval(video_ids_str) if isinstance(video_ids_str, str) else video_ids_str
-            except Exception as parse_error:
-                logger.error(f"Failed to parse video IDs: {str(parse_error)}")
-                video_ids = []
-                if isinstance(video_ids_str, str):
-                    if '[' in video_ids_str and ']' in video_ids_str:
-                        clean_str = video_ids_str.strip()[1:-1].replace("'", "").replace('"', "")
-                        video_ids = [v.strip() for v in clean_str.split(',')]
+                logger.info(f"MCP client not available, using internal YouTube search")
+                record_fallback("youtube_internal_tool", "mcp_unavailable")
             
-            if not isinstance(video_ids, list):
-                video_ids = [video_ids] if video_ids else []
-            
-            video_urls = []
-            for video_id in video_ids:
-                if not video_id:
-                    continue
-                    
-                try:
-                    if isinstance(video_id, str):
-                        if '/shorts/' in video_id:
-                            logger.info(f"Skipping shorts video: {video_id}")
-                            continue
-                            
-                        if 'watch?v=' in video_id:
-                            vid = video_id.split('watch?v=')[1].split('&')[0]
-                        else:
-                            vid = video_id.strip()
-                            
-                        if not vid or len(vid) != 11:
-                            logger.warning(f"Invalid video ID format: {vid}")
-                            continue
-                            
-                        url = f"https://www.youtube.com/watch?v={vid}"
-                        if url not in video_urls:
-                            video_urls.append(url)
-                except Exception as e:
-                    logger.error(f"Error processing video ID {video_id}: {str(e)}")
+            if videos is None:
+                videos = await self.youtube_search.search_videos(query)
+            video_urls = [video["url"] for video in videos]
+            logger.info(f"Direct YouTube search returned: {video_urls}")
             
             if video_urls:
                 import random
@@ -323,8 +262,11 @@ class BrowserAgent(BaseReactAgent):
                 ]
                 
                 video_descriptions = []
-                for i, url in enumerate(video_urls):
-                    video_descriptions.append(f"Video {i+1}: {url}")
+                for i, video in enumerate(videos):
+                    if video.get("title"):
+                        video_descriptions.append(f"Video {i+1}: {video['title']} - {video['url']}")
+                    else:
+                        video_descriptions.append(f"Video {i+1}: {video['url']}")
                 
                 video_links = "\n".join(video_descriptions)
                 intro = random.choice(intro_phrases)
@@ -337,6 +279,7 @@ class BrowserAgent(BaseReactAgent):
                 "status": "success",
                 "message": message,
                 "video_urls": video_urls,
+                "videos": videos,
                 "query": query
             }
             
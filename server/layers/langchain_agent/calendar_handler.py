@@ -2,10 +2,11 @@ import logging
 import datetime
 import json
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dateutil import parser
 from ..mcp_connector.alt_calendar_service import SimpleCalendarService
 from .event_extraction_tool import extract_event_details
+from runtime.metrics import record_fallback
 
 logger = logging.getLogger("langchain_agent.calendar_handler")
 
@@ -36,8 +37,9 @@ async def extract_date_time_from_command(command: str) -> tuple:
     
     return start_time, end_time
 
-async def use_alternative_calendar_service(title, start_time, end_time, description=None):
+async def use_alternative_calendar_service(title, start_time, end_time, description=None, reason="mcp_error"):
     logger.info(f"Using alternative calendar service for event: {title}")
+    record_fallback("calendar_simple_service", reason)
     
     result = await SimpleCalendarService.schedule_event(
         title=title,
@@ -59,10 +61,11 @@ async def use_alternative_calendar_service(title, start_time, end_time, descript
             "result": f"I couldn't schedule your event. {result.get('message', 'Please check your Google Apps Script configuration.')}"
         }
 
-async def handle_calendar_intent(command: str, mcp_client=None) -> Dict[str, Any]:
+async def handle_calendar_intent(command: str, mcp_client=None, event_details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     logger.info(f"Handling calendar intent for command: {command}")
     try:
-        event_details = await extract_event_details(command)
+        if event_details is None:
+            event_details = await extract_event_details(command)
         if event_details.get("needs_clarification"):
             logger.warning(f"Clarification needed: {event_details['needs_clarification']}")
             return {
@@ -87,7 +90,7 @@ async def handle_calendar_intent(command: str, mcp_client=None) -> Dict[str, Any
         if not mcp_client:
             logger.error("MCP client not available")
             logger.info("Falling back to alternative calendar service")
-            return await use_alternative_calendar_service(title, start_time_str, end_time_str, description)
+            return await use_alternative_calendar_service(title, start_time_str, end_time_str, description, reason="mcp_unavailable")
 
         if not mcp_client.connected:
             logger.error("MCP client not connected")
@@ -99,11 +102,11 @@ async def handle_calendar_intent(command: str, mcp_client=None) -> Dict[str, Any
                 else:
                     logger.error("Failed to reconnect MCP client")
                     logger.info("Falling back to alternative calendar service")
-                    return await use_alternative_calendar_service(title, start_time_str, end_time_str, description)
+                    return await use_alternative_calendar_service(title, start_time_str, end_time_str, description, reason="mcp_disconnected")
             except Exception as e:
                 logger.error(f"Error reconnecting MCP client: {str(e)}")
                 logger.info("Falling back to alternative calendar service")
-                return await use_alternative_calendar_service(title, start_time_str, end_time_str, description)
+                return await use_alternative_calendar_service(title, start_time_str, end_time_str, description, reason="mcp_disconnected")
 
         logger.info(f"Scheduling event with title: {title}, start: {start_time_str}, end: {end_time_str}")
         event_params = {
@@ -138,7 +141,7 @@ async def handle_calendar_intent(command: str, mcp_client=None) -> Dict[str, Any
                 }
             else:
                 logger.info("MCP tool call didn't return success, falling back to alternative calendar service")
-                return await use_alternative_calendar_service(title, start_time_str, end_time_str, description)
+                return await use_alternative_calendar_service(title, start_time_str, end_time_str, description, reason="mcp_failed")
         except Exception as e:
             logger.error(f"Error calling MCP calendar tool: {str(e)}")
             logger.info("Falling back to alternative calendar service")
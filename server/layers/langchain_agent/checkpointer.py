@@ -0,0 +1,238 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from runtime.metrics import registry, Counter, Gauge
+from .sqlite_checkpointer import SQLiteCheckpointSaver
+
+logger = logging.getLogger("langchain_agent.checkpointer")
+
+ALRIS_CHECKPOINTER = os.getenv("ALRIS_CHECKPOINTER", "bounded")
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+CHECKPOINT_IDLE_TTL_SECONDS = float(os.getenv("CHECKPOINT_IDLE_TTL_SECONDS", "1800"))
+CHECKPOINT_MAX_THREAD_BYTES = int(os.getenv("CHECKPOINT_MAX_THREAD_BYTES", str(2 * 1024 * 1024)))
+
+CHECKPOINT_THREADS = registry.register(Gauge(
+    "alris_checkpoint_threads",
+    "Agent conversation threads currently held by the checkpointer."
+))
+CHECKPOINT_BYTES = registry.register(Gauge(
+    "alris_checkpoint_bytes",
+    "Serialized bytes of checkpoints, writes and channel values retained by the checkpointer."
+))
+CHECKPOINT_EVICTIONS = registry.register(Counter(
+    "alris_checkpoint_evictions_total",
+    "Threads dropped or pruned by the checkpointer.",
+    ("reason",)
+))
+
+def _typed_size(typed: Tuple[str, bytes]) -> int:
+    return len(typed[1]) if typed and typed[1] else 0
+
+class _ThreadUsage:
+    __slots__ = ("bytes", "blob_keys", "write_keys", "write_bytes")
+
+    def __init__(self):
+        self.bytes = 0
+        self.blob_keys: Set[Tuple[str, str, str, Any]] = set()
+        self.write_keys: Set[Tuple[str, str, str]] = set()
+        self.write_bytes: Dict[Tuple[str, str, str], int] = {}
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver that forgets threads instead of keeping every conversation forever.
+
+    Threads are kept in least-recently-used order. A thread is dropped once it has been
+    idle for ``idle_ttl_seconds`` or when more than ``max_threads`` are held. A thread that
+    grows past ``max_thread_bytes`` keeps only its latest checkpoint, and is dropped if
+    even that is over the cap.
+    """
+
+    def __init__(self,
+                 max_threads: int = CHECKPOINT_MAX_THREADS,
+                 idle_ttl_seconds: float = CHECKPOINT_IDLE_TTL_SECONDS,
+                 max_thread_bytes: int = CHECKPOINT_MAX_THREAD_BYTES,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.max_threads = max(1, max_threads)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_thread_bytes = max_thread_bytes
+        self._lock = threading.RLock()
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._usage: Dict[str, _ThreadUsage] = {}
+        self._total_bytes = 0
+        self.evictions: Dict[str, int] = {"idle": 0, "lru": 0, "size": 0, "pruned": 0}
+
+    def _touch(self, thread_id: str):
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _add_bytes(self, usage: _ThreadUsage, delta: int):
+        usage.bytes += delta
+        self._total_bytes += delta
+
+    def _record_eviction(self, reason: str):
+        self.evictions[reason] += 1
+        CHECKPOINT_EVICTIONS.inc(reason=reason)
+
+    def _update_gauges(self):
+        CHECKPOINT_THREADS.set(len(self._usage))
+        CHECKPOINT_BYTES.set(self._total_bytes)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            result = super().get_tuple(config)
+            if thread_id in self._usage:
+                self._touch(thread_id)
+            else:
+                # MemorySaver's defaultdict creates an entry for every thread it is asked about.
+                self.storage.pop(thread_id, None)
+            return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            usage = self._usage.setdefault(thread_id, _ThreadUsage())
+            previous = {
+                key: _typed_size(self.blobs[key])
+                for key in ((thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items())
+                if key in self.blobs
+            }
+            saved = super().put(config, checkpoint, metadata, new_versions)
+
+            delta = -sum(previous.values())
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                usage.blob_keys.add(key)
+                delta += _typed_size(self.blobs[key])
+            entry = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            delta += _typed_size(entry[0]) + _typed_size(entry[1])
+            self._add_bytes(usage, delta)
+
+            self._touch(thread_id)
+            if usage.bytes > self.max_thread_bytes:
+                self._shrink(thread_id)
+            self._evict()
+            self._update_gauges()
+            return saved
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        outer_key = (thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"])
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            usage = self._usage.setdefault(thread_id, _ThreadUsage())
+            size = sum(_typed_size(write[2]) for write in self.writes[outer_key].values())
+            self._add_bytes(usage, size - usage.write_bytes.get(outer_key, 0))
+            usage.write_bytes[outer_key] = size
+            usage.write_keys.add(outer_key)
+            self._touch(thread_id)
+            self._update_gauges()
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            self._drop(thread_id)
+            self._update_gauges()
+
+    def _drop(self, thread_id: str):
+        """Remove a thread using its tracked keys rather than scanning every blob and write."""
+        usage = self._usage.pop(thread_id, None)
+        self._last_access.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        if usage is None:
+            return
+        for key in usage.write_keys:
+            self.writes.pop(key, None)
+        for key in usage.blob_keys:
+            self.blobs.pop(key, None)
+        self._total_bytes -= usage.bytes
+
+    def _shrink(self, thread_id: str):
+        """Keep only the latest checkpoint per namespace; drop the thread if it is still too large."""
+        usage = self._usage[thread_id]
+        before = usage.bytes
+        for checkpoint_ns, checkpoints in self.storage[thread_id].items():
+            if not checkpoints:
+                continue
+            latest_id = max(checkpoints)
+            for checkpoint_id in [cid for cid in checkpoints if cid != latest_id]:
+                entry = checkpoints.pop(checkpoint_id)
+                self._add_bytes(usage, -(_typed_size(entry[0]) + _typed_size(entry[1])))
+                write_key = (thread_id, checkpoint_ns, checkpoint_id)
+                self.writes.pop(write_key, None)
+                usage.write_keys.discard(write_key)
+                self._add_bytes(usage, -usage.write_bytes.pop(write_key, 0))
+
+            channel_versions = self.serde.loads_typed(checkpoints[latest_id][0])["channel_versions"]
+            stale = [
+                key for key in usage.blob_keys
+                if key[1] == checkpoint_ns and channel_versions.get(key[2]) != key[3]
+            ]
+            for key in stale:
+                usage.blob_keys.discard(key)
+                blob = self.blobs.pop(key, None)
+                if blob is not None:
+                    self._add_bytes(usage, -_typed_size(blob))
+
+        if usage.bytes > self.max_thread_bytes:
+            logger.warning(
+                f"Dropping thread {thread_id}: latest checkpoint is {usage.bytes} bytes, "
+                f"over the {self.max_thread_bytes} byte cap"
+            )
+            self._drop(thread_id)
+            self._record_eviction("size")
+        else:
+            logger.debug(f"Pruned thread {thread_id} from {before} to {usage.bytes} bytes")
+            self._record_eviction("pruned")
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        while self._last_access:
+            thread_id, last_access = next(iter(self._last_access.items()))
+            if last_access < cutoff:
+                reason = "idle"
+            elif len(self._last_access) > self.max_threads:
+                reason = "lru"
+            else:
+                break
+            logger.debug(f"Evicting checkpoint thread {thread_id} ({reason})")
+            self._drop(thread_id)
+            self._record_eviction(reason)
+
+    def evict_expired(self):
+        with self._lock:
+            self._evict()
+            self._update_gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        self.evict_expired()
+        with self._lock:
+            return {
+                "type": "bounded",
+                "threads": len(self._usage),
+                "bytes": self._total_bytes,
+                "max_threads": self.max_threads,
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "max_thread_bytes": self.max_thread_bytes,
+                "evictions": dict(self.evictions)
+            }
+
+def create_checkpointer(kind: Optional[str] = None) -> BaseCheckpointSaver:
+    """Build the agent checkpointer selected by ALRIS_CHECKPOINTER ("bounded", "memory" or "sqlite")."""
+    kind = (kind or ALRIS_CHECKPOINTER).lower()
+    if kind == "sqlite":
+        return SQLiteCheckpointSaver()
+    if kind == "memory":
+        logger.warning("Using an unbounded MemorySaver; agent threads are never evicted")
+        return MemorySaver()
+    if kind != "bounded":
+        logger.warning(f"Unknown ALRIS_CHECKPOINTER '{kind}', using the bounded in-memory checkpointer")
+    return BoundedMemorySaver()
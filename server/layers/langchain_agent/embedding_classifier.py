@@ -0,0 +1,132 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger("langchain_agent.embedding_classifier")
+
+INTENT_EMBEDDING_MODEL = os.getenv("INTENT_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+INTENT_EMBEDDING_NEIGHBORS = int(os.getenv("INTENT_EMBEDDING_NEIGHBORS", "5"))
+
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "fill_form": [
+        "Sign me up for the newsletter on https://example.com/newsletter with my name John Doe",
+        "Register for the event at https://event.com/register with email jane@sample.com",
+        "Fill the registration form on www.example.com with my details",
+        "Apply for the job at https://careers.acme.com/apply using my email",
+        "Submit the contact form on example.org with my name and phone number",
+        "Fill out the survey at https://forms.gle/abc123",
+        "Enroll me in the course at https://school.example.com/enroll",
+        "Subscribe to the mailing list on www.blog.com with dan@example.com",
+    ],
+    "browser": [
+        "Open google.com",
+        "Go to https://news.ycombinator.com",
+        "Navigate to the GitHub homepage",
+        "Click the login button on the page",
+        "Open the Wikipedia article about black holes",
+        "Visit amazon.com and search for headphones",
+        "Take me to my Twitter profile",
+        "Browse to the Python documentation",
+    ],
+    "email": [
+        "Send an email to bob@example.com saying the meeting is moved",
+        "Email my manager that I will be late today",
+        "Write an email to alice@company.com about the invoice",
+        "Reply to Sarah's email and say thanks",
+        "Send a message to john@example.com with the report attached",
+        "Draft an email to the team about the release",
+        "Mail the updated contract to legal@firm.com",
+        "Forward the receipt to accounts@example.com",
+    ],
+    "calendar": [
+        "Schedule a meeting with John tomorrow at 3pm",
+        "I plan on going for a wedding this Saturday by 10am",
+        "Remind me to call Sarah on Friday at noon",
+        "Add a dentist appointment on December 15th at 10am",
+        "Create an event called Team Standup for today at 9am",
+        "Book a call with the client next Monday at 2:30pm",
+        "Put a lunch with Mike on my calendar for Thursday",
+        "Set up a one hour sync with design next week",
+    ],
+    "general": [
+        "What is the capital of France?",
+        "Tell me a joke",
+        "How does photosynthesis work?",
+        "Explain recursion in simple terms",
+        "What's the difference between TCP and UDP?",
+        "Hello, how are you?",
+        "Summarize the plot of Hamlet",
+        "Give me some tips for better sleep",
+    ],
+}
+
+class EmbeddingIntentClassifier:
+    """Nearest-neighbour intent classifier over a labeled example bank, embedded with a local model.
+
+    Requires the optional ``numpy`` and ``sentence-transformers`` packages.
+    """
+
+    def __init__(self,
+                 intents: List[str],
+                 model_name: str = INTENT_EMBEDDING_MODEL,
+                 examples: Optional[Dict[str, List[str]]] = None,
+                 neighbors: int = INTENT_EMBEDDING_NEIGHBORS):
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        self._np = np
+        self.intents = list(intents)
+        self.model = SentenceTransformer(model_name)
+
+        example_bank = examples or INTENT_EXAMPLES
+        texts, labels = [], []
+        for label, intent in enumerate(self.intents):
+            for text in example_bank.get(intent, []):
+                texts.append(text)
+                labels.append(label)
+        if not texts:
+            raise ValueError("Example bank has no examples for the configured intents")
+
+        self._example_matrix = self._embed(texts)
+        self._example_labels = np.asarray(labels)
+        self.neighbors = max(1, min(neighbors, len(texts)))
+        logger.info(f"Embedding intent classifier ready with {len(texts)} examples using {model_name}")
+
+    def _embed(self, texts: List[str]):
+        vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return vectors.astype(self._np.float32, copy=False)
+
+    def classify(self, command: str) -> Dict[str, Any]:
+        return self.classify_batch([command])[0]
+
+    def classify_batch(self, commands: List[str]) -> List[Dict[str, Any]]:
+        """Classify every command with a single similarity matrix multiply against the example bank."""
+        np = self._np
+        if not commands:
+            return []
+
+        similarities = self._embed(commands) @ self._example_matrix.T
+        k = self.neighbors
+        rows = np.arange(len(commands))[:, None]
+        top_idx = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_sim = np.clip(similarities[rows, top_idx], 0.0, None)
+        top_labels = self._example_labels[top_idx]
+
+        votes = np.zeros((len(commands), len(self.intents)), dtype=np.float32)
+        np.add.at(votes, (np.broadcast_to(rows, top_labels.shape), top_labels), top_sim)
+        totals = votes.sum(axis=1, keepdims=True)
+        probs = np.divide(votes, totals, out=np.zeros_like(votes), where=totals > 0)
+
+        ranked = np.argsort(-probs, axis=1)
+        best, second = ranked[:, 0], ranked[:, 1]
+        confidence = probs[rows[:, 0], best]
+        margin = confidence - probs[rows[:, 0], second]
+
+        return [
+            {
+                "intent": self.intents[int(best[i])],
+                "confidence": float(confidence[i]),
+                "margin": float(margin[i]),
+            }
+            for i in range(len(commands))
+        ]
@@ -1,14 +1,12 @@
 import os
 import json
 from datetime import datetime
-from langchain_google_genai import ChatGoogleGenerativeAI
+from .llm import create_llm
+from runtime.metrics import stage
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 
-llm = ChatGoogleGenerativeAI(
-    model=os.getenv('GEMINI_MODEL'),
-    temperature=0.5
-)
+llm = create_llm(temperature=0.5)
 
 CURRENT_DATE = datetime.now().strftime("%Y-%m-%d")
 
@@ -70,10 +68,11 @@ Output:
 event_extraction_chain = LLMChain(llm=llm, prompt=prompt)
 
 async def extract_event_details(user_command: str) -> dict:
-    response = await event_extraction_chain.arun(
-        user_command=user_command,
-        current_date=CURRENT_DATE
-    )
+    with stage("event_extraction"):
+        response = await event_extraction_chain.arun(
+            user_command=user_command,
+            current_date=CURRENT_DATE
+        )
     try:
         return json.loads(response)
     except Exception:
@@ -1,15 +1,13 @@
 import os
 import json
-from langchain_google_genai import ChatGoogleGenerativeAI
+from .llm import create_llm
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 import re
 from ..mcp_connector.alt_form_service import SimpleFormService
+from runtime.metrics import stage
 
-llm = ChatGoogleGenerativeAI(
-    model=os.getenv('GEMINI_MODEL'),
-    temperature=0.5
-)
+llm = create_llm(temperature=0.5)
 
 DEFAULTS = {
     "country": "Nigeria",
@@ -74,10 +72,26 @@ Output:
 
 form_extraction_chain = LLMChain(llm=llm, prompt=prompt)
 
+URL_PATTERN = r'https?://\S+|www\.\S+'
+
+async def complete_form_extraction(user_command: str, result: dict) -> dict:
+    """Apply the post-processing shared by every extraction path: URL fallback and the form service run."""
+    if isinstance(result, dict):
+        if not result.get("url"):
+            urls = re.findall(URL_PATTERN, user_command)
+            if urls:
+                result["url"] = urls[0]
+            
+        if result.get("url"):
+            if not result.get("form_data"):
+                result["form_data"] = {}
+            form_service = SimpleFormService()
+            form_result = await form_service.fill_form(result["url"], result["form_data"])
+            result.update(form_result)
+            
+    return result
+
 async def extract_form_fields(user_command: str) -> dict:
-    url_pattern = r'https?://\S+|www\.\S+'
-    urls = re.findall(url_pattern, user_command)
-    extracted_url = urls[0] if urls else None
     defaults_str = json.dumps(DEFAULTS)
     input_dict = {
         "user_command": user_command,
@@ -85,7 +99,8 @@ async def extract_form_fields(user_command: str) -> dict:
     }
     print("Calling form_extraction_chain.ainvoke with:", input_dict)
     try:
-        response = await form_extraction_chain.ainvoke(input_dict)
+        with stage("form_extraction"):
+            response = await form_extraction_chain.ainvoke(input_dict)
     except ValueError as ve:
         import traceback
         print("ValueError in form_extraction_chain.ainvoke:", ve)
@@ -125,18 +140,7 @@ async def extract_form_fields(user_command: str) -> dict:
                 "raw_response": str(response)
             }
             
-        if isinstance(result, dict):
-            if not result.get("url") and extracted_url:
-                result["url"] = extracted_url
-                
-            if result.get("url"):
-                if not result.get("form_data"):
-                    result["form_data"] = {}
-                form_service = SimpleFormService()
-                form_result = await form_service.fill_form(result["url"], result["form_data"])
-                result.update(form_result)
-                
-        return result
+        return await complete_form_extraction(user_command, result)
     except Exception:
         return {
             "status": "error",
@@ -0,0 +1,162 @@
+import os
+import logging
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.prebuilt.chat_agent_executor import AgentState
+
+from runtime.metrics import registry, Counter, Histogram, record_fallback, stage
+
+logger = logging.getLogger("langchain_agent.history")
+
+AGENT_HISTORY_MAX_TOKENS = int(os.getenv("AGENT_HISTORY_MAX_TOKENS", "6000"))
+AGENT_HISTORY_KEEP_TOKENS = int(os.getenv("AGENT_HISTORY_KEEP_TOKENS", "2000"))
+AGENT_HISTORY_SUMMARY_INPUT_CHARS = int(os.getenv("AGENT_HISTORY_SUMMARY_INPUT_CHARS", "800"))
+
+MEMORY_HEADER = "Summary of the earlier conversation with this user:"
+
+SUMMARY_PROMPT = """You maintain the long-term memory of an assistant's conversation with a user.
+Update the existing summary with the new conversation turns below. Keep names, dates, times,
+URLs, email addresses, decisions and any tasks that are still open; drop greetings and small talk.
+Answer with the updated summary only, in at most 200 words.
+
+Existing summary:
+{summary}
+
+New conversation turns:
+{conversation}"""
+
+HISTORY_COMPACTIONS = registry.register(Counter(
+    "alris_history_compactions_total",
+    "Agent threads whose older turns were summarized to stay within the token budget."
+))
+PROMPT_TOKENS = registry.register(Histogram(
+    "alris_agent_prompt_tokens",
+    "Approximate prompt tokens (system prompt, memory summary and history) at the start of an agent turn.",
+    ("phase",),
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+))
+
+class AgentMemoryState(AgentState):
+    """Agent state plus the running summary of turns dropped from ``messages``."""
+
+    summary: str
+
+def build_system_message(system_prompt: str, summary: Optional[str]) -> SystemMessage:
+    if summary:
+        return SystemMessage(content=f"{system_prompt}\n\n{MEMORY_HEADER}\n{summary}")
+    return SystemMessage(content=system_prompt)
+
+def model_messages(system_prompt: str, state: Dict[str, Any]) -> List[BaseMessage]:
+    """Messages sent to the model: one system message, then the thread's history.
+
+    System messages stored in the history by older versions of the agent are skipped.
+    """
+    history = [m for m in state.get("messages", []) if not isinstance(m, SystemMessage)]
+    return [build_system_message(system_prompt, state.get("summary"))] + history
+
+def _render(message: BaseMessage, limit: int) -> str:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        calls = ", ".join(f"{call['name']}({call['args']})" for call in message.tool_calls)
+        content = f"{content} [called {calls}]".strip()
+    if len(content) > limit:
+        content = content[:limit] + "..."
+    if isinstance(message, HumanMessage):
+        return f"User: {content}"
+    if isinstance(message, ToolMessage):
+        return f"Tool {message.name or ''}: {content}".replace("  ", " ")
+    return f"Assistant: {content}"
+
+class HistoryPolicy:
+    """Sliding token budget for an agent thread.
+
+    Once a thread's history exceeds ``max_tokens``, every turn except the most recent
+    ``keep_tokens`` worth is folded into the thread's summary and removed from its
+    checkpointed messages.
+    """
+
+    def __init__(self,
+                 max_tokens: int = AGENT_HISTORY_MAX_TOKENS,
+                 keep_tokens: int = AGENT_HISTORY_KEEP_TOKENS,
+                 summary_input_chars: int = AGENT_HISTORY_SUMMARY_INPUT_CHARS):
+        self.max_tokens = max_tokens
+        self.keep_tokens = min(keep_tokens, max_tokens)
+        self.summary_input_chars = summary_input_chars
+
+    @staticmethod
+    def count(messages: Sequence[BaseMessage]) -> int:
+        return count_tokens_approximately(messages)
+
+    def split(self, messages: Sequence[BaseMessage]) -> int:
+        """Index of the first message to keep: the earliest user turn whose tail fits in keep_tokens.
+
+        Cutting only at user messages keeps tool calls together with their results. The latest
+        turn is always kept, even when it alone is over the budget.
+        """
+        turn_starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if not turn_starts:
+            return 0
+        cut = turn_starts[-1]
+        for start in reversed(turn_starts[:-1]):
+            if self.count(messages[start:]) > self.keep_tokens:
+                break
+            cut = start
+        return cut
+
+    async def compact(self, llm, system_prompt: str, state: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Return the state update that compacts a thread (or None) and a token report."""
+        messages = state.get("messages", [])
+        summary = state.get("summary")
+        tokens_before = self.count(model_messages(system_prompt, state))
+        report = {"compacted": False, "tokens_before": tokens_before, "tokens_after": tokens_before}
+        PROMPT_TOKENS.observe(tokens_before, phase="before")
+
+        history = [m for m in messages if not isinstance(m, SystemMessage)]
+        if self.count(history) <= self.max_tokens:
+            PROMPT_TOKENS.observe(tokens_before, phase="after")
+            return None, report
+
+        cut = self.split(history)
+        older, recent = history[:cut], history[cut:]
+        if not older:
+            PROMPT_TOKENS.observe(tokens_before, phase="after")
+            return None, report
+
+        conversation = "\n".join(_render(m, self.summary_input_chars) for m in older)
+        try:
+            with stage("history_summary"):
+                response = await llm.ainvoke([HumanMessage(content=SUMMARY_PROMPT.format(
+                    summary=summary or "(none yet)",
+                    conversation=conversation
+                ))])
+            new_summary = response.content if isinstance(response.content, str) else str(response.content)
+        except Exception as e:
+            logger.error(f"Failed to summarize conversation history: {str(e)}")
+            record_fallback("history_summary", type(e).__name__)
+            PROMPT_TOKENS.observe(tokens_before, phase="after")
+            return None, report
+
+        removed = [m for m in messages if isinstance(m, SystemMessage)] + older
+        update = {
+            "messages": [RemoveMessage(id=m.id) for m in removed if m.id],
+            "summary": new_summary.strip()
+        }
+        tokens_after = self.count([build_system_message(system_prompt, update["summary"])] + recent)
+        report.update({
+            "compacted": True,
+            "tokens_after": tokens_after,
+            "summarized_messages": len(older)
+        })
+        HISTORY_COMPACTIONS.inc()
+        PROMPT_TOKENS.observe(tokens_after, phase="after")
+        logger.info(f"Compacted {len(older)} messages into the thread summary: {tokens_before} -> {tokens_after} tokens")
+        return update, report
@@ -0,0 +1,169 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger("langchain_agent.intent_cache")
+
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "1024"))
+INTENT_CACHE_TTL_SECONDS = float(os.getenv("INTENT_CACHE_TTL_SECONDS", "3600"))
+INTENT_CACHE_DB = os.getenv("INTENT_CACHE_DB")
+INTENT_CACHE_FLUSH_INTERVAL_MS = float(os.getenv("INTENT_CACHE_FLUSH_INTERVAL_MS", "500"))
+
+_MASKS = [
+    (re.compile(r"https?://\S+|www\.\S+"), " <url> "),
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), " <email> "),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}(?:t[\d:]+)?\b|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"), " <date> "),
+    (re.compile(r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b|\bnoon\b|\bmidnight\b"), " <time> "),
+    (re.compile(
+        r"\b(?:today|tonight|tomorrow|yesterday"
+        r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+        r"|january|february|march|april|june|july|august|september|october|november|december"
+        r"|jan|feb|mar|apr|jun|jul|aug|sept?|oct|nov|dec)\b"
+    ), " <date> "),
+    (re.compile(r"\b\d+(?:st|nd|rd|th)?\b"), " <num> "),
+    (re.compile(r"[^\w<>\s]"), " "),
+    (re.compile(r"\s+"), " "),
+]
+
+def normalize_command(command: str) -> str:
+    """Reduce a command to a cache key: lowercase, punctuation and whitespace collapsed, values masked."""
+    normalized = command.lower()
+    for pattern, replacement in _MASKS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized.strip()
+
+class IntentCache:
+    """Bounded LRU cache of classified intents with a TTL and optional SQLite persistence.
+
+    Persisted changes are buffered and written by a background thread every
+    ``flush_interval_ms`` in one transaction, so ``set`` never waits on the disk.
+    """
+
+    def __init__(self,
+                 max_size: int = INTENT_CACHE_SIZE,
+                 ttl_seconds: float = INTENT_CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = INTENT_CACHE_DB,
+                 flush_interval_ms: float = INTENT_CACHE_FLUSH_INTERVAL_MS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = max(0.001, flush_interval_ms / 1000)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        # Key -> (intent, stored_at) to upsert, or None to delete, waiting for the next flush.
+        self._pending: Dict[str, Optional[Tuple[str, float]]] = {}
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if db_path:
+            self._open_db(db_path)
+        if self._db is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="intent-cache-flusher", daemon=True)
+            self._flusher.start()
+
+    def _open_db(self, db_path: str):
+        try:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS intent_cache ("
+                "key TEXT PRIMARY KEY, intent TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            cutoff = time.time() - self.ttl_seconds
+            self._db.execute("DELETE FROM intent_cache WHERE stored_at < ?", (cutoff,))
+            rows = self._db.execute(
+                "SELECT key, intent, stored_at FROM intent_cache ORDER BY stored_at DESC LIMIT ?",
+                (self.max_size,)
+            ).fetchall()
+            self._db.commit()
+            for key, intent, stored_at in reversed(rows):
+                self._entries[key] = (intent, stored_at)
+            logger.info(f"Loaded {len(rows)} cached intents from {db_path}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open intent cache database {db_path}: {str(e)}")
+            self._db = None
+
+    def get(self, command: str) -> Optional[str]:
+        key = normalize_command(command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            intent, stored_at = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return intent
+
+    def set(self, command: str, intent: str):
+        key = normalize_command(command)
+        stored_at = time.time()
+        with self._lock:
+            self._entries[key] = (intent, stored_at)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_size:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+            if self._db is not None:
+                self._pending[key] = (intent, stored_at)
+                for evicted_key in evicted:
+                    self._pending[evicted_key] = None
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write buffered changes to the database in one transaction."""
+        with self._db_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending or self._db is None:
+                return
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO intent_cache (key, intent, stored_at) VALUES (?, ?, ?)",
+                    [(key, *entry) for key, entry in pending.items() if entry is not None]
+                )
+                self._db.executemany(
+                    "DELETE FROM intent_cache WHERE key = ?",
+                    [(key,) for key, entry in pending.items() if entry is None]
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist {len(pending)} cached intents: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None
+        }
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
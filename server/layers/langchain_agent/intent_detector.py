@@ -1,13 +1,34 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from .llm import create_llm
 from langchain_core.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from .intent_schema import IntentResult
+from .intent_schema import IntentResult, IntentWithSlots
+from .intent_cache import IntentCache, INTENT_CACHE_SIZE
+from .form_extraction_tool import DEFAULTS as FORM_DEFAULTS
+from runtime.metrics import record_fallback
+
+logger = logging.getLogger("langchain_agent.intent_detector")
+
+INTENT_MAX_CONCURRENCY = int(os.getenv("INTENT_MAX_CONCURRENCY", "16"))
+INTENT_TIMEOUT_SECONDS = float(os.getenv("INTENT_TIMEOUT_SECONDS", "15"))
+INTENT_CLASSIFIER_BACKEND = os.getenv("INTENT_CLASSIFIER_BACKEND", "llm").lower()
+INTENT_EMBEDDING_MIN_MARGIN = float(os.getenv("INTENT_EMBEDDING_MIN_MARGIN", "0.35"))
+FALLBACK_INTENT = "general"
 
 class IntentDetector:
-    def __init__(self):
+    def __init__(self,
+                 max_concurrency: int = INTENT_MAX_CONCURRENCY,
+                 timeout: float = INTENT_TIMEOUT_SECONDS,
+                 backend: str = INTENT_CLASSIFIER_BACKEND,
+                 min_margin: float = INTENT_EMBEDDING_MIN_MARGIN,
+                 cache: Optional[IntentCache] = None):
         self.intents = ["fill_form", "browser", "email", "calendar", "general"]
-        self.llm = ChatGoogleGenerativeAI(model=os.getenv('GEMINI_MODEL'), temperature=0)
+        self.llm = create_llm(temperature=0)
         self.parser = PydanticOutputParser(pydantic_object=IntentResult)
         self.prompt = PromptTemplate(
             template=(
@@ -20,13 +41,170 @@ class IntentDetector:
                 "User input: {user_input}\n"
             )
         )
+        self.slots_llm = self.llm.with_structured_output(IntentWithSlots)
+        self.slots_prompt = PromptTemplate(
+            template=(
+                "You are an intent detection and slot extraction assistant. The current date is {current_date}.\n"
+                "Classify the user input into one of these intents: {intents}.\n"
+                "If the user is asking to fill, register, sign up, submit, or apply via a web form, classify as 'fill_form'.\n"
+                "If the user wants to schedule, book, or be reminded of something at a time, classify as 'calendar'.\n"
+                "If none fit, return 'general'.\n\n"
+                "When the intent is 'calendar', also fill 'event':\n"
+                "- title, start_time and end_time (ISO 8601, e.g. 2025-05-31T10:00:00), description or null\n"
+                "- Interpret relative dates like 'tomorrow' or 'this Saturday' relative to {current_date}\n"
+                "- If only a start time is given, end one hour later unless the event type suggests longer (e.g. 4 hours for a wedding)\n"
+                "- If a field is ambiguous or missing, set it to null and explain in needs_clarification\n\n"
+                "When the intent is 'fill_form', also fill 'form':\n"
+                "- url: the form URL from the input (https://, www. or a domain name), or null\n"
+                "- form_data: every value the user explicitly provided (name, email, phone, ...); use these defaults for unspecified fields: {defaults}\n"
+                "- If neither name nor email is present, explain in needs_clarification\n\n"
+                "Leave 'event' and 'form' null for other intents.\n"
+                "User input: {user_input}\n"
+            )
+        )
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.min_margin = min_margin
+        self.embedding_classifier = None
+        if backend == "embedding":
+            try:
+                from .embedding_classifier import EmbeddingIntentClassifier
+                self.embedding_classifier = EmbeddingIntentClassifier(self.intents)
+            except ImportError as e:
+                logger.warning(f"Embedding intent backend unavailable ({e}), using the LLM classifier only")
+            except Exception as e:
+                # A failed model download or load must not take the server down.
+                logger.error(f"Failed to load the embedding intent model ({e}), using the LLM classifier only", exc_info=True)
+        self.cache = cache if cache is not None else (IntentCache() if INTENT_CACHE_SIZE > 0 else None)
 
-    def detect_intent(self, command: str) -> str:
-        prompt = self.prompt.format(
+    def _build_prompt(self, command: str) -> str:
+        return self.prompt.format(
             intents=", ".join(self.intents),
             user_input=command,
             format_instructions=self.parser.get_format_instructions()
         )
-        result = self.llm.invoke(prompt)
-        parsed = self.parser.parse(result.content)
-        return parsed.intent
\ No newline at end of file
+
+    def _parse_intent(self, content: str) -> str:
+        parsed = self.parser.parse(content)
+        return parsed.intent
+
+    def detect_intent(self, command: str) -> str:
+        cached = self.cache.get(command) if self.cache else None
+        if cached:
+            return cached
+        result = self.llm.invoke(self._build_prompt(command))
+        intent = self._parse_intent(result.content)
+        if self.cache:
+            self.cache.set(command, intent)
+        return intent
+
+    def _confident(self, local_result: Dict[str, Any]) -> bool:
+        return local_result["margin"] >= self.min_margin
+
+    async def adetect_intent(self, command: str) -> str:
+        cached = self.cache.get(command) if self.cache else None
+        if cached:
+            logger.debug(f"Intent cache hit for command: {command}")
+            return cached
+        intent = await self._classify(command)
+        if intent is None:
+            return FALLBACK_INTENT
+        if self.cache:
+            self.cache.set(command, intent)
+        return intent
+
+    async def _classify(self, command: str) -> Optional[str]:
+        if self.embedding_classifier:
+            loop = asyncio.get_running_loop()
+            local_result = await loop.run_in_executor(None, self.embedding_classifier.classify, command)
+            if self._confident(local_result):
+                logger.debug(f"Embedding classifier chose '{local_result['intent']}' (margin {local_result['margin']:.2f})")
+                return local_result["intent"]
+            logger.debug(f"Embedding margin {local_result['margin']:.2f} below {self.min_margin}, escalating to LLM")
+            record_fallback("intent_embedding_to_llm", "low_margin")
+        return await self._adetect_intent_llm(command)
+
+    async def adetect_intents(self, commands: List[str]) -> List[str]:
+        """Classify many commands, escalating only the low-margin ones to the LLM."""
+        intents: List[Optional[str]] = [self.cache.get(c) if self.cache else None for c in commands]
+        pending = [i for i, intent in enumerate(intents) if intent is None]
+        computed = list(pending)
+
+        if pending and self.embedding_classifier:
+            loop = asyncio.get_running_loop()
+            local_results = await loop.run_in_executor(
+                None, self.embedding_classifier.classify_batch, [commands[i] for i in pending]
+            )
+            for i, local_result in zip(pending, local_results):
+                if self._confident(local_result):
+                    intents[i] = local_result["intent"]
+            pending = [i for i in pending if intents[i] is None]
+            for _ in pending:
+                record_fallback("intent_embedding_to_llm", "low_margin")
+
+        escalated = await asyncio.gather(*(self._adetect_intent_llm(commands[i]) for i in pending))
+        for i, intent in zip(pending, escalated):
+            intents[i] = intent
+
+        if self.cache:
+            for i in computed:
+                if intents[i] is not None:
+                    self.cache.set(commands[i], intents[i])
+        return [intent or FALLBACK_INTENT for intent in intents]
+
+    async def adetect_intent_with_slots(self, command: str) -> Dict[str, Any]:
+        """Classify and extract calendar/form slots in one structured LLM call.
+
+        Returns a dict with ``intent`` plus ``event`` and ``form`` slots; the slots are None when the
+        intent came from the cache or the embedding classifier, or did not need them.
+        """
+        detection = {"intent": None, "event": None, "form": None}
+        cached = self.cache.get(command) if self.cache else None
+        if cached:
+            detection["intent"] = cached
+            return detection
+
+        if self.embedding_classifier:
+            loop = asyncio.get_running_loop()
+            local_result = await loop.run_in_executor(None, self.embedding_classifier.classify, command)
+            if self._confident(local_result) and local_result["intent"] not in ("calendar", "fill_form"):
+                detection["intent"] = local_result["intent"]
+                if self.cache:
+                    self.cache.set(command, detection["intent"])
+                return detection
+
+        prompt = self.slots_prompt.format(
+            intents=", ".join(self.intents),
+            user_input=command,
+            current_date=datetime.now().strftime("%Y-%m-%d"),
+            defaults=json.dumps(FORM_DEFAULTS)
+        )
+        try:
+            async with self._semaphore:
+                result = await asyncio.wait_for(self.slots_llm.ainvoke(prompt), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Intent and slot detection timed out after {self.timeout}s, using '{FALLBACK_INTENT}'")
+            record_fallback("intent_default", "timeout")
+            detection["intent"] = FALLBACK_INTENT
+            return detection
+
+        detection["intent"] = result.intent
+        if result.intent == "calendar" and result.event is not None:
+            detection["event"] = result.event.model_dump()
+        elif result.intent == "fill_form" and result.form is not None:
+            detection["form"] = result.form.model_dump(exclude_none=True)
+        if self.cache:
+            self.cache.set(command, result.intent)
+        return detection
+
+    async def _adetect_intent_llm(self, command: str) -> Optional[str]:
+        """Classify without blocking the event loop, bounded by the concurrency limit and per-call timeout."""
+        prompt = self._build_prompt(command)
+        try:
+            async with self._semaphore:
+                result = await asyncio.wait_for(self.llm.ainvoke(prompt), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Intent detection timed out after {self.timeout}s, using '{FALLBACK_INTENT}'")
+            record_fallback("intent_default", "timeout")
+            return None
+        return self._parse_intent(result.content)
@@ -0,0 +1,101 @@
+import re
+import logging
+from typing import Dict, Any, Optional, Set
+
+logger = logging.getLogger("langchain_agent.intent_router")
+
+# Governor budgets each intent's handling can wait on. Anything else runs the agent.
+INTENT_BUDGETS = {
+    "youtube_direct_url": (),
+    "youtube_search": ("mcp",),
+    "fill_form": ("llm", "browser", "browser_pool", "mcp"),
+    "calendar": ("llm", "calendar", "mcp"),
+}
+AGENT_BUDGETS = ("llm",)
+
+_DATE_WORDS = (
+    r"today|tonight|tomorrow|yesterday|next\s+(?:week|month|year|monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+    r"|this\s+(?:morning|afternoon|evening|week|weekend)"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+    r"|jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+)
+
+# Order matters: at each position the first alternative that matches wins, so
+# longer and more specific signals are listed before the words they contain.
+_SIGNAL_PATTERN = re.compile(
+    r"(?P<youtube_url>(?:https?://)?(?:www\.)?(?:youtube|youtu|youtube-nocookie)\.(?:com|be)/(?:watch\?v=|embed/|v/|.+\?v=)?(?P<video_id>[^&=%\?\s]{11}))"
+    r"|(?P<email_address>[\w.+-]+@[\w-]+(?:\.[\w-]+)+)"
+    r"|(?P<url>https?://\S+|www\.\S+)"
+    r"|(?P<youtube_phrase>\b(?:youtube\s+videos?|watch\s+videos?|find\s+videos?|search\s+videos?|tutorial\s+videos?|youtube\s+tutorials?|youtube\s+search)\b)"
+    r"|(?P<youtube_word>\byoutube\b)"
+    r"|(?P<youtube_verb>\b(?:search(?:ing)?|find|watch(?:ing)?|videos?|tutorials?)\b)"
+    r"|(?P<form_verb>\b(?:sign\s+(?:me\s+)?up|register|registration|fill(?:\s+out|\s+in)?|submit|apply|enrol+|subscribe)\b)"
+    r"|(?P<email_verb>\b(?:send|e-?mail|mail)\b)"
+    r"|(?P<calendar_verb>\b(?:schedule|remind(?:\s+me)?|reminder|meeting|appointment|calendar|event)\b)"
+    r"|(?P<time_expression>\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b|\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b|\b(?:noon|midnight)\b)"
+    r"|(?P<date_expression>\b(?:" + _DATE_WORDS + r")\b)",
+    re.IGNORECASE
+)
+
+def scan_signals(command: str) -> Dict[str, Any]:
+    """Scan the command once and collect every cheap intent signal it contains."""
+    signals: Set[str] = set()
+    video_id = None
+    url = None
+    for match in _SIGNAL_PATTERN.finditer(command):
+        kind = match.lastgroup
+        signals.add(kind)
+        if kind == "youtube_url" and video_id is None:
+            video_id = match.group("video_id")
+        elif kind == "url" and url is None:
+            url = match.group("url")
+    return {"signals": signals, "video_id": video_id, "url": url}
+
+def route_command(command: str) -> Dict[str, Any]:
+    """Return a confident intent for obvious commands, or intent None when the LLM classifier should decide."""
+    scan = scan_signals(command)
+    signals = scan["signals"]
+    route = {"intent": None, "signals": signals, "url": scan["url"]}
+
+    if "youtube_url" in signals:
+        route["intent"] = "youtube_direct_url"
+        route["video_url"] = f"https://www.youtube.com/watch?v={scan['video_id']}"
+    elif "youtube_phrase" in signals or ("youtube_word" in signals and "youtube_verb" in signals):
+        route["intent"] = "youtube_search"
+    elif "url" in signals and "form_verb" in signals:
+        route["intent"] = "fill_form"
+    else:
+        is_email = "email_address" in signals and "email_verb" in signals
+        is_calendar = "calendar_verb" in signals and ("time_expression" in signals or "date_expression" in signals)
+        if is_email and not is_calendar:
+            route["intent"] = "email"
+        elif is_calendar and not is_email:
+            route["intent"] = "calendar"
+
+    if route["intent"]:
+        logger.info(f"Fast-path routed command to '{route['intent']}' using signals {sorted(signals)}")
+    return route
+
+def admission_budgets(route: Dict[str, Any]) -> Set[str]:
+    """Budgets admission control should check for a routed command.
+
+    A command the fast path could not route is checked against the agent's budgets and
+    those of every intent its signals point to.
+    """
+    intent = route.get("intent")
+    if intent:
+        return set(INTENT_BUDGETS.get(intent, AGENT_BUDGETS))
+    budgets = set(AGENT_BUDGETS)
+    if route.get("url"):
+        budgets.update(INTENT_BUDGETS["fill_form"])
+    if has_date_signal(route):
+        budgets.update(INTENT_BUDGETS["calendar"])
+    return budgets
+
+def has_date_signal(route: Dict[str, Any]) -> bool:
+    signals = route.get("signals", set())
+    return "time_expression" in signals or "date_expression" in signals
+
+def has_youtube_signal(route: Dict[str, Any]) -> bool:
+    signals = route.get("signals", set())
+    return "youtube_word" in signals or "youtube_verb" in signals
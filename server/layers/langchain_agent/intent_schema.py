@@ -1,5 +1,24 @@
+from typing import Dict, Any, Optional
 from pydantic import BaseModel, Field
 
 class IntentResult(BaseModel):
     intent: str = Field(..., description="The detected user intent, e.g. browser, fill_form, email, calendar, general")
-    reasoning: str = Field(..., description="Reasoning for the detected intent") 
\ No newline at end of file
+    reasoning: str = Field(..., description="Reasoning for the detected intent")
+
+class EventSlots(BaseModel):
+    title: Optional[str] = Field(None, description="Title of the calendar event")
+    start_time: Optional[str] = Field(None, description="ISO 8601 start time, or null if not specified")
+    end_time: Optional[str] = Field(None, description="ISO 8601 end time, or null if not specified")
+    description: Optional[str] = Field(None, description="Optional event description")
+    needs_clarification: Optional[str] = Field(None, description="What is unclear or missing, if anything")
+
+class FormSlots(BaseModel):
+    url: Optional[str] = Field(None, description="URL of the form to fill, or null if not found")
+    form_data: Dict[str, Any] = Field(default_factory=dict, description="Field names and values the user provided")
+    needs_clarification: Optional[str] = Field(None, description="Message describing missing name or email, if any")
+
+class IntentWithSlots(BaseModel):
+    intent: str = Field(..., description="The detected user intent, e.g. browser, fill_form, email, calendar, general")
+    reasoning: str = Field(..., description="Reasoning for the detected intent")
+    event: Optional[EventSlots] = Field(None, description="Event details, only when the intent is calendar")
+    form: Optional[FormSlots] = Field(None, description="Form URL and data, only when the intent is fill_form")
@@ -0,0 +1,37 @@
+import os
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_google_genai import ChatGoogleGenerativeAI
+from runtime.governor import governor
+
+class GovernedChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """Gemini chat model whose every request holds a slot in the governor's "llm" budget."""
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        with governor.acquire_blocking("llm"):
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        async with governor.acquire("llm"):
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        with governor.acquire_blocking("llm"):
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async with governor.acquire("llm"):
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+
+def create_llm(temperature: float = 0.5, model_name: Optional[str] = None) -> GovernedChatGoogleGenerativeAI:
+    return GovernedChatGoogleGenerativeAI(
+        model=model_name or os.getenv('GEMINI_MODEL'),
+        temperature=temperature
+    )
@@ -1,156 +1,334 @@
 import os
 import logging
-from typing import Dict, Any, List, Optional
+import json
+import weakref
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Awaitable, Callable, Type
 from abc import ABC, abstractmethod
 import asyncio
-from langchain_google_genai import ChatGoogleGenerativeAI
+from .llm import create_llm
+from .checkpointer import create_checkpointer
+from .history import AgentMemoryState, HistoryPolicy, model_messages
+from .run_budget import BUDGET_EXHAUSTED, DEADLINE, RunBudget, RunUsage, budget_for
+from runtime.metrics import record_fallback
+from layers.external_services.youtube_search import get_youtube_search_service
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage, AIMessage
-from langchain.agents import Tool
+from langchain_core.messages import HumanMessage, BaseMessage, AIMessage, ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import BaseModel
 from config.prompt import SYSTEM_PROMPT
 
 logger = logging.getLogger("langchain_agent.react")
 
+AGENT_TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_turn_tool_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("alris_turn_tool_slots", default=None)
+
+def async_tool(name: str,
+               description: str,
+               coroutine: Callable[..., Awaitable[Any]],
+               args_schema: Type[BaseModel]) -> StructuredTool:
+    """Native async structured tool.
+
+    The agent's tool node runs every call the model makes in one step concurrently;
+    calls within one agent turn share AGENT_TOOL_CONCURRENCY slots.
+    """
+    async def run(**kwargs) -> Any:
+        slots = _turn_tool_slots.get()
+        if slots is None:
+            return await coroutine(**kwargs)
+        async with slots:
+            return await coroutine(**kwargs)
+
+    return StructuredTool.from_function(
+        coroutine=run,
+        name=name,
+        description=description,
+        args_schema=args_schema
+    )
+
+def _tool_payload(content: Any) -> Any:
+    """Tool results reach the thread as JSON text; decode them back into dicts."""
+    if isinstance(content, str):
+        try:
+            return json.loads(content)
+        except ValueError:
+            return content
+    return content
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "content") and hasattr(value, "type"):
+        value = value.content
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+def _chunk_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return ""
+
 class BaseReactAgent(ABC):
     def __init__(self, model_name: Optional[str] = None):
-        model_engine = model_name or os.getenv('GEMINI_MODEL')
-
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_engine,
-            temperature=0.5
-        )
+        self.llm = create_llm(temperature=0.5, model_name=model_name)
 
-        self.memory = MemorySaver()
+        self.memory = create_checkpointer()
+        self.youtube_search = get_youtube_search_service()
+        self.history_policy = HistoryPolicy()
+        self._thread_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
         self.tools = self._get_tools()
         self.agent_executor = create_react_agent(
             model=self.llm,
             tools=self.tools,
+            prompt=self._model_prompt,
+            state_schema=AgentMemoryState,
             checkpointer=self.memory
         )
 
         logger.info(f"Initialized {self.__class__.__name__}")
 
     @abstractmethod
-    def _get_tools(self) -> List[Tool]:
+    def _get_tools(self) -> List[BaseTool]:
         pass
 
     @abstractmethod
     def _get_system_prompt(self) -> str:
         return SYSTEM_PROMPT
 
-    async def execute(self, input_text: str, thread_id: str = None) -> Dict[str, Any]:
+    def _model_prompt(self, state: Dict[str, Any]) -> List[BaseMessage]:
+        """The system prompt is added per model call, so it is never stored in the thread."""
+        return model_messages(self._get_system_prompt(), state)
+
+    def youtube_query_for(self, input_text: str) -> Optional[str]:
+        """Return the fallback YouTube search query for a request, or None if it is not YouTube-related."""
+        lowered = input_text.lower()
+        if not any(keyword in lowered for keyword in ["youtube", "watch", "video", "tutorial"]):
+            return None
+
+        youtube_query = None
+        for term in ["video", "tutorial", "watch"]:
+            if term in lowered:
+                parts = lowered.split(term, 1)
+                if len(parts) > 1:
+                    youtube_query = parts[1].strip()
+                    break
+        if not youtube_query and "youtube" in lowered:
+            youtube_query = lowered.replace("youtube", "").strip()
+        return youtube_query or input_text
+
+    async def search_youtube_video_urls(self, youtube_query: str) -> Optional[List[str]]:
+        try:
+            video_urls = await self.youtube_search.search(youtube_query)
+            logger.info(f"Direct YouTube search found {len(video_urls)} videos for query: {youtube_query}")
+            return video_urls
+        except Exception as e:
+            logger.error(f"Error in direct YouTube search: {str(e)}")
+        return None
+
+    async def prefetch_youtube_video_urls(self, input_text: str) -> Optional[List[str]]:
+        """Run the fallback YouTube search for a request ahead of time."""
+        youtube_query = self.youtube_query_for(input_text)
+        if not youtube_query:
+            return None
+        return await self.search_youtube_video_urls(youtube_query)
+
+    @staticmethod
+    def _thread_config(thread_id: Optional[str]) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": thread_id or "default"}}
+
+    async def _message_count(self, config: Dict[str, Any]) -> int:
+        state = await self.agent_executor.aget_state(config)
+        return len((state.values or {}).get("messages", []))
+
+    async def get_history(self, thread_id: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Return one page of a thread's checkpointed messages, oldest first."""
+        state = await self.agent_executor.aget_state(self._thread_config(thread_id))
+        messages = (state.values or {}).get("messages", [])
+        page = messages[offset:offset + limit]
+        return {
+            "thread_id": thread_id,
+            "total": len(messages),
+            "offset": offset,
+            "limit": limit,
+            "messages": [msg.model_dump() for msg in page]
+        }
+
+    def _thread_lock(self, thread_id: str) -> asyncio.Lock:
+        """Serialize turns on the same thread so overlapping commands never fork its checkpoint."""
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._thread_locks[thread_id] = lock
+        return lock
+
+    async def _run_agent(self,
+                         agent_input: Dict[str, Any],
+                         config: Dict[str, Any],
+                         budget: RunBudget,
+                         usage: RunUsage,
+                         on_event: Optional[EventCallback]) -> Optional[str]:
+        """Stream the agent run, forwarding tokens and tool activity when ``on_event`` is set.
+
+        Returns the exhausted budget's name if the run was stopped before the tools the model
+        asked for could run, or None if the model finished on its own.
+        """
+        modes = ["updates", "messages"] if on_event else ["updates"]
+        stream = self.agent_executor.astream(agent_input, config=config, stream_mode=modes)
+        try:
+            async for mode, chunk in stream:
+                if mode == "messages":
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") == "agent":
+                        text = _chunk_text(message.content)
+                        if text:
+                            await on_event({"type": "delta", "data": text})
+                    continue
+                for node, update in chunk.items():
+                    for message in (update or {}).get("messages", []):
+                        usage.record(message)
+                        if isinstance(message, AIMessage) and message.tool_calls:
+                            reason = budget.check(usage, message)
+                            if reason:
+                                return reason
+                            if on_event:
+                                for call in message.tool_calls:
+                                    await on_event({"type": "tool", "event": "start", "name": call["name"], "input": _jsonable(call["args"])})
+                        elif isinstance(message, ToolMessage) and on_event:
+                            await on_event({"type": "tool", "event": "end", "name": message.name, "output": _jsonable(message)})
+            return None
+        finally:
+            # Closing the stream cancels whatever the graph still has running.
+            await stream.aclose()
+
+    @staticmethod
+    def _partial_answer(messages: List[BaseMessage]) -> str:
+        last_ai_message = next((m for m in reversed(messages) if isinstance(m, AIMessage) and m.content), None)
+        if last_ai_message:
+            return _chunk_text(last_ai_message.content)
+        payloads = [_tool_payload(m.content) for m in messages if isinstance(m, ToolMessage)]
+        found = [p["message"] for p in payloads if isinstance(p, dict) and p.get("status") == "success" and p.get("message")]
+        if found:
+            return "\n\n".join(dict.fromkeys(found))
+        return "I couldn't finish this request within its limits. Could you narrow it down?"
+
+    async def _close_run(self, config: Dict[str, Any], usage: RunUsage, reason: str):
+        """Checkpoint what a stopped run produced, answer its unanswered tool calls and end the turn."""
+        state = await self.agent_executor.aget_state(config)
+        stored = (state.values or {}).get("messages", [])
+        stored_ids = {m.id for m in stored if m.id}
+        answered = {m.tool_call_id for m in stored if isinstance(m, ToolMessage)}
+
+        produced = [m for m in usage.messages[1:] if not (m.id and m.id in stored_ids)]
+        produced = [m for m in produced if not (isinstance(m, ToolMessage) and m.tool_call_id in answered)]
+        answered |= {m.tool_call_id for m in produced if isinstance(m, ToolMessage)}
+
+        closing = []
+        for message in usage.messages:
+            for call in getattr(message, "tool_calls", None) or []:
+                if call["id"] not in answered:
+                    closing.append(ToolMessage(
+                        content=json.dumps({"status": "skipped", "message": f"Not run: the {reason} budget for this request ran out."}),
+                        tool_call_id=call["id"],
+                        name=call["name"]
+                    ))
+        answer = AIMessage(content=self._partial_answer(usage.messages))
+        # Written as the agent node, so the graph sees a finished turn with nothing left to run.
+        await self.agent_executor.aupdate_state(config, {"messages": produced + closing + [answer]}, as_node="agent")
+
+    async def execute(self,
+                      input_text: str,
+                      thread_id: str = None,
+                      youtube_prefetch: Optional[Callable[[], Awaitable[Optional[List[str]]]]] = None,
+                      on_event: Optional[EventCallback] = None,
+                      intent: Optional[str] = None) -> Dict[str, Any]:
         try:
             logger.debug(f"Executing agent with input: {input_text}")
 
-            config = {
-                "configurable": {
-                    "thread_id": thread_id or "default",
-                    "checkpoint_ns": "alris",
-                    "checkpoint_id": f"agent_{thread_id or 'default'}"
-                }
-            }
+            config = self._thread_config(thread_id)
 
-            system_prompt_content = self._get_system_prompt()
-            messages: List[BaseMessage] = [
-                SystemMessage(content=system_prompt_content),
-                HumanMessage(content=input_text)
-            ]
+            messages: List[BaseMessage] = [HumanMessage(content=input_text)]
 
-            result = await self.agent_executor.ainvoke({"messages": messages}, config=config)
+            async with self._thread_lock(thread_id or "default"):
+                state = await self.agent_executor.aget_state(config)
+                compaction, history_report = await self.history_policy.compact(
+                    self.llm, self._get_system_prompt(), state.values or {}
+                )
+                if compaction:
+                    await self.agent_executor.aupdate_state(config, compaction)
+                # Everything checkpointed before this point belongs to earlier turns.
+                prior_count = await self._message_count(config)
+                budget = budget_for(intent)
+                usage = RunUsage(base_tokens=history_report["tokens_after"])
+                usage.record(messages[0])
+                run_config = {**config, "recursion_limit": 2 * budget.max_steps + 2}
+                slots_token = _turn_tool_slots.set(asyncio.Semaphore(AGENT_TOOL_CONCURRENCY))
+                try:
+                    exhausted = await asyncio.wait_for(
+                        self._run_agent({"messages": messages}, run_config, budget, usage, on_event),
+                        timeout=budget.deadline_seconds
+                    )
+                except asyncio.TimeoutError:
+                    exhausted = DEADLINE
+                finally:
+                    _turn_tool_slots.reset(slots_token)
+                if exhausted:
+                    logger.warning(f"Agent run on thread {thread_id} stopped: {exhausted} budget exhausted ({usage.summary()})")
+                    BUDGET_EXHAUSTED.inc(intent=intent or "none", reason=exhausted)
+                    await self._close_run(config, usage, exhausted)
+                result = (await self.agent_executor.aget_state(config)).values
+                if hasattr(self.memory, "aflush"):
+                    # Commit the finished turn so another worker process can pick the thread up.
+                    await self.memory.aflush()
 
             logger.debug("Agent execution completed successfully")
 
-            video_urls = None
+            video_urls: List[str] = []
             tool_outputs = []
             last_message_content_str = ""
-            awaited_messages_list: List[BaseMessage] = []
-
-            is_youtube_request = any(keyword in input_text.lower() for keyword in ["youtube", "watch", "video", "tutorial"])
-            youtube_query = None
-
-            if is_youtube_request:
-                search_terms = ["video", "tutorial", "watch"]
-                for term in search_terms:
-                    if term in input_text.lower():
-                        parts = input_text.lower().split(term, 1)
-                        if len(parts) > 1:
-                            youtube_query = parts[1].strip()
-                            break
-                if not youtube_query and "youtube" in input_text.lower():
-                    youtube_query = input_text.lower().replace("youtube", "").strip()
-                if not youtube_query:
-                    youtube_query = input_text
+            turn_messages: List[BaseMessage] = []
+
+            youtube_query = self.youtube_query_for(input_text)
+            is_youtube_request = youtube_query is not None
 
             if isinstance(result, dict) and "messages" in result:
-                raw_messages = result["messages"]
-                for i, msg_item in enumerate(raw_messages):
-                    current_content = msg_item.content
-                    if asyncio.iscoroutine(current_content):
-                        try:
-                            logger.info(f"Awaiting coroutine content for message {i}: {getattr(msg_item, 'type', 'unknown')}")
-                            current_content = await current_content
-                            logger.info(f"Coroutine result type for message {i}: {type(current_content)}")
-                        except Exception as e:
-                            logger.error(f"Error awaiting message content for message {i}: {str(e)}")
-                            current_content = f"Error resolving content: {str(e)}"                 
-                    msg_item.content = current_content 
-                    awaited_messages_list.append(msg_item)
-
-
-                    if isinstance(current_content, dict) and "video_urls" in current_content:
-                        logger.info(f"Found video_urls in awaited content of message {i}: {current_content.get('video_urls')}")
-                        video_urls = current_content.get("video_urls")
-
-                    if msg_item.type == 'tool' and isinstance(current_content, dict) and "video_urls" in current_content:
-                         video_urls = current_content["video_urls"]
-                         logger.info(f"Extracted video URLs from tool message {i} output: {video_urls}")
-
-
-                for msg_item in awaited_messages_list:
-                    if hasattr(msg_item, 'name') and getattr(msg_item, 'name') == 'search_youtube':
-                        if isinstance(msg_item.content, dict) and "video_urls" in msg_item.content:
-                            video_urls = msg_item.content["video_urls"]
-                            logger.info(f"Extracted video URLs from 'search_youtube' named message: {video_urls}")
+                turn_messages = result["messages"][prior_count:]
+                for msg_item in turn_messages:
+                    if msg_item.type != "tool":
+                        continue
+                    payload = _tool_payload(msg_item.content)
+                    tool_outputs.append({
+                        "tool_name": msg_item.name or msg_item.tool_call_id,
+                        "tool_output": payload
+                    })
+                    # Several searches may run in one step; keep every distinct result in order.
+                    if isinstance(payload, dict) and payload.get("video_urls"):
+                        video_urls.extend(url for url in payload["video_urls"] if url not in video_urls)
 
                 if is_youtube_request and not video_urls and youtube_query:
-                    youtube_tool_instance = getattr(self, 'youtube_tool', None)
-                    if youtube_tool_instance:
-                        logger.info(f"Performing direct YouTube search via self.youtube_tool for query: {youtube_query}")
-                        try:
-                            video_ids_str = youtube_tool_instance.run(f"{youtube_query},5")
-                            import ast
-                            parsed_ids = ast.literal_eval(video_ids_str) if isinstance(video_ids_str, str) else video_ids_str
-                            temp_video_urls = []
-                            if isinstance(parsed_ids, list):
-                                for video_id in parsed_ids:
-                                    vid_part = video_id
-                                    if 'watch?v=' in video_id:
-                                        vid_part = video_id.split('watch?v=')[1].split('&')[0]
-                                    temp_video_urls.append(f"https://www.youtube.com/watch?v={vid_part}")
-                                video_urls = temp_video_urls
-                                logger.info(f"Direct YouTube search (self.youtube_tool) found {len(video_urls)} videos")
-                        except Exception as e:
-                            logger.error(f"Error in direct YouTube search (self.youtube_tool): {str(e)}")
-                
-                last_ai_message = next((m for m in reversed(awaited_messages_list) if isinstance(m, AIMessage) and m.content), None)
-                
+                    record_fallback("youtube_agent_search", "no_tool_results")
+                    if youtube_prefetch is not None:
+                        # Failures are logged by the speculative run and come back as None.
+                        video_urls = await youtube_prefetch() or []
+                        logger.info(f"Using prefetched YouTube results for query: {youtube_query}")
+                    else:
+                        video_urls = await self.search_youtube_video_urls(youtube_query) or []
+
+                last_ai_message = next((m for m in reversed(turn_messages) if isinstance(m, AIMessage) and m.content), None)
+
                 if last_ai_message:
-                    last_message_content_str = last_ai_message.content
-                    if isinstance(last_message_content_str, dict):
-                        last_message_content_str = last_message_content_str.get("message", str(last_message_content_str))
-                elif awaited_messages_list:
-                    last_message_content_str = awaited_messages_list[-1].content
-                    if isinstance(last_message_content_str, dict):
-                        last_message_content_str = last_message_content_str.get("message", str(last_message_content_str))
-
-
-                for msg_item in awaited_messages_list:
-                    if msg_item.type == 'tool':
-                         tool_outputs.append({
-                            "tool_name": getattr(msg_item, 'name', msg_item.tool_call_id),
-                            "tool_output": msg_item.content
-                        })
+                    last_message_content_str = _chunk_text(last_ai_message.content)
+                elif turn_messages:
+                    payload = _tool_payload(turn_messages[-1].content)
+                    if isinstance(payload, dict):
+                        last_message_content_str = payload.get("message", str(payload))
+                    else:
+                        last_message_content_str = _chunk_text(payload)
 
                 if video_urls and (not isinstance(last_message_content_str, str) or not any(url in last_message_content_str for url in video_urls)):
                     video_links_str = "\n".join([f"- {url}" for url in video_urls])
@@ -160,9 +338,15 @@ class BaseReactAgent(ABC):
                 response_dict = {
                     "status": "success",
                     "result": last_message_content_str,
-                    "messages": [msg.model_dump() for msg in awaited_messages_list],
-                    "tool_outputs": tool_outputs
+                    "messages": [msg.model_dump() for msg in turn_messages],
+                    "message_offset": prior_count,
+                    "tool_outputs": tool_outputs,
+                    "history": history_report,
+                    "usage": usage.summary()
                 }
+                if exhausted:
+                    response_dict["budget_exhausted"] = exhausted
+                    response_dict["budget"] = budget.limits()
                 if video_urls:
                     response_dict["video_urls"] = video_urls
                 return response_dict
@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import logging
+from typing import Dict, Any, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from runtime.metrics import registry, Counter
+
+logger = logging.getLogger("langchain_agent.run_budget")
+
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "6"))
+AGENT_MAX_TOOL_CALLS = int(os.getenv("AGENT_MAX_TOOL_CALLS", "8"))
+AGENT_MAX_TOKENS = int(os.getenv("AGENT_MAX_TOKENS", "30000"))
+AGENT_DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", "45"))
+AGENT_BUDGETS = os.getenv("AGENT_BUDGETS", "")
+
+STEPS = "steps"
+TOOL_CALLS = "tool_calls"
+TOKENS = "tokens"
+DEADLINE = "deadline"
+
+# Per-intent limits layered over the AGENT_* defaults. AGENT_BUDGETS is JSON keyed by intent
+# (or "default"), e.g. {"browser": {"deadline_seconds": 120}}.
+INTENT_BUDGETS: Dict[str, Dict[str, float]] = {
+    "general": {"max_steps": 4, "max_tool_calls": 4, "deadline_seconds": 30},
+    "browser": {"max_steps": 10, "max_tool_calls": 12, "max_tokens": 40000, "deadline_seconds": 90},
+}
+
+BUDGET_EXHAUSTED = registry.register(Counter(
+    "alris_agent_budget_exhausted_total",
+    "Agent runs stopped early because a run budget ran out.",
+    ("intent", "reason")
+))
+
+class RunBudget:
+    """Limits for one agent run: model steps, tool calls, approximate tokens and wall-clock time."""
+
+    def __init__(self,
+                 max_steps: int = AGENT_MAX_STEPS,
+                 max_tool_calls: int = AGENT_MAX_TOOL_CALLS,
+                 max_tokens: int = AGENT_MAX_TOKENS,
+                 deadline_seconds: float = AGENT_DEADLINE_SECONDS):
+        self.max_steps = max(1, int(max_steps))
+        self.max_tool_calls = max(0, int(max_tool_calls))
+        self.max_tokens = int(max_tokens)
+        self.deadline_seconds = float(deadline_seconds)
+
+    def limits(self) -> Dict[str, Any]:
+        return {
+            "max_steps": self.max_steps,
+            "max_tool_calls": self.max_tool_calls,
+            "max_tokens": self.max_tokens,
+            "deadline_seconds": self.deadline_seconds
+        }
+
+    def check(self, usage: "RunUsage", message: AIMessage) -> Optional[str]:
+        """Reason to stop before running the tools ``message`` asks for, or None to carry on.
+
+        Answers without tool calls always go through, so a run that reaches its last step
+        with an answer still returns it.
+        """
+        if not message.tool_calls:
+            return None
+        if usage.steps >= self.max_steps:
+            return STEPS
+        if usage.tool_calls > self.max_tool_calls:
+            return TOOL_CALLS
+        if usage.tokens > self.max_tokens:
+            return TOKENS
+        return None
+
+def _load_overrides() -> Dict[str, Dict[str, float]]:
+    if not AGENT_BUDGETS:
+        return {}
+    try:
+        overrides = json.loads(AGENT_BUDGETS)
+        if not isinstance(overrides, dict):
+            raise ValueError("expected an object keyed by intent")
+        return overrides
+    except ValueError as e:
+        logger.error(f"Ignoring invalid AGENT_BUDGETS: {str(e)}")
+        return {}
+
+_overrides = _load_overrides()
+
+def budget_for(intent: Optional[str]) -> RunBudget:
+    settings: Dict[str, float] = {}
+    settings.update(_overrides.get("default", {}))
+    settings.update(INTENT_BUDGETS.get(intent or "", {}))
+    settings.update(_overrides.get(intent or "", {}))
+    return RunBudget(**settings)
+
+class RunUsage:
+    """What an agent run has consumed so far."""
+
+    def __init__(self, base_tokens: int = 0):
+        self.started = time.monotonic()
+        self.base_tokens = base_tokens
+        self.steps = 0
+        self.tool_calls = 0
+        self.tokens = 0
+        self.messages: List[BaseMessage] = []
+
+    def record(self, message: BaseMessage):
+        """Account for a message produced by the run, in the order the graph emitted it."""
+        if isinstance(message, AIMessage):
+            self.steps += 1
+            self.tool_calls += len(message.tool_calls)
+            usage = message.usage_metadata
+            if usage and usage.get("total_tokens"):
+                self.tokens += usage["total_tokens"]
+            else:
+                # No usage reported: the prompt was the thread so far plus this run's messages.
+                prompt = self.base_tokens + count_tokens_approximately(self.messages)
+                self.tokens += prompt + count_tokens_approximately([message])
+        self.messages.append(message)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "tool_calls": self.tool_calls,
+            "tokens": self.tokens,
+            "elapsed_seconds": round(time.monotonic() - self.started, 3)
+        }
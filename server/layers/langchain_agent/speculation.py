@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger("langchain_agent.speculation")
+
+class SpeculativeRun:
+    """Speculative tasks started for one command while its intent is still being classified."""
+
+    def __init__(self, executor: "SpeculativeExecutor", tasks: Dict[str, asyncio.Task]):
+        self._executor = executor
+        self._tasks = tasks
+
+    def start(self, kind: str, work: Awaitable):
+        self._tasks[kind] = asyncio.ensure_future(work)
+        self._executor._record(kind, "started")
+
+    def started(self, kind: str) -> bool:
+        """Whether a task of this kind is still unclaimed."""
+        return kind in self._tasks
+
+    def mark_used(self, kind: str):
+        """Count a task as used by a consumer that picked its work up without ``take``,
+        such as a browser lease that found the page the task pre-warmed."""
+        if self._tasks.pop(kind, None) is not None:
+            self._executor._record(kind, "used")
+            logger.debug(f"Speculative '{kind}' work used")
+
+    async def take(self, kind: str) -> Any:
+        """Wait for a speculative task's result; returns None if it was not started or failed.
+
+        Only a result that is actually handed over counts as used.
+        """
+        task = self._tasks.pop(kind, None)
+        if task is None:
+            return None
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            self._executor._record(kind, "wasted")
+            raise
+        except Exception as e:
+            logger.warning(f"Speculative '{kind}' work failed: {str(e)}")
+            self._executor._record(kind, "wasted")
+            return None
+        self._executor._record(kind, "used")
+        logger.debug(f"Speculative '{kind}' work used")
+        return result
+
+    def deferred(self, kind: str) -> Optional[Callable[[], Awaitable[Any]]]:
+        """A callable that takes the task's result, for a consumer that may not need it.
+
+        If the consumer never calls it, ``discard`` cancels the task and counts it as wasted.
+        """
+        if kind not in self._tasks:
+            return None
+        return lambda: self.take(kind)
+
+    def discard(self):
+        """Cancel every unclaimed task; their work is counted as wasted."""
+        for kind, task in self._tasks.items():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is not None:
+                logger.debug(f"Discarded speculative '{kind}' work had failed: {task.exception()}")
+            self._executor._record(kind, "wasted")
+        self._tasks.clear()
+
+class SpeculativeExecutor:
+    """Starts speculative downstream work and keeps used/wasted counters per kind."""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, kind: str, outcome: str):
+        counters = self._counters.setdefault(kind, {"started": 0, "used": 0, "wasted": 0})
+        counters[outcome] += 1
+
+    def start(self, work: Dict[str, Awaitable]) -> SpeculativeRun:
+        run = SpeculativeRun(self, {})
+        for kind, awaitable in work.items():
+            run.start(kind, awaitable)
+        if work:
+            logger.debug(f"Started speculative work: {list(work.keys())}")
+        return run
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {kind: dict(counters) for kind, counters in self._counters.items()}
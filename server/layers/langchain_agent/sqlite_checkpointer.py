@@ -0,0 +1,417 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Tuple, Iterator, AsyncIterator
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+logger = logging.getLogger("langchain_agent.sqlite_checkpointer")
+
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "alris_checkpoints.db")
+CHECKPOINT_FLUSH_INTERVAL_MS = float(os.getenv("CHECKPOINT_FLUSH_INTERVAL_MS", "50"))
+CHECKPOINT_FLUSH_BATCH_SIZE = int(os.getenv("CHECKPOINT_FLUSH_BATCH_SIZE", "64"))
+CHECKPOINT_KEEP_LATEST = int(os.getenv("CHECKPOINT_KEEP_LATEST", "10"))
+
+CheckpointKey = Tuple[str, str, str]
+WriteKey = Tuple[str, str, str, str, int]
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer stored in a SQLite database in WAL mode.
+
+    Several server processes on one host can point at the same file. Puts are
+    buffered in memory and written by a background thread in one transaction per
+    batch, either every ``flush_interval_ms`` or as soon as ``flush_batch_size``
+    rows are waiting. Reads in this process see buffered rows immediately; other
+    processes see them once flushed, so callers that hand a thread to another
+    worker should ``flush()`` first.
+
+    Every checkpoint holds the thread's whole history, so each flush keeps only the
+    ``keep_latest`` newest checkpoints of the threads it wrote to, and deletes the
+    writes of the ones it drops. ``keep_latest`` of 0 keeps everything.
+    """
+
+    def __init__(self,
+                 db_path: str = CHECKPOINT_DB,
+                 flush_interval_ms: float = CHECKPOINT_FLUSH_INTERVAL_MS,
+                 flush_batch_size: int = CHECKPOINT_FLUSH_BATCH_SIZE,
+                 keep_latest: int = CHECKPOINT_KEEP_LATEST,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.flush_batch_size = max(1, flush_batch_size)
+        self.keep_latest = max(0, keep_latest)
+
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL, "
+            "parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB, "
+            "created_at REAL NOT NULL, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS writes ("
+            "thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL DEFAULT '', checkpoint_id TEXT NOT NULL, "
+            "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB, "
+            "task_path TEXT NOT NULL DEFAULT '', "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+        )
+
+        # Rows not yet committed: _pending collects new puts, _inflight is the batch being written.
+        self._buffer_lock = threading.Lock()
+        self._pending_checkpoints: Dict[CheckpointKey, tuple] = {}
+        self._pending_writes: Dict[WriteKey, tuple] = {}
+        self._inflight_checkpoints: Dict[CheckpointKey, tuple] = {}
+        self._inflight_writes: Dict[WriteKey, tuple] = {}
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.batches = 0
+        self.rows_flushed = 0
+        self.pruned = 0
+        self.last_flush_ms = 0.0
+        self._flusher = threading.Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+        self._flusher.start()
+        logger.info(f"SQLite checkpointer using {db_path}")
+
+    # --- write path ---
+
+    def put(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        row = (
+            thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+            type_, serialized, metadata_type, serialized_metadata, time.time()
+        )
+        with self._buffer_lock:
+            self._pending_checkpoints[(thread_id, checkpoint_ns, checkpoint["id"])] = row
+        self._schedule_flush()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config: RunnableConfig, writes, task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            key = (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx))
+            rows.append((key, (*key, channel, type_, serialized, task_path)))
+        with self._buffer_lock:
+            for key, row in rows:
+                # Regular writes are never overwritten; special writes (errors, interrupts) replace.
+                if key[4] >= 0 and (key in self._pending_writes or key in self._inflight_writes):
+                    continue
+                self._pending_writes[key] = row
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        with self._buffer_lock:
+            waiting = len(self._pending_checkpoints) + len(self._pending_writes)
+        if waiting >= self.flush_batch_size or self.flush_interval == 0:
+            self._wakeup.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval or None)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush checkpoints: {str(e)}", exc_info=True)
+
+    def flush(self):
+        """Commit every buffered row in one transaction."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                if not self._pending_checkpoints and not self._pending_writes:
+                    return
+                self._inflight_checkpoints, self._pending_checkpoints = self._pending_checkpoints, {}
+                self._inflight_writes, self._pending_writes = self._pending_writes, {}
+            checkpoints = list(self._inflight_checkpoints.values())
+            writes = list(self._inflight_writes.values())
+            started = time.perf_counter()
+            try:
+                with self._db_lock:
+                    self._db.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                            "parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            checkpoints
+                        )
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+                            "idx, channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [row for row in writes if row[4] < 0]
+                        )
+                        self._db.executemany(
+                            "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+                            "idx, channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [row for row in writes if row[4] >= 0]
+                        )
+                        pruned = self._prune({(row[0], row[1]) for row in checkpoints})
+                        self._db.execute("COMMIT")
+                    except BaseException:
+                        self._db.execute("ROLLBACK")
+                        raise
+            except Exception:
+                # Put the batch back so it is retried, without clobbering anything newer.
+                with self._buffer_lock:
+                    self._pending_checkpoints = {**self._inflight_checkpoints, **self._pending_checkpoints}
+                    self._pending_writes = {**self._inflight_writes, **self._pending_writes}
+                    self._inflight_checkpoints, self._inflight_writes = {}, {}
+                raise
+            with self._buffer_lock:
+                self._inflight_checkpoints, self._inflight_writes = {}, {}
+            self.batches += 1
+            self.rows_flushed += len(checkpoints) + len(writes)
+            self.pruned += pruned
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def _prune(self, threads) -> int:
+        """Delete all but the newest ``keep_latest`` checkpoints of each (thread, namespace), and
+        their writes. Runs inside the flush transaction; returns how many checkpoints went."""
+        if not self.keep_latest:
+            return 0
+        pruned = 0
+        for thread_id, checkpoint_ns in threads:
+            cutoff = self._db.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.keep_latest - 1)
+            ).fetchone()
+            if cutoff is None:
+                continue
+            pruned += self._db.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, cutoff[0])
+            ).rowcount
+            self._db.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, cutoff[0])
+            )
+        return pruned
+
+    async def aflush(self):
+        await asyncio.to_thread(self.flush)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._flush_lock:
+            with self._buffer_lock:
+                for buffer in (self._pending_checkpoints, self._pending_writes):
+                    for key in [key for key in buffer if key[0] == thread_id]:
+                        del buffer[key]
+            with self._db_lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                self._db.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self._db.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+                self._db.execute("COMMIT")
+
+    # --- read path ---
+
+    def _buffered_checkpoints(self, thread_id: str, checkpoint_ns: Optional[str]) -> List[tuple]:
+        with self._buffer_lock:
+            rows = {**self._inflight_checkpoints, **self._pending_checkpoints}
+        return [
+            row for key, row in rows.items()
+            if key[0] == thread_id and (checkpoint_ns is None or key[1] == checkpoint_ns)
+        ]
+
+    def _pending_writes_for(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path "
+                "FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchall()
+        merged = {tuple(row[:5]): row for row in rows}
+        with self._buffer_lock:
+            for buffer in (self._inflight_writes, self._pending_writes):
+                for key, row in buffer.items():
+                    if key[:3] == (thread_id, checkpoint_ns, checkpoint_id):
+                        if key[4] < 0 or key not in merged:
+                            merged[key] = row
+        ordered = sorted(merged.values(), key=lambda row: (row[3], row[4]))
+        return [(row[3], row[5], self.serde.loads_typed((row[6], row[7]))) for row in ordered]
+
+    def _to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row[:8]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._pending_writes_for(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        buffered = self._buffered_checkpoints(thread_id, checkpoint_ns)
+        if checkpoint_id:
+            row = next((row for row in buffered if row[2] == checkpoint_id), None)
+            if row is None:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                        (thread_id, checkpoint_ns, checkpoint_id)
+                    ).fetchone()
+        else:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                ).fetchone()
+            # Checkpoint ids are time-ordered, so the newest buffered row wins over anything older on disk.
+            candidates = buffered + ([row] if row else [])
+            row = max(candidates, key=lambda candidate: candidate[2]) if candidates else None
+        return self._to_tuple(row) if row else None
+
+    def list(self,
+             config: Optional[RunnableConfig],
+             *,
+             filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        clauses, params = [], []
+        thread_id = checkpoint_ns = checkpoint_id = None
+        if config:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            checkpoint_id = get_checkpoint_id(config)
+            clauses.append("thread_id = ?")
+            params.append(thread_id)
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id:
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        before_id = get_checkpoint_id(before) if before else None
+        if before_id:
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            rows = self._db.execute(
+                f"SELECT * FROM checkpoints {where} ORDER BY checkpoint_id DESC", params
+            ).fetchall()
+
+        with self._buffer_lock:
+            buffered = {**self._inflight_checkpoints, **self._pending_checkpoints}
+        merged = {tuple(row[:3]): row for row in rows}
+        for key, row in buffered.items():
+            if thread_id is not None and key[0] != thread_id:
+                continue
+            if checkpoint_ns is not None and key[1] != checkpoint_ns:
+                continue
+            if checkpoint_id and key[2] != checkpoint_id:
+                continue
+            if before_id and key[2] >= before_id:
+                continue
+            merged[key] = row
+
+        for row in sorted(merged.values(), key=lambda row: row[2], reverse=True):
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._to_tuple(row)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self,
+                    config: Optional[RunnableConfig],
+                    *,
+                    filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes, task_id: str, task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- lifecycle ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._buffer_lock:
+            pending = len(self._pending_checkpoints) + len(self._pending_writes)
+        return {
+            "type": "sqlite",
+            "db_path": self.db_path,
+            "pending_rows": pending,
+            "batches": self.batches,
+            "rows_flushed": self.rows_flushed,
+            "pruned_checkpoints": self.pruned,
+            "average_batch_rows": round(self.rows_flushed / self.batches, 1) if self.batches else 0.0,
+            "last_flush_ms": round(self.last_flush_ms, 2)
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+        logger.info("SQLite checkpointer closed")
@@ -1,8 +1,11 @@
 import logging
 import os
+import asyncio
 import json
 import requests
 from typing import Dict, Any, Optional
+from runtime.governor import governor
+from runtime.metrics import stage
 
 logger = logging.getLogger("alt_calendar_service")
 
@@ -40,11 +43,14 @@ class SimpleCalendarService:
                 payload["description"] = description
             
             logger.info(f"Sending calendar request to Apps Script: {payload}")
-            response = requests.post(
-                apps_script_url, 
-                json=payload,
-                timeout=10
-            )
+            async with governor.acquire("calendar"):
+                with stage("calendar.apps_script"):
+                    response = await asyncio.to_thread(
+                        requests.post,
+                        apps_script_url,
+                        json=payload,
+                        timeout=10
+                    )
             
             if response.status_code == 200:
                 logger.info("Calendar event created successfully")
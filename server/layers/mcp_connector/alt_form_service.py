@@ -1,6 +1,8 @@
 import logging
 from typing import Dict, Any, Optional
 from playwright.async_api import async_playwright, Browser
+from runtime.governor import governor
+from runtime.metrics import stage
 
 logger = logging.getLogger("alt_form_service")
 
@@ -22,6 +24,12 @@ class SimpleFormService:
             
     @staticmethod
     async def fill_form(url: str, form_data: Dict[str, str]) -> Dict[str, Any]:
+        async with governor.acquire("browser"):
+            with stage("browser.form_service"):
+                return await SimpleFormService._fill_form(url, form_data)
+    
+    @staticmethod
+    async def _fill_form(url: str, form_data: Dict[str, str]) -> Dict[str, Any]:
         service = SimpleFormService()
         try:
             await service.initialize()
@@ -1,10 +1,13 @@
+import os
+import json
 import logging
 import asyncio
-import os
 from typing import Dict, Any
 from contextlib import AsyncExitStack, suppress
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from runtime.governor import governor
+from runtime.metrics import stage
 
 logger = logging.getLogger("mcp_connector.client")
 
@@ -103,7 +106,9 @@ if __name__ == "__main__":
         
         try:
             logger.info(f"Calling MCP tool: {tool_name} with params: {params}")
-            result = await self.session.call_tool(tool_name, params)
+            async with governor.acquire("mcp"):
+                with stage(f"mcp.{tool_name}"):
+                    result = await self.session.call_tool(tool_name, params)
             logger.info(f"MCP tool result: {result}")
             return result
         except Exception as e:
@@ -113,6 +118,34 @@ if __name__ == "__main__":
                 "message": f"Error calling MCP tool: {str(e)}"
             }
     
+    async def call_tool_json(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a tool and return the dict it produced, decoded from the MCP result's content."""
+        result = await self.call_tool(tool_name, params)
+        if isinstance(result, dict):
+            return result
+        structured = getattr(result, "structuredContent", None)
+        if isinstance(structured, dict) and not getattr(result, "isError", False):
+            return structured
+        text = "".join(getattr(item, "text", "") for item in getattr(result, "content", None) or [])
+        if getattr(result, "isError", False):
+            return {
+                "status": "error",
+                "message": text or f"MCP tool {tool_name} failed"
+            }
+        try:
+            payload = json.loads(text)
+        except ValueError:
+            return {
+                "status": "success",
+                "message": text
+            }
+        if isinstance(payload, dict):
+            return payload
+        return {
+            "status": "success",
+            "result": payload
+        }
+
     async def disconnect(self):
         """Safely disconnect from the MCP server with proper resource cleanup"""
         if not self.connected:
@@ -1,8 +1,8 @@
 import logging
 from typing import Dict, Any, Optional, List
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from pydantic import BaseModel
-from ..external_services import BrowserService, EmailService, CalendarService, CalendarEventParams
+from ..external_services import BrowserService, EmailService, CalendarService, CalendarEventParams, get_youtube_search_service
 
 logger = logging.getLogger("mcp_connector.server")
 
@@ -11,13 +11,16 @@ class NavigateParams(BaseModel):
 
 class YoutubeSearchParams(BaseModel):
     search_query: str
+    action: str = "search"
 
 class FormParams(BaseModel):
+    url: str
     form_data: Dict[str, str]
     selectors: Optional[Dict[str, str]] = None
 
 class ClickParams(BaseModel):
     selector: str
+    url: Optional[str] = None
 
 class EmailParams(BaseModel):
     recipient: str
@@ -42,16 +45,26 @@ class MCPConnector:
         
         self.browser_service = BrowserService()
         self.email_service = EmailService()
+        self.youtube_search = get_youtube_search_service()
         
         self._register_tools()
         
         logger.info("MCP Connector initialized")
     
+    @staticmethod
+    def _session_key(ctx: Optional[Context]) -> Optional[str]:
+        """Identify the client session a tool call came from, so browser pages stay per session."""
+        try:
+            return str(id(ctx.session)) if ctx is not None else None
+        except ValueError:
+            # Called directly rather than through an MCP request.
+            return None
+    
     def _register_tools(self):
         """Register all tools with the MCP server"""
         
         @self.mcp.tool()
-        async def navigate(params: Dict[str, Any]) -> Dict[str, Any]:
+        async def navigate(params: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
             """Navigate to a URL in the browser"""
             try:
                 if "url" in params:
@@ -64,7 +77,7 @@ class MCPConnector:
                         "message": "URL parameter is required"
                     }
                 
-                success = await self.browser_service.navigate(url)
+                success = await self.browser_service.navigate(url, session=self._session_key(ctx))
                 if success:
                     return {
                         "status": "success",
@@ -82,31 +95,51 @@ class MCPConnector:
                 }
         
         @self.mcp.tool()
-        async def search_youtube(params: Dict[str, Any]) -> Dict[str, Any]:
-            """Search for a video on YouTube"""
+        async def search_youtube(params: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+            """Search YouTube and return the matching videos; with action "play", open the top result in the browser"""
             try:
                 if "search_query" in params:
-                    search_query = params["search_query"]
+                    search_params = params
                 elif "params" in params and isinstance(params["params"], dict) and "search_query" in params["params"]:
-                    search_query = params["params"]["search_query"]
+                    search_params = params["params"]
                 else:
                     return {
                         "status": "error",
                         "message": "search_query parameter is required"
                     }
+                search_query = search_params["search_query"]
+                action = search_params.get("action", "search")
+                
+                videos = await self.youtube_search.search_videos(search_query)
+                video_urls = [video["url"] for video in videos]
+                if action != "play":
+                    return {
+                        "status": "success",
+                        "action": "youtube_search",
+                        "query": search_query,
+                        "video_urls": video_urls,
+                        "videos": videos,
+                        "message": f"Found {len(videos)} YouTube videos for {search_query}"
+                    }
                 
-                query = search_query.replace(" ", "+")
-                url = f"https://www.youtube.com/results?search_query={query}"
-                success = await self.browser_service.navigate(url)
+                if not video_urls:
+                    return {
+                        "status": "error",
+                        "message": f"No YouTube videos found for {search_query}"
+                    }
+                success = await self.browser_service.navigate(video_urls[0], session=self._session_key(ctx))
                 if success:
-                    await self.browser_service.click_element("a#video-title")
                     return {
                         "status": "success",
-                        "message": f"Successfully searched for and played YouTube video: {search_query}"
+                        "action": "youtube_play",
+                        "query": search_query,
+                        "video_urls": video_urls,
+                        "videos": videos,
+                        "message": f"Playing YouTube video: {videos[0].get('title') or video_urls[0]}"
                     }
                 return {
                     "status": "error",
-                    "message": f"Failed to search YouTube for {search_query}"
+                    "message": f"Failed to open YouTube video for {search_query}"
                 }
             except Exception as e:
                 logger.error(f"Error in search_youtube tool: {str(e)}")
@@ -141,13 +174,6 @@ class MCPConnector:
                     }
                 
                 if not form_data:
-                    nav_success = await self.browser_service.navigate(url)
-                    if not nav_success:
-                        return {
-                            "status": "error",
-                            "message": f"Failed to navigate to {url}"
-                        }
-                    
                     fields = await self.browser_service.discover_form_fields(url)
                     if fields:
                         return {
@@ -161,14 +187,7 @@ class MCPConnector:
                             "message": "No form fields found on the page"
                         }
                 
-                nav_success = await self.browser_service.navigate(url)
-                if not nav_success:
-                    return {
-                        "status": "error",
-                        "message": f"Failed to navigate to {url}"
-                    }
-                    
-                fill_success = await self.browser_service.fill_form(form_data, selectors)
+                fill_success = await self.browser_service.fill_form(url, form_data, selectors)
                 if fill_success:
                     return {
                         "status": "success",
@@ -186,20 +205,22 @@ class MCPConnector:
                 }
         
         @self.mcp.tool()
-        async def click_element(params: Dict[str, Any]) -> Dict[str, Any]:
-            """Click on an element in the browser"""
+        async def click_element(params: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+            """Click on an element, on the given URL or else on the page last opened with navigate"""
             try:
                 if "selector" in params:
-                    selector = params["selector"]
+                    click_params = params
                 elif "params" in params and isinstance(params["params"], dict) and "selector" in params["params"]:
-                    selector = params["params"]["selector"]
+                    click_params = params["params"]
                 else:
                     return {
                         "status": "error",
                         "message": "selector parameter is required"
                     }
+                selector = click_params["selector"]
+                url = click_params.get("url")
                 
-                success = await self.browser_service.click_element(selector)
+                success = await self.browser_service.click_element(selector, url, session=self._session_key(ctx))
                 if success:
                     return {
                         "status": "success",
@@ -331,6 +352,11 @@ class MCPConnector:
             logger.info("Browser service closed successfully")
         except Exception as e:
             logger.error(f"Error closing browser service: {str(e)}")
+
+        try:
+            await self.youtube_search.aclose()
+        except Exception as e:
+            logger.error(f"Error closing YouTube search client: {str(e)}")
             
         try:
             if hasattr(self.mcp, "close") and callable(self.mcp.close):
@@ -1,18 +1,22 @@
 from dotenv import load_dotenv
 load_dotenv()
+import os
 import logging
 import json
 import threading
 import asyncio
 import signal
 import sys
-from fastapi import FastAPI, WebSocket, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 import uuid
-from fastapi.responses import JSONResponse
-from layers.langchain_agent import AgentOrchestrator
+from typing import Any, Dict, List
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from layers.langchain_agent import AgentOrchestrator, route_command, admission_budgets
 from layers.mcp_connector import MCPConnector, AlrisMCPClient
+from runtime import JobFailed, JobQueue, JobStore, Overloaded, governor
+from runtime.metrics import registry as metrics_registry
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -24,6 +28,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger("alris_server")
 
+WS_MAX_CONCURRENT_COMMANDS = int(os.getenv("WS_MAX_CONCURRENT_COMMANDS", "4"))
+WS_MAX_PENDING_COMMANDS = int(os.getenv("WS_MAX_PENDING_COMMANDS", "32"))
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "8"))
+BATCH_MAX_COMMANDS = int(os.getenv("BATCH_MAX_COMMANDS", "500"))
+HISTORY_MAX_PAGE_SIZE = 200
+
 mcp_client = None
 mcp_thread = None
 mcp_connector = None
@@ -86,6 +96,10 @@ async def lifespan(app: FastAPI):
         app.state.mcp_client = mcp_client
         app.state.agent_orchestrator = agent_orchestrator
         
+        job_queue = JobQueue(JobStore())
+        job_queue.start(run_job)
+        app.state.job_queue = job_queue
+        
         yield
     finally:
         logger.info("FastAPI application shutting down")
@@ -108,6 +122,10 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.error(f"Error shutting down MCP connector: {str(e)}")
 
+        if hasattr(app.state, 'job_queue'):
+            await app.state.job_queue.stop()
+            app.state.job_queue.store.close()
+
         if hasattr(app.state, 'agent_orchestrator'):
             await app.state.agent_orchestrator.cleanup()
 
@@ -126,6 +144,75 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def format_response(response: Any, response_type: str = "response") -> Dict[str, Any]:
+    """Shape an orchestrator response into the frame sent to WebSocket and REST clients."""
+    video_urls = None
+    if isinstance(response, dict):
+        if "video_urls" in response:
+            video_urls = response["video_urls"]
+        elif isinstance(response.get("result"), dict) and "video_urls" in response["result"]:
+            video_urls = response["result"]["video_urls"]
+    
+    message_content = ""
+    if isinstance(response, dict):
+        if "intent" in response and response["intent"] == "youtube_search":
+            if isinstance(response.get("result"), dict):
+                message_content = response["result"].get("message", "")
+        elif isinstance(response.get("result"), dict):
+            if "message" in response["result"]:
+                message_content = response["result"]["message"]
+            elif "result" in response["result"]:
+                message_content = response["result"]["result"]
+            else:
+                message_content = str(response["result"])
+        else:
+            message_content = str(response.get("result", response))
+    else:
+        message_content = str(response)
+    
+    formatted = {
+        "type": response_type,
+        "data": message_content,
+        "metadata": {}
+    }
+    
+    if video_urls:
+        formatted["video_urls"] = video_urls
+        logger.info(f"Including {len(video_urls)} video URLs in response")
+        formatted["metadata"]["content_type"] = "youtube_videos"
+        formatted["metadata"]["query"] = response.get("result", {}).get("query", "")
+        formatted["metadata"]["count"] = len(video_urls)
+    
+    if isinstance(response, dict) and "intent" in response:
+        formatted["metadata"]["intent"] = response["intent"]
+    
+    if isinstance(response, dict) and "thread_id" in response:
+        formatted["metadata"]["thread_id"] = response["thread_id"]
+    
+    if isinstance(response, dict) and "timings" in response:
+        formatted["metadata"]["timings"] = response["timings"]
+
+    if isinstance(response, dict) and isinstance(response.get("result"), dict):
+        for key in ("history", "usage", "budget_exhausted"):
+            if key in response["result"]:
+                formatted["metadata"][key] = response["result"][key]
+    
+    return formatted
+
+async def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job queue handler: run a queued command and store the same shape /command returns.
+
+    The orchestrator reports a failed command as an "error" response instead of raising,
+    so that is turned into a failed job here.
+    """
+    response = await app.state.agent_orchestrator.process_command(
+        job["command"],
+        thread_id=job["thread_id"]
+    )
+    if isinstance(response, dict) and (response.get("error") or response.get("intent") == "error"):
+        raise JobFailed(response.get("error") or "Command failed")
+    return format_response(response)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     logger.info("Received WebSocket connection")
@@ -134,89 +221,113 @@ async def websocket_endpoint(websocket: WebSocket):
     thread_id = str(uuid.uuid4())
     logger.debug(f"Generated thread ID for connection: {thread_id}")
     
+    send_lock = asyncio.Lock()
+    sequential_lock = asyncio.Lock()
+    command_slots = asyncio.Semaphore(WS_MAX_CONCURRENT_COMMANDS)
+    command_tasks = set()
+    
+    async def send_json(payload: Dict[str, Any], request_id: Any = None):
+        if request_id is not None:
+            payload = {"id": request_id, **payload}
+        async with send_lock:
+            await websocket.send_text(json.dumps(payload))
+    
+    async def run_command(command: str, request_id: Any, stream: bool):
+        async def send_event_json(event: Dict[str, Any]):
+            await send_json(event, request_id)
+        send_event = send_event_json if stream else None
+        
+        try:
+            admit_command(command)
+            async with command_slots:
+                if stream:
+                    await send_event({"type": "status", "data": "received"})
+                
+                response = await app.state.agent_orchestrator.process_command(
+                    command,
+                    thread_id=thread_id,
+                    on_event=send_event
+                )
+            logger.debug(f"Agent response: {response}")
+            
+            ws_response = format_response(response, "final" if stream else "response")
+            logger.debug(f"Sending WebSocket response: {ws_response}")
+            await send_json(ws_response, request_id)
+        except asyncio.CancelledError:
+            raise
+        except Overloaded as e:
+            with suppress(Exception):
+                await send_json({"type": "error", "message": str(e), "retry_after": e.retry_after}, request_id)
+        except Exception as e:
+            logger.error(f"Error processing message: {e}", exc_info=True)
+            with suppress(Exception):
+                await send_json({"type": "error", "message": str(e)}, request_id)
+    
+    async def run_sequential(command: str, stream: bool):
+        # Messages without an id keep the original one-at-a-time, in-order behaviour.
+        async with sequential_lock:
+            await run_command(command, None, stream)
+    
     try:
         while True:
             message = await websocket.receive_text()
             logger.debug(f"Received WebSocket message: {message}")
             
+            request_id = None
             try:
                 data = json.loads(message)
+                request_id = data.get("id")
                 command = data.get("command")
                 
                 if not command:
                     raise ValueError("Command is required")
                 
-                response = await app.state.agent_orchestrator.process_command(command, thread_id=thread_id)
-                logger.debug(f"Agent response: {response}")
-                
-                video_urls = None
-                if isinstance(response, dict):
-                    if "video_urls" in response:
-                        video_urls = response["video_urls"]
-                    elif isinstance(response.get("result"), dict) and "video_urls" in response["result"]:
-                        video_urls = response["result"]["video_urls"]
-                
-                message_content = ""
-                if isinstance(response, dict):
-                    if "intent" in response and response["intent"] == "youtube_search":
-                        if isinstance(response.get("result"), dict):
-                            message_content = response["result"].get("message", "")
-                    elif isinstance(response.get("result"), dict):
-                        if "message" in response["result"]:
-                            message_content = response["result"]["message"]
-                        elif "result" in response["result"]:
-                            message_content = response["result"]["result"]
-                        else:
-                            message_content = str(response["result"])
-                    else:
-                        message_content = str(response.get("result", response))
+                stream = bool(data.get("stream"))
+                if len(command_tasks) >= WS_MAX_PENDING_COMMANDS:
+                    # Running and waiting commands both count, so one client cannot queue unbounded work.
+                    logger.warning(f"Rejecting WebSocket command: {len(command_tasks)} already in flight")
+                    await send_json({
+                        "type": "error",
+                        "message": f"Too many commands in flight on this connection (limit {WS_MAX_PENDING_COMMANDS})",
+                        "retry_after": 1
+                    }, request_id)
+                    continue
+                if request_id is None:
+                    task = asyncio.create_task(run_sequential(command, stream))
                 else:
-                    message_content = str(response)
-                
-                ws_response = {
-                    "type": "response",
-                    "data": message_content
-                }
-                
-                ws_response["metadata"] = {}
-                
-                if video_urls:
-                    ws_response["video_urls"] = video_urls
-                    logger.info(f"Including {len(video_urls)} video URLs in WebSocket response")
-                    ws_response["metadata"]["content_type"] = "youtube_videos"
-                    ws_response["metadata"]["query"] = response.get("result", {}).get("query", "")
-                    ws_response["metadata"]["count"] = len(video_urls)
-                
-                if isinstance(response, dict) and "intent" in response:
-                    intent_type = response["intent"]
-                    ws_response["metadata"]["intent"] = intent_type
-                
-                logger.debug(f"Sending WebSocket response: {ws_response}")
-                
-                await websocket.send_text(json.dumps(ws_response))
+                    task = asyncio.create_task(run_command(command, request_id, stream))
+                command_tasks.add(task)
+                task.add_done_callback(command_tasks.discard)
                     
             except json.JSONDecodeError:
                 logger.error("Invalid JSON format received")
-                await websocket.send_text(json.dumps({
+                await send_json({
                     "type": "error",
                     "message": "Invalid JSON format"
-                }))
+                })
             except ValueError as e:
                 logger.error(f"Validation error: {e}")
-                await websocket.send_text(json.dumps({
+                await send_json({
                     "type": "error",
                     "message": str(e)
-                }))
+                }, request_id)
             except Exception as e:
                 logger.error(f"Error processing message: {e}", exc_info=True)
-                await websocket.send_text(json.dumps({
+                await send_json({
                     "type": "error",
                     "message": str(e)
-                }))
+                }, request_id)
                 
+    except WebSocketDisconnect:
+        logger.info("WebSocket client disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
     finally:
+        pending = list(command_tasks)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
         await websocket.close()
 
 @app.get("/health")
@@ -225,6 +336,8 @@ async def health_check():
     
     mcp_status = "running" if app.state.mcp_thread and app.state.mcp_thread.is_alive() else "stopped"
     mcp_client_status = "connected" if app.state.mcp_client and app.state.mcp_client.connected else "disconnected"
+    intent_cache = app.state.agent_orchestrator.intent_detector.cache
+    checkpointer = app.state.agent_orchestrator.browser_agent.memory
     
     return {
         "status": "healthy",
@@ -238,8 +351,15 @@ async def health_check():
             },
             "agent_orchestrator": {
                 "status": "initialized",
-                "agents": ["BrowserAgent"]
+                "agents": ["BrowserAgent"],
+                "intent_cache": intent_cache.stats() if intent_cache else None,
+                "speculation": app.state.agent_orchestrator.speculator.stats(),
+                "checkpointer": checkpointer.stats() if hasattr(checkpointer, "stats") else {"type": type(checkpointer).__name__},
+                "youtube_search": app.state.agent_orchestrator.browser_agent.youtube_search.stats(),
+                "browser_pool": app.state.agent_orchestrator.browser_agent.browser_service.stats()
             },
+            "job_queue": app.state.job_queue.stats(),
+            "governor": governor.stats(),
             "websocket": {
                 "status": "available",
                 "endpoint": "/ws"
@@ -248,6 +368,21 @@ async def health_check():
         "version": "2.0.0"
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+def admit_command(command: str):
+    """Admission control for one command, against only the budgets it is routed to use."""
+    governor.admit(admission_budgets(route_command(command)))
+
+def overloaded_response(error: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"type": "error", "message": str(error), "retry_after": error.retry_after},
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @app.post("/command")
 async def command_endpoint(request: Request):
     try:
@@ -259,57 +394,174 @@ async def command_endpoint(request: Request):
                 content={"type": "error", "message": "Command is required"}
             )
 
+        admit_command(command)
         thread_id = str(uuid.uuid4())
         response = await app.state.agent_orchestrator.process_command(command, thread_id=thread_id)
 
-        message_content = ""
-        video_urls = None
-        if isinstance(response, dict):
-            if "video_urls" in response:
-                video_urls = response["video_urls"]
-            elif isinstance(response.get("result"), dict) and "video_urls" in response["result"]:
-                video_urls = response["result"]["video_urls"]
-
-        if isinstance(response, dict):
-            if "intent" in response and response["intent"] == "youtube_search":
-                if isinstance(response.get("result"), dict):
-                    message_content = response["result"].get("message", "")
-            elif isinstance(response.get("result"), dict):
-                if "message" in response["result"]:
-                    message_content = response["result"]["message"]
-                elif "result" in response["result"]:
-                    message_content = response["result"]["result"]
-                else:
-                    message_content = str(response["result"])
-            else:
-                message_content = str(response.get("result", response))
-        else:
-            message_content = str(response)
+        api_response = format_response(response)
 
-        api_response = {
-            "type": "response",
-            "data": message_content,
-            "metadata": {}
-        }
+        return JSONResponse(content=api_response)
 
-        if video_urls:
-            api_response["video_urls"] = video_urls
-            api_response["metadata"]["content_type"] = "youtube_videos"
-            api_response["metadata"]["query"] = response.get("result", {}).get("query", "")
-            api_response["metadata"]["count"] = len(video_urls)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Error in /command endpoint: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={"type": "error", "message": str(e)}
+        )
 
-        if isinstance(response, dict) and "intent" in response:
-            api_response["metadata"]["intent"] = response["intent"]
+@app.get("/threads/{thread_id}/messages")
+async def thread_messages_endpoint(thread_id: str, offset: int = 0, limit: int = 50):
+    if offset < 0 or limit < 1:
+        return JSONResponse(
+            status_code=400,
+            content={"type": "error", "message": "offset must be >= 0 and limit >= 1"}
+        )
+    
+    history = await app.state.agent_orchestrator.get_thread_history(
+        thread_id,
+        offset=offset,
+        limit=min(limit, HISTORY_MAX_PAGE_SIZE)
+    )
+    if history["total"] == 0:
+        return JSONResponse(
+            status_code=404,
+            content={"type": "error", "message": f"No messages for thread {thread_id}"}
+        )
+    return JSONResponse(content=history)
 
-        return JSONResponse(content=api_response)
+@app.post("/jobs")
+async def create_job_endpoint(request: Request):
+    try:
+        data = await request.json()
+        command = data.get("command")
+        if not command:
+            return JSONResponse(
+                status_code=400,
+                content={"type": "error", "message": "Command is required"}
+            )
+
+        job = app.state.job_queue.submit(command, thread_id=data.get("thread_id"))
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job["id"], "status": job["status"], "thread_id": job["thread_id"]}
+        )
 
     except Exception as e:
-        logger.error(f"Error in /command endpoint: {e}", exc_info=True)
+        logger.error(f"Error in /jobs endpoint: {e}", exc_info=True)
         return JSONResponse(
             status_code=500,
             content={"type": "error", "message": str(e)}
         )
 
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    job = app.state.job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"type": "error", "message": f"Job {job_id} not found"}
+        )
+    return JSONResponse(content=job)
+
+@app.websocket("/jobs/{job_id}/ws")
+async def job_websocket_endpoint(websocket: WebSocket, job_id: str):
+    await websocket.accept()
+    try:
+        found = False
+        async for job in app.state.job_queue.subscribe(job_id):
+            found = True
+            await websocket.send_text(json.dumps({"type": "job", "data": job}))
+        if not found:
+            await websocket.send_text(json.dumps({"type": "error", "message": f"Job {job_id} not found"}))
+    except Exception as e:
+        logger.error(f"Job WebSocket error: {e}", exc_info=True)
+    finally:
+        with suppress(Exception):
+            await websocket.close()
+
+def _parse_batch_items(items: Any) -> List[Dict[str, Any]]:
+    """Normalize batch entries, which may be plain command strings or {"command", "thread_id"} objects."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("Commands must be a non-empty list")
+    if len(items) > BATCH_MAX_COMMANDS:
+        raise ValueError(f"A batch may contain at most {BATCH_MAX_COMMANDS} commands")
+    
+    parsed = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"command": item}
+        if not isinstance(item, dict) or not item.get("command"):
+            raise ValueError(f"Command {index} is missing a command")
+        parsed.append({
+            "command": item["command"],
+            "thread_id": item.get("thread_id") or str(uuid.uuid4())
+        })
+    return parsed
+
+async def _run_batch_item(index: int, item: Dict[str, Any], slots: asyncio.Semaphore) -> Dict[str, Any]:
+    async with slots:
+        try:
+            # Admitted when it starts, so a long batch backs off as its budgets fill up.
+            admit_command(item["command"])
+            response = await app.state.agent_orchestrator.process_command(
+                item["command"],
+                thread_id=item["thread_id"]
+            )
+            result = format_response(response)
+        except Overloaded as e:
+            result = {"type": "error", "message": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"Error in batch command {index}: {e}", exc_info=True)
+            result = {"type": "error", "message": str(e)}
+    return {"index": index, "thread_id": item["thread_id"], **result}
+
+@app.post("/commands/batch")
+async def batch_command_endpoint(request: Request):
+    try:
+        data = await request.json()
+        items = _parse_batch_items(data.get("commands"))
+        parallelism = data.get("max_parallelism") or BATCH_MAX_PARALLELISM
+        parallelism = max(1, min(int(parallelism), BATCH_MAX_PARALLELISM))
+    except Exception as e:
+        logger.error(f"Invalid /commands/batch request: {e}")
+        return JSONResponse(
+            status_code=400,
+            content={"type": "error", "message": str(e)}
+        )
+
+    try:
+        governor.admit(set().union(*(admission_budgets(route_command(item["command"])) for item in items)))
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    logger.info(f"Running batch of {len(items)} commands with parallelism {parallelism}")
+    slots = asyncio.Semaphore(parallelism)
+    tasks = [
+        asyncio.create_task(_run_batch_item(index, item, slots))
+        for index, item in enumerate(items)
+    ]
+
+    if data.get("stream"):
+        async def stream_results():
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield json.dumps(await next_done) + "\n"
+            finally:
+                # Stop outstanding work if the client goes away mid-stream.
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return JSONResponse(content={"type": "batch", "results": results})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,19 @@
+"""
+Server Runtime
+
+Infrastructure that sits around the agent layers rather than inside them:
+background job execution and the resource governor that bounds concurrent
+use of external dependencies.
+"""
+
+from .jobs import JobQueue, JobStore, JobFailed
+from .governor import ResourceGovernor, Overloaded, governor
+
+__all__ = [
+    'JobQueue',
+    'JobStore',
+    'JobFailed',
+    'ResourceGovernor',
+    'Overloaded',
+    'governor'
+]
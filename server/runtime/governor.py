@@ -0,0 +1,202 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, Optional, Iterable, Callable
+
+logger = logging.getLogger("runtime.governor")
+
+GOVERNOR_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("GOVERNOR_MAX_QUEUE_WAIT_SECONDS", "5"))
+
+DEFAULT_BUDGETS = {
+    "llm": int(os.getenv("GOVERNOR_LLM_CONCURRENCY", "8")),
+    "browser": int(os.getenv("GOVERNOR_BROWSER_CONCURRENCY", "2")),
+    # Leases of pooled browser pages, across every BrowserService in the process.
+    "browser_pool": int(os.getenv("GOVERNOR_BROWSER_POOL_CONCURRENCY", os.getenv("BROWSER_POOL_SIZE", "8"))),
+    "calendar": int(os.getenv("GOVERNOR_CALENDAR_CONCURRENCY", "4")),
+    "smtp": int(os.getenv("GOVERNOR_SMTP_CONCURRENCY", "2")),
+    "mcp": int(os.getenv("GOVERNOR_MCP_CONCURRENCY", "8")),
+}
+
+class Overloaded(Exception):
+    """Raised by admission control when a budget's queue has waited longer than allowed."""
+
+    def __init__(self, budget: str, waited: float, retry_after: int):
+        super().__init__(f"Server is busy: '{budget}' requests have been queued for {waited:.1f}s")
+        self.budget = budget
+        self.waited = waited
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("wake", "queued_at", "granted")
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.queued_at = time.monotonic()
+        self.granted = False
+
+class Budget:
+    """FIFO concurrency limit for one dependency.
+
+    Thread-safe, so it can be shared between the app's event loop, the MCP
+    server's loop and plain worker threads.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waiters: "deque[_Waiter]" = deque()
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_hold = 0.0
+
+    def _try_acquire(self) -> bool:
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            self.acquired += 1
+            return True
+        return False
+
+    def _enqueue(self, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(wake)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        """Drop a waiter that gave up; hand its slot on if it had already been granted one."""
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def _granted(self, waiter: _Waiter):
+        with self._lock:
+            self.total_wait += time.monotonic() - waiter.queued_at
+
+    async def acquire(self):
+        with self._lock:
+            if self._try_acquire():
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+
+            def wake():
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+            waiter = self._enqueue(wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._granted(waiter)
+
+    def acquire_blocking(self):
+        with self._lock:
+            if self._try_acquire():
+                return
+            event = threading.Event()
+            waiter = self._enqueue(event.set)
+        event.wait()
+        self._granted(waiter)
+
+    def release(self, held: float = 0.0):
+        with self._lock:
+            self.total_hold += held
+            if self._waiters:
+                # Hand the slot straight to the oldest waiter so in_use never dips below the queue.
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self.acquired += 1
+                waiter.wake()
+            else:
+                self._in_use -= 1
+
+    def oldest_wait(self) -> float:
+        with self._lock:
+            if not self._waiters:
+                return 0.0
+            return time.monotonic() - self._waiters[0].queued_at
+
+    def retry_after(self) -> int:
+        """Rough seconds until the current queue drains, from the average hold time."""
+        with self._lock:
+            average_hold = self.total_hold / self.acquired if self.acquired else 1.0
+            backlog = len(self._waiters) + self._in_use
+        return max(1, math.ceil(average_hold * backlog / self.limit))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = len(self._waiters)
+            oldest = time.monotonic() - self._waiters[0].queued_at if waiting else 0.0
+            return {
+                "limit": self.limit,
+                "in_use": self._in_use,
+                "waiting": waiting,
+                "oldest_wait_seconds": round(oldest, 3),
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "average_wait_seconds": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0
+            }
+
+class ResourceGovernor:
+    """Named concurrency budgets for every external dependency, plus queue-wait admission control."""
+
+    def __init__(self,
+                 budgets: Optional[Dict[str, int]] = None,
+                 max_queue_wait: float = GOVERNOR_MAX_QUEUE_WAIT_SECONDS):
+        self.max_queue_wait = max_queue_wait
+        self.budgets = {
+            name: Budget(name, limit)
+            for name, limit in (budgets or DEFAULT_BUDGETS).items()
+        }
+
+    def budget(self, name: str) -> Budget:
+        return self.budgets[name]
+
+    @asynccontextmanager
+    async def acquire(self, name: str):
+        budget = self.budgets[name]
+        await budget.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            budget.release(time.monotonic() - started)
+
+    @contextmanager
+    def acquire_blocking(self, name: str):
+        """Synchronous variant for code that runs outside an event loop."""
+        budget = self.budgets[name]
+        budget.acquire_blocking()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            budget.release(time.monotonic() - started)
+
+    def admit(self, names: Optional[Iterable[str]] = None):
+        """Reject new work while any of the named budgets (all of them by default) has a waiter
+        queued longer than max_queue_wait."""
+        for name in self.budgets if names is None else names:
+            budget = self.budgets[name]
+            waited = budget.oldest_wait()
+            if waited > self.max_queue_wait:
+                with budget._lock:
+                    budget.rejected += 1
+                retry_after = budget.retry_after()
+                logger.warning(f"Rejecting command: '{name}' queue has waited {waited:.1f}s, retry after {retry_after}s")
+                raise Overloaded(name, waited, retry_after)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: budget.stats() for name, budget in self.budgets.items()}
+
+governor = ResourceGovernor()
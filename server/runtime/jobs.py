@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Callable, Awaitable, AsyncIterator, Set
+
+logger = logging.getLogger("runtime.jobs")
+
+JOBS_DB = os.getenv("JOBS_DB", "alris_jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# A running job whose owner has not heartbeated for this long is taken to be orphaned and re-queued.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED)
+
+class JobFailed(Exception):
+    """Raised by a job handler whose command ran but reported an error."""
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+class JobStore:
+    """SQLite-backed job records, so queued work and finished results survive a restart.
+
+    Several processes may share one database. A job is claimed by a single conditional
+    update that records this store's ``owner``, and its owner heartbeats it while it runs,
+    so a job is never run twice and only orphaned ones are re-queued.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, command TEXT NOT NULL, thread_id TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "owner TEXT, heartbeat_at REAL)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, command: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, command, thread_id, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, command, thread_id or str(uuid.uuid4()), QUEUED, time.time())
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Mark a queued job running for this owner; None if it is gone or another worker has it."""
+        now = time.time()
+        with self._lock:
+            claimed = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started_at = ?, heartbeat_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, self.owner, now, now, job_id, QUEUED)
+            ).rowcount == 1
+            self._db.commit()
+        return self.get(job_id) if claimed else None
+
+    def mark_succeeded(self, job_id: str, result: Dict[str, Any]):
+        self._finish(job_id, status=SUCCEEDED, result=json.dumps(result), finished_at=time.time())
+
+    def mark_failed(self, job_id: str, error: str):
+        self._finish(job_id, status=FAILED, error=error, finished_at=time.time())
+
+    def _finish(self, job_id: str, **fields):
+        """Record the outcome of a job this owner is running, unless it has since been re-queued."""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            finished = self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ? AND owner = ?",
+                (*fields.values(), job_id, RUNNING, self.owner)
+            ).rowcount
+            self._db.commit()
+        if not finished:
+            logger.warning(f"Job {job_id} was re-queued while it ran; dropping its outcome")
+
+    def heartbeat(self):
+        """Extend the lease on every job this owner is running."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND owner = ?",
+                (time.time(), RUNNING, self.owner)
+            )
+            self._db.commit()
+
+    def requeue_expired(self) -> List[str]:
+        """Re-queue running jobs whose owner stopped heartbeating and return their ids."""
+        cutoff = time.time() - self.lease_seconds
+        expired = "status = ? AND COALESCE(heartbeat_at, started_at, 0) < ?"
+        requeued = []
+        with self._lock:
+            rows = self._db.execute(f"SELECT id FROM jobs WHERE {expired}", (RUNNING, cutoff)).fetchall()
+            for row in rows:
+                # Conditional per row, so a job another process heartbeated meanwhile is left alone.
+                if self._db.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, started_at = NULL, heartbeat_at = NULL "
+                    f"WHERE id = ? AND {expired}",
+                    (QUEUED, row["id"], RUNNING, cutoff)
+                ).rowcount == 1:
+                    requeued.append(row["id"])
+            self._db.commit()
+        if requeued:
+            logger.warning(f"Re-queued {len(requeued)} jobs whose worker stopped heartbeating")
+        return requeued
+
+    def release(self) -> int:
+        """Put this owner's running jobs back in the queue, for a clean shutdown."""
+        with self._lock:
+            released = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND owner = ?",
+                (QUEUED, RUNNING, self.owner)
+            ).rowcount
+            self._db.commit()
+        if released:
+            logger.info(f"Re-queued {released} jobs interrupted by shutdown")
+        return released
+
+    def recover(self) -> List[str]:
+        """Re-queue orphaned jobs and return every queued id, oldest first."""
+        self.requeue_expired()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class JobQueue:
+    """Worker pool that drains persisted jobs through a handler and notifies subscribers."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = max(1, workers)
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def start(self, handler: JobHandler):
+        for job_id in self.store.recover():
+            self._queue.put_nowait(job_id)
+        self._tasks = [
+            asyncio.create_task(self._worker(handler, index))
+            for index in range(self.workers)
+        ]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Job queue started with {self.workers} workers and {self._queue.qsize()} queued jobs")
+
+    async def stop(self):
+        tasks = self._tasks + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._heartbeat = None
+        self.store.release()
+        logger.info("Job queue stopped")
+
+    async def _heartbeat_loop(self):
+        """Keep this process's running jobs leased and pick up jobs orphaned by other workers."""
+        interval = max(1.0, self.store.lease_seconds / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.store.heartbeat)
+                for job_id in await asyncio.to_thread(self.store.requeue_expired):
+                    self._queue.put_nowait(job_id)
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def submit(self, command: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
+        job = self.store.create(command, thread_id)
+        self._queue.put_nowait(job["id"])
+        logger.info(f"Queued job {job['id']}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job's current state and every later change until it finishes."""
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(updates)
+        try:
+            job = self.store.get(job_id)
+            while job is not None:
+                yield job
+                if job["status"] in TERMINAL_STATUSES:
+                    return
+                job = await updates.get()
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(updates)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def _publish(self, job_id: str):
+        subscribers = self._subscribers.get(job_id)
+        if not subscribers:
+            return
+        job = self.store.get(job_id)
+        for updates in subscribers:
+            updates.put_nowait(job)
+
+    async def _worker(self, handler: JobHandler, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.store.claim(job_id)
+                if job is None:
+                    continue
+                self._publish(job_id)
+                logger.debug(f"Worker {index} running job {job_id}")
+                try:
+                    result = await handler(job)
+                    self.store.mark_succeeded(job_id, result)
+                except asyncio.CancelledError:
+                    # stop() puts it back in the queue for the next start.
+                    raise
+                except JobFailed as e:
+                    logger.warning(f"Job {job_id} failed: {str(e)}")
+                    self.store.mark_failed(job_id, str(e))
+                except Exception as e:
+                    logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+                    self.store.mark_failed(job_id, str(e))
+                self._publish(job_id)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize(),
+            "jobs": self.store.counts(),
+            "subscribers": sum(len(s) for s in self._subscribers.values())
+        }
@@ -0,0 +1,221 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("runtime.metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series_items = [(key, dict(s, counts=list(s["counts"]))) for key, s in self._series.items()]
+        for key, series in series_items:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                bucket_labels = labels + [("le", _format_value(bound))]
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+class MetricsRegistry:
+    """Holds every metric the server exports and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "alris_stage_duration_seconds",
+    "Time spent in each stage of command processing.",
+    ("stage", "intent")
+))
+COMMAND_SECONDS = registry.register(Histogram(
+    "alris_command_duration_seconds",
+    "End-to-end command processing time.",
+    ("intent",)
+))
+FALLBACKS = registry.register(Counter(
+    "alris_fallbacks_total",
+    "Times a primary path failed over to a fallback implementation.",
+    ("kind", "reason")
+))
+
+NO_INTENT = "none"
+
+class RequestTimings:
+    """Stage durations collected while one command is processed."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self.finished = False
+
+    def summary(self) -> Dict[str, float]:
+        """Milliseconds per stage, summed when a stage ran more than once."""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+        totals["total"] = time.perf_counter() - self.started
+        return {name: round(seconds * 1000, 2) for name, seconds in totals.items()}
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("alris_request_timings", default=None)
+
+@contextmanager
+def track_request():
+    """Collect stage timings for the command processed inside this block.
+
+    Tasks spawned inside the block inherit the same collector, so speculative
+    work is attributed to the command that started it.
+    """
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+def finish_request(timings: RequestTimings, intent: Optional[str]):
+    """Publish a finished command's stage timings, labelled with its final intent."""
+    if timings.finished:
+        return
+    timings.finished = True
+    intent = intent or NO_INTENT
+    for name, seconds in timings.stages:
+        STAGE_SECONDS.observe(seconds, stage=name, intent=intent)
+    COMMAND_SECONDS.observe(time.perf_counter() - timings.started, intent=intent)
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a processing stage of the current command, if there is one."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        timings = _current_timings.get()
+        if timings is not None and not timings.finished:
+            timings.stages.append((name, elapsed))
+        else:
+            STAGE_SECONDS.observe(elapsed, stage=name, intent=NO_INTENT)
+
+def record_fallback(kind: str, reason: str):
+    logger.debug(f"Fallback '{kind}' taken: {reason}")
+    FALLBACKS.inc(kind=kind, reason=reason)
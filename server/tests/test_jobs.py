@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from runtime.jobs import JobStore, QUEUED, RUNNING, SUCCEEDED
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+@pytest.fixture
+def stores(db_path):
+    # Two stores on one database stand in for two server processes.
+    first, second = JobStore(db_path, lease_seconds=60), JobStore(db_path, lease_seconds=60)
+    yield first, second
+    first.close()
+    second.close()
+
+def test_claim_is_exclusive(stores):
+    first, second = stores
+    job = first.create("send an email")
+
+    claimed = first.claim(job["id"])
+
+    assert claimed["status"] == RUNNING
+    assert claimed["owner"] == first.owner
+    assert second.claim(job["id"]) is None
+    assert first.claim(job["id"]) is None
+
+def test_recover_leaves_jobs_of_live_workers_alone(stores):
+    first, second = stores
+    running = first.create("add a calendar event")
+    queued = first.create("fill a form")
+    first.claim(running["id"])
+
+    assert second.recover() == [queued["id"]]
+    assert second.get(running["id"])["status"] == RUNNING
+
+def test_jobs_without_a_heartbeat_are_requeued(stores):
+    first, second = stores
+    job = first.create("send an email")
+    first.claim(job["id"])
+    second.lease_seconds = 0
+    time.sleep(0.01)
+
+    assert second.recover() == [job["id"]]
+    assert second.get(job["id"])["status"] == QUEUED
+    assert second.claim(job["id"])["owner"] == second.owner
+
+def test_outcome_of_a_requeued_job_is_dropped(stores):
+    first, second = stores
+    job = first.create("send an email")
+    first.claim(job["id"])
+    second.lease_seconds = 0
+    time.sleep(0.01)
+    second.requeue_expired()
+    second.claim(job["id"])
+
+    first.mark_succeeded(job["id"], {"status": "success"})
+    assert second.get(job["id"])["status"] == RUNNING
+
+    second.mark_succeeded(job["id"], {"status": "success"})
+    assert second.get(job["id"])["status"] == SUCCEEDED
+
+def test_release_requeues_only_own_jobs(stores):
+    first, second = stores
+    mine = first.create("send an email")
+    theirs = first.create("fill a form")
+    first.claim(mine["id"])
+    second.claim(theirs["id"])
+
+    assert first.release() == 1
+    assert first.get(mine["id"])["status"] == QUEUED
+    assert first.get(theirs["id"])["status"] == RUNNING
+
+def test_heartbeat_keeps_the_lease(stores):
+    first, second = stores
+    job = first.create("send an email")
+    first.claim(job["id"])
+    time.sleep(0.05)
+    first.heartbeat()
+    second.lease_seconds = 0.04
+
+    assert second.requeue_expired() == []
@@ -0,0 +1,125 @@
+import os
+
+import httpx
+import pytest
+
+from layers.external_services.youtube_client import (
+    YouTubeSearchClient,
+    YouTubeSearchError,
+    extract_initial_data,
+    parse_search_results,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "youtube_results.html")
+SEARCH_URL = "https://www.youtube.com/results"
+
+@pytest.fixture(scope="module")
+def results_page() -> str:
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+def test_parse_search_results_fields(results_page):
+    videos = parse_search_results(results_page, limit=10)
+
+    assert videos[0] == {
+        "video_id": "t5Bo1Je9EmE",
+        "url": "https://www.youtube.com/watch?v=t5Bo1Je9EmE",
+        "title": "Python Asyncio Tutorial - Async/Await in Python",
+        "channel": "Tech With Tim",
+        "duration": "24:59",
+        "views": "412,093 views",
+        "published": "2 years ago"
+    }
+    assert all(video["title"] and video["channel"] for video in videos)
+
+def test_parse_search_results_skips_shorts_ads_and_duplicates(results_page):
+    ids = [video["video_id"] for video in parse_search_results(results_page, limit=10)]
+
+    assert ids == ["t5Bo1Je9EmE", "Qb9s3UiMSTA", "2IW-ZEui4h4", "ftmdDlwMwwQ", "Xbl7XjFYsN4", "oAkLSJNr5zY"]
+    assert "K56nNuBEd0c" not in ids  # shorts
+    assert "dQyK2Zr0s1E" not in ids  # ad slot and reel shelf
+    assert len(ids) == len(set(ids))
+
+def test_parse_search_results_limit(results_page):
+    videos = parse_search_results(results_page, limit=2)
+
+    assert [video["video_id"] for video in videos] == ["t5Bo1Je9EmE", "Qb9s3UiMSTA"]
+
+def test_extract_initial_data_without_results_data():
+    with pytest.raises(YouTubeSearchError):
+        extract_initial_data("<html><script>var ytcfg = {};</script></html>")
+
+def test_extract_initial_data_with_malformed_json():
+    with pytest.raises(YouTubeSearchError):
+        extract_initial_data("<script>var ytInitialData = {\"contents\": </script>")
+
+def _client(responses, calls):
+    """A client whose transport answers the queued (status, body) pairs in order."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        status, body = responses.pop(0)
+        return httpx.Response(status, text=body)
+    return YouTubeSearchClient(search_url=SEARCH_URL, retries=2, transport=httpx.MockTransport(handler))
+
+@pytest.mark.asyncio
+async def test_search_sends_query_and_parses_page(results_page):
+    calls = []
+    client = _client([(200, results_page)], calls)
+    try:
+        videos = await client.search("python asyncio", limit=3)
+    finally:
+        await client.aclose()
+
+    assert len(videos) == 3
+    assert len(calls) == 1
+    assert calls[0].url.params["search_query"] == "python asyncio"
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [500, 503, 429])
+async def test_search_retries_server_errors_and_rate_limits(results_page, status):
+    calls = []
+    client = _client([(status, "busy"), (status, "busy"), (200, results_page)], calls)
+    try:
+        videos = await client.search("python asyncio")
+    finally:
+        await client.aclose()
+
+    assert len(calls) == 3
+    assert videos[0]["video_id"] == "t5Bo1Je9EmE"
+
+@pytest.mark.asyncio
+async def test_search_retries_pages_without_results_data(results_page):
+    calls = []
+    client = _client([(200, "<html>consent</html>"), (200, results_page)], calls)
+    try:
+        videos = await client.search("python asyncio")
+    finally:
+        await client.aclose()
+
+    assert len(calls) == 2
+    assert videos
+
+@pytest.mark.asyncio
+async def test_search_gives_up_after_retries():
+    calls = []
+    client = _client([(503, "busy")] * 3, calls)
+    try:
+        with pytest.raises(YouTubeSearchError, match="after 3 attempts: HTTP 503"):
+            await client.search("python asyncio")
+    finally:
+        await client.aclose()
+
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [400, 403, 404])
+async def test_search_raises_on_client_errors_without_retrying(status):
+    calls = []
+    client = _client([(status, "nope")] * 3, calls)
+    try:
+        with pytest.raises(YouTubeSearchError, match=f"HTTP {status}"):
+            await client.search("python asyncio")
+    finally:
+        await client.aclose()
+
+    assert len(calls) == 1